@@ -0,0 +1,69 @@
+"""
+Benchmark do filtro de retomada do checkpoint.
+
+Compara o filtro antigo (lista de matrículas reconstruída a cada consulta)
+com o índice em memória de src/checkpoint.py.
+
+Uso:
+    python scripts/bench_checkpoint.py [n_matriculas]
+"""
+
+import sys
+import time
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from checkpoint import novo_checkpoint, indexar_checkpoint, filtrar_pendentes
+
+
+def filtro_antigo(checkpoint, matriculas, nomes):
+    """Filtro O(n²) usado antes do índice"""
+    def ja_foi_processado(matricula):
+        matriculas_processadas = [p["matricula"] for p in checkpoint.get("processados", [])]
+        return matricula in matriculas_processadas
+
+    return [(mat, nom) for mat, nom in zip(matriculas, nomes) if not ja_foi_processado(mat)]
+
+
+def montar_checkpoint(n: int):
+    """Checkpoint sintético com metade das matrículas já processadas"""
+    matriculas = [str(10000000 + i) for i in range(n)]
+    nomes = [f"PACIENTE {i}" for i in range(n)]
+
+    checkpoint = novo_checkpoint()
+    checkpoint["processados"] = [
+        {"matricula": mat, "timestamp": "", "sucesso": True} for mat in matriculas[::2]
+    ]
+
+    return checkpoint, matriculas, nomes
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    checkpoint, matriculas, nomes = montar_checkpoint(n)
+
+    t0 = time.perf_counter()
+    indexar_checkpoint(checkpoint)
+    t_indice = time.perf_counter() - t0
+
+    pendentes = filtrar_pendentes(checkpoint, matriculas, nomes)
+    t_filtro = min(timeit.repeat(
+        lambda: filtrar_pendentes(checkpoint, matriculas, nomes), number=1, repeat=5
+    ))
+
+    print(f"Matrículas: {n}")
+    print(f"Montagem do índice (uma vez na carga): {t_indice * 1000:.2f} ms")
+    print(f"Filtro com índice: {t_filtro * 1000:.2f} ms ({len(pendentes)} pendentes)")
+
+    # O filtro antigo é quadrático: medir numa amostra e extrapolar
+    amostra = min(n, 2_000)
+    t0 = time.perf_counter()
+    filtro_antigo(checkpoint, matriculas[:amostra], nomes[:amostra])
+    t_antigo = (time.perf_counter() - t0) * n / amostra
+    print(f"Filtro antigo (estimado a partir de {amostra}): {t_antigo:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
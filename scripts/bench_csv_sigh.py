@@ -0,0 +1,67 @@
+"""
+Benchmark da leitura dos CSVs do SIGH.
+
+Compara a leitura antiga (replace(',', ' ; ') + engine python + regex nas
+aspas) com o parser C de src/load_sigh_data.py, no export real de data/ e
+num arquivo sintético com o export repetido (simulando vários anos).
+
+Uso:
+    python scripts/bench_csv_sigh.py [repeticoes_sintetico]
+"""
+
+import sys
+import tempfile
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from icecream import ic
+
+from load_sigh_data import encontrar_csvs, carregar_csv_sigh, _carregar_csv_sigh_legado
+
+
+def montar_sintetico(origem: Path, repeticoes: int, destino: Path) -> Path:
+    """Arquivo com o cabeçalho da origem e as linhas repetidas N vezes"""
+    with open(origem, "r", encoding="iso-8859-1") as f:
+        cabecalho = f.readline()
+        linhas = f.read()
+
+    with open(destino, "w", encoding="iso-8859-1") as f:
+        f.write(cabecalho)
+        for _ in range(repeticoes):
+            f.write(linhas)
+
+    return destino
+
+
+def medir(nome: str, arquivo: Path, repeticoes: int = 3):
+    """Mede as duas leituras e confere se produzem o mesmo DataFrame"""
+    antigo = min(timeit.repeat(lambda: _carregar_csv_sigh_legado(arquivo), number=1, repeat=repeticoes))
+    novo = min(timeit.repeat(lambda: carregar_csv_sigh(arquivo), number=1, repeat=repeticoes))
+
+    iguais = carregar_csv_sigh(arquivo).astype(str).equals(_carregar_csv_sigh_legado(arquivo).astype(str))
+    tamanho = arquivo.stat().st_size / 1024 / 1024
+
+    print(f"{nome:<28} {tamanho:>7.1f} MB  antigo {antigo:>7.3f}s  novo {novo:>7.3f}s  "
+          f"({antigo / novo:.1f}x)  resultados iguais: {iguais}")
+
+
+def main():
+    ic.disable()
+    repeticoes = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+    csvs = encontrar_csvs()
+    if not csvs:
+        print("Nenhum CSV em data/")
+        return
+
+    medir(csvs[0].name[:28], csvs[0])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sintetico = montar_sintetico(csvs[0], repeticoes, Path(tmp) / "sintetico.csv")
+        medir(f"sintético ({repeticoes}x)", sintetico, repeticoes=1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Relatório de memória da tabela do SIGH, antes e depois dos tipos compactos.
+
+Mostra, por coluna, o tipo e o uso de memória da tabela como lida (texto) e
+depois de tipar_dataframe_sigh (categóricas, Int64, datas), no export real
+de data/ repetido N vezes, e mede alguns filtros típicos nas duas versões.
+
+Uso:
+    python scripts/bench_memoria_sigh.py [repeticoes]
+"""
+
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import pandas as pd
+from icecream import ic
+
+from load_sigh_data import encontrar_csvs, carregar_csv_sigh, tipar_dataframe_sigh, relatorio_memoria
+
+
+def medir_filtros(df_texto: pd.DataFrame, df_tipado: pd.DataFrame):
+    """Tempo de filtros comuns (especialidade, tipo, período) nas duas versões"""
+    especialidade = df_texto["NOME ESPECIALIDADE"].iloc[0]
+    tipo = df_texto["TIPO"].iloc[0]
+    inicio = pd.Timestamp(df_tipado["DATA"].min())
+
+    filtros = {
+        "especialidade ==": (
+            lambda: df_texto[df_texto["NOME ESPECIALIDADE"] == especialidade],
+            lambda: df_tipado[df_tipado["NOME ESPECIALIDADE"] == especialidade],
+        ),
+        "tipo isin": (
+            lambda: df_texto[df_texto["TIPO"].isin([tipo, "S"])],
+            lambda: df_tipado[df_tipado["TIPO"].isin([tipo, "S"])],
+        ),
+        "data >= (1a semana)": (
+            lambda: df_texto[pd.to_datetime(df_texto["DATA"], format="%d/%m/%Y") >= inicio + pd.Timedelta(days=7)],
+            lambda: df_tipado[df_tipado["DATA"] >= inicio + pd.Timedelta(days=7)],
+        ),
+        "contagem por unidade": (
+            lambda: df_texto["UNIDADE"].value_counts(),
+            lambda: df_tipado["UNIDADE"].value_counts(),
+        ),
+    }
+
+    print(f"\n{'filtro':<24} {'texto':>9} {'tipado':>9}")
+    for nome, (texto, tipado) in filtros.items():
+        t_texto = min(timeit.repeat(texto, number=5, repeat=3)) / 5
+        t_tipado = min(timeit.repeat(tipado, number=5, repeat=3)) / 5
+        print(f"{nome:<24} {t_texto * 1000:>7.1f}ms {t_tipado * 1000:>7.1f}ms  ({t_texto / t_tipado:.1f}x)")
+
+
+def main():
+    ic.disable()
+    repeticoes = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+
+    csvs = encontrar_csvs()
+    if not csvs:
+        print("Nenhum CSV em data/")
+        return
+
+    base = carregar_csv_sigh(csvs[0])
+    df_texto = pd.concat([base] * repeticoes, ignore_index=True)
+    df_tipado = tipar_dataframe_sigh(df_texto)
+
+    print(f"{len(df_texto)} linhas ({csvs[0].name} x{repeticoes})\n")
+    with pd.option_context("display.width", 120, "display.float_format", "{:.2f}".format):
+        print(relatorio_memoria(df_texto, df_tipado))
+
+    objeto = df_texto.astype(object).memory_usage(deep=True, index=False).sum() / 1024 / 1024
+    print(f"\n(referência: a mesma tabela em dtype object ocupa {objeto:.1f} MB)")
+
+    medir_filtros(df_texto, df_tipado)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark da normalização dos pacientes do SIGH.
+
+Compara a versão antiga (colunas convertidas em listas, list comprehensions
+de strip/upper/filter(str.isdigit) e zip/unzip) com normalizar_pacientes de
+src/load_sigh_data.py, num DataFrame sintético montado a partir do export
+real de data/ (default: 1 milhão de linhas).
+
+Uso:
+    python scripts/bench_normalizacao_sigh.py [linhas]
+"""
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import pandas as pd
+from icecream import ic
+
+from load_sigh_data import encontrar_csvs, carregar_csv_sigh, normalizar_pacientes
+
+
+def normalizar_legado(df: pd.DataFrame):
+    """Normalização antiga, baseada em listas (referência)"""
+    nome_paciente_list = df["NOME PACIENTE"].tolist()
+    matricula_list = df["MATRÍCULA"].tolist()
+
+    df["DATA"] = pd.to_datetime(df["DATA"], format="%d/%m/%Y", errors='coerce')
+    data_list = df["DATA"].tolist()
+
+    nome_paciente_list = [str(name).strip() for name in nome_paciente_list]
+    matricula_list = [str(matricula).strip() for matricula in matricula_list]
+    nome_paciente_list = [name.upper() for name in nome_paciente_list]
+    matricula_list = [''.join(filter(str.isdigit, matricula)) for matricula in matricula_list]
+
+    dados_validos = [
+        (nome, matricula, data)
+        for nome, matricula, data in zip(nome_paciente_list, matricula_list, data_list)
+        if matricula
+    ]
+
+    nome_paciente_list, matricula_list, data_list = zip(*dados_validos) if dados_validos else ([], [], [])
+    return list(nome_paciente_list), list(matricula_list), list(data_list)
+
+
+def montar_sintetico(origem: pd.DataFrame, linhas: int) -> pd.DataFrame:
+    """Repete as linhas do export até o tamanho pedido, com ruído nas matrículas"""
+    repeticoes = -(-linhas // len(origem))
+    df = pd.concat([origem] * repeticoes, ignore_index=True).iloc[:linhas].copy()
+
+    # Espaços e pontuação como nos exports antigos, e algumas matrículas vazias
+    df["NOME PACIENTE"] = " " + df["NOME PACIENTE"].str.lower() + " "
+    df["MATRÍCULA"] = df["MATRÍCULA"].str.slice(0, 3) + "." + df["MATRÍCULA"].str.slice(3) + "-"
+    df.loc[df.index % 997 == 0, "MATRÍCULA"] = " - "
+    return df
+
+
+def main():
+    ic.disable()
+    linhas = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+
+    csvs = encontrar_csvs()
+    if not csvs:
+        print("Nenhum CSV em data/")
+        return
+
+    base = montar_sintetico(carregar_csv_sigh(csvs[0]), linhas)
+
+    df = base.copy()
+    inicio = time.perf_counter()
+    nomes, matriculas, datas = normalizar_legado(df)
+    antigo = time.perf_counter() - inicio
+
+    df = base.copy()
+    inicio = time.perf_counter()
+    pacientes = normalizar_pacientes(df)
+    novo = time.perf_counter() - inicio
+
+    iguais = (
+        pacientes["nome"].tolist() == nomes
+        and pacientes["matricula"].tolist() == matriculas
+        and pacientes["data"].equals(pd.Series(datas, dtype=pacientes["data"].dtype))
+    )
+
+    print(f"{linhas} linhas ({len(matriculas)} válidas)")
+    print(f"antigo (listas)  {antigo:>7.3f}s")
+    print(f"novo (colunas)   {novo:>7.3f}s  ({antigo / novo:.1f}x)  resultados iguais: {iguais}")
+    print(f"memória: listas {sum(sys.getsizeof(x) for x in nomes + matriculas) / 1024 / 1024:.0f} MB "
+          f"(só as strings), colunas {pacientes.memory_usage(deep=True).sum() / 1024 / 1024:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Servidor local que imita o endpoint AMF do PEP com as respostas gravadas.
+
+Serve os arquivos de dados_pacientes/amf_debug para testar src/cliente_amf.py
+sem acesso ao PEP. O handshake (CommandMessage) recebe a resposta com DSId;
+cada operação de remoting recebe o arquivo configurado em --rota. As
+mensagens recebidas ficam em servidor.requisicoes, na ordem de chegada
+(usado por tests/test_cliente_amf.py).
+
+Uso:
+    python scripts/servidor_amf_fixture.py [--porta 8765] [--rota operacao=arquivo.bin ...]
+
+    # cliente AMF contra o servidor, com o roteiro de PEP_AMF_ROTEIRO (ou --roteiro)
+    python scripts/servidor_amf_fixture.py --demo --roteiro amf_roteiro.json \
+        [--rota operacao=arquivo.bin ...]
+"""
+
+import os
+import sys
+import json
+import argparse
+import threading
+from pathlib import Path
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from amf import decodificar_pacote
+
+
+FIXTURES_DIR = Path(__file__).parent.parent / "dados_pacientes" / "amf_debug"
+
+# Resposta do ping (AcknowledgeMessage com DSId) e resposta padrão das operações
+FIXTURE_PING = "13481038_amf_response_4.bin"
+FIXTURE_PADRAO = "13481038_amf_response_9.bin"
+
+
+def criar_handler(rotas: dict, requisicoes: list):
+    """Cria o handler HTTP com o mapa operação → bytes da resposta"""
+    ping = (FIXTURES_DIR / FIXTURE_PING).read_bytes()
+    padrao = (FIXTURES_DIR / FIXTURE_PADRAO).read_bytes()
+    respostas = {op: (FIXTURES_DIR / arquivo).read_bytes() for op, arquivo in rotas.items()}
+
+    class HandlerAMF(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive
+
+        def do_POST(self):
+            corpo = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            mensagem = decodificar_pacote(corpo)["mensagens"][0]["corpo"][0]
+            requisicoes.append(mensagem)
+
+            if mensagem["_classe"].endswith("CommandMessage"):
+                resposta = ping
+            else:
+                resposta = respostas.get(mensagem.get("operation"), padrao)
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-amf")
+            self.send_header("Content-Length", str(len(resposta)))
+            self.end_headers()
+            self.wfile.write(resposta)
+
+        def log_message(self, formato, *args):
+            print(f"[fixture] {self.address_string()} {formato % args}")
+
+    return HandlerAMF
+
+
+def iniciar_servidor(porta: int = 0, rotas: dict = None) -> ThreadingHTTPServer:
+    """Sobe o servidor em background e retorna a instância (porta em server_address)"""
+    requisicoes = []
+    servidor = ThreadingHTTPServer(("127.0.0.1", porta), criar_handler(rotas or {}, requisicoes))
+    servidor.requisicoes = requisicoes
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+def demo(roteiro: list, rotas: dict, prontuario: str, numero_atendimento: str):
+    """Roda o roteiro do cliente AMF contra o servidor local e mostra o dados_paciente"""
+    import time
+    from cliente_amf import ClienteAMF, capturar_dados_paciente_amf
+
+    servidor = iniciar_servidor(rotas=rotas)
+    url = f"http://127.0.0.1:{servidor.server_address[1]}/mvpep/messagebroker/amf"
+
+    cliente = ClienteAMF(url)
+    inicio = time.perf_counter()
+    dados_paciente = capturar_dados_paciente_amf(cliente, prontuario, numero_atendimento, roteiro)
+    decorrido = time.perf_counter() - inicio
+
+    print(json.dumps(dados_paciente, ensure_ascii=False, indent=2))
+    print(f"Handshake + {len(roteiro)} chamada(s) em {decorrido * 1000:.1f} ms")
+
+    cliente.fechar()
+    servidor.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Endpoint AMF local com as respostas gravadas")
+    parser.add_argument("--porta", type=int, default=8765)
+    parser.add_argument("--rota", action="append", default=[], help="operacao=arquivo.bin (em amf_debug)")
+    parser.add_argument("--demo", action="store_true", help="Roda o cliente contra o servidor e sai")
+    parser.add_argument("--roteiro", default=os.getenv("PEP_AMF_ROTEIRO"),
+                        help="Roteiro JSON do --demo (default: PEP_AMF_ROTEIRO)")
+    parser.add_argument("--prontuario", default="13481038", help="Prontuário do --demo")
+    parser.add_argument("--atendimento", default="9082530", help="Número do atendimento do --demo")
+    args = parser.parse_args()
+
+    rotas = dict(rota.split("=", 1) for rota in args.rota)
+
+    if args.demo:
+        if not args.roteiro:
+            parser.error("--demo exige --roteiro (ou PEP_AMF_ROTEIRO)")
+        with open(args.roteiro, "r", encoding="utf-8") as f:
+            demo(json.load(f), rotas, args.prontuario, args.atendimento)
+        return
+
+    servidor = iniciar_servidor(args.porta, rotas)
+    print(f"Servindo fixtures AMF em http://127.0.0.1:{args.porta}/ (Ctrl+C para sair)")
+
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        servidor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
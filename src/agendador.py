@@ -0,0 +1,182 @@
+"""
+Agendador da fila de pacientes: define a ordem de processamento do plano.
+
+Sem agendador, os pacientes são processados na ordem do CSV; numa execução
+parcial isso captura um prefixo arbitrário. Aqui o plano por paciente (ver
+load_sigh_data.planejar_por_paciente) é ordenado por uma chave configurável,
+montada com colunas do SIGH:
+
+- data: atendimento mais recente primeiro
+- especialidade: especialidades preferidas primeiro (NOME ESPECIALIDADE)
+- unidade: unidades preferidas primeiro (UNIDADE)
+
+Os critérios são combinados na ordem em que aparecem (ex. "especialidade,data").
+Independente da chave, matrículas com falha recente no checkpoint vão para o
+fim da fila, das falhas mais antigas para as mais novas. Empates mantêm a
+ordem do CSV.
+"""
+
+import os
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+from icecream import ic
+
+from checkpoint import indexar_checkpoint
+
+
+CRITERIOS_PRIORIDADE = ("data", "especialidade", "unidade")
+
+# Falhas mais novas que isso (horas) empurram a matrícula para o fim da fila
+JANELA_FALHAS_HORAS = 24
+
+
+def _ler_lista(variavel: str) -> List[str]:
+    """Lista separada por ';' de uma variável de ambiente (nomes têm espaços)"""
+    return [v.strip().upper() for v in os.getenv(variavel, "").split(";") if v.strip()]
+
+
+def ultimas_falhas(checkpoint: Dict, janela_horas: float = JANELA_FALHAS_HORAS) -> Dict[str, datetime]:
+    """
+    Matrículas com falha dentro da janela, sem sucesso posterior.
+
+    Args:
+        checkpoint: Dicionário do checkpoint
+        janela_horas: Idade máxima da falha para contar como recente
+
+    Returns:
+        Dicionário {matricula: horário da última falha}
+    """
+    if "_idx_processados" not in checkpoint:
+        indexar_checkpoint(checkpoint)
+
+    limite = datetime.now() - timedelta(hours=janela_horas)
+    processados = checkpoint["_idx_processados"]
+
+    falhas = {}
+    for registro in checkpoint.get("falhas", []):
+        matricula = registro.get("matricula")
+        if matricula in processados:
+            continue
+        try:
+            momento = datetime.fromisoformat(registro["timestamp"])
+        except (KeyError, ValueError):
+            continue
+        if momento >= limite:
+            falhas[matricula] = max(momento, falhas.get(matricula, momento))
+
+    return falhas
+
+
+def _posicao_preferida(listas: pd.Series, preferidos: List[str]) -> pd.Series:
+    """
+    Melhor posição de cada paciente na lista de preferidos.
+
+    Pacientes sem nenhum valor preferido ficam com len(preferidos). Sem lista
+    de preferidos, agrupa pelo menor valor em ordem alfabética.
+    """
+    valores = listas.explode().astype(str).str.upper()
+
+    if preferidos:
+        ranking = {valor: i for i, valor in enumerate(preferidos)}
+        posicoes = valores.map(ranking).fillna(len(preferidos))
+    else:
+        posicoes = valores
+
+    return posicoes.groupby(level=0).min().reindex(listas.index)
+
+
+def ordenar_plano(
+    plano: pd.DataFrame,
+    criterios: List[str],
+    falhas: Optional[Dict[str, datetime]] = None,
+    especialidades: Optional[List[str]] = None,
+    unidades: Optional[List[str]] = None
+) -> pd.DataFrame:
+    """
+    Ordena o plano por paciente pelos critérios de prioridade.
+
+    Args:
+        plano: Saída de planejar_por_paciente
+        criterios: Nomes em CRITERIOS_PRIORIDADE, do mais ao menos importante
+        falhas: {matricula: horário} das falhas recentes (vão para o fim)
+        especialidades: Especialidades preferidas, em ordem
+        unidades: Unidades preferidas, em ordem
+
+    Returns:
+        Novo DataFrame com as mesmas linhas, na ordem de processamento
+    """
+    chaves = pd.DataFrame(index=plano.index)
+    colunas = []
+    crescente = []
+
+    falhas = falhas or {}
+    momento_falha = plano["matricula"].map(falhas)
+    chaves["_falhou"] = momento_falha.notna()
+    chaves["_momento_falha"] = pd.to_datetime(momento_falha)
+    colunas += ["_falhou"]
+    crescente += [True]
+
+    for criterio in criterios:
+        if criterio == "data":
+            chaves["_data"] = plano["datas"].map(lambda datas: max(datas) if datas else pd.NaT)
+            chaves["_data"] = pd.to_datetime(chaves["_data"])
+            colunas.append("_data")
+            crescente.append(False)
+        elif criterio in ("especialidade", "unidade"):
+            coluna = criterio + "s"
+            if coluna not in plano.columns:
+                ic(f"⚠️ Plano sem a coluna {coluna}, critério '{criterio}' ignorado")
+                continue
+            preferidos = especialidades if criterio == "especialidade" else unidades
+            chaves["_" + criterio] = _posicao_preferida(plano[coluna], preferidos or [])
+            colunas.append("_" + criterio)
+            crescente.append(True)
+        else:
+            raise ValueError(f"Critério de prioridade inválido: {criterio} (use {CRITERIOS_PRIORIDADE})")
+
+    colunas.append("_momento_falha")
+    crescente.append(True)
+
+    ordem = chaves.sort_values(colunas, ascending=crescente, kind="stable", na_position="last").index
+    return plano.loc[ordem].reset_index(drop=True)
+
+
+def criar_agendamento(checkpoint: Optional[Dict] = None) -> Callable[[pd.DataFrame], pd.DataFrame]:
+    """
+    Cria a função de ordenação do plano a partir do .env.
+
+    Variáveis de ambiente:
+        PEP_PRIORIDADE: critérios separados por vírgula (ex. "data" ou
+            "especialidade,data"); vazio mantém a ordem do CSV
+        PEP_PRIORIDADE_ESPECIALIDADES: especialidades preferidas, separadas por ';'
+        PEP_PRIORIDADE_UNIDADES: unidades preferidas, separadas por ';'
+        PEP_PRIORIDADE_JANELA_FALHAS: horas em que uma falha adia a matrícula
+
+    Args:
+        checkpoint: Checkpoint já carregado pelo chamador (o mesmo que vai para
+            processar_lista_pacientes; não é relido do disco). Sem ele, as
+            falhas recentes não mudam a ordem
+
+    Returns:
+        Função plano -> plano ordenado (para carregar_dados_sigh)
+    """
+    criterios = [c.strip().lower() for c in os.getenv("PEP_PRIORIDADE", "").split(",") if c.strip()]
+    for criterio in criterios:
+        if criterio not in CRITERIOS_PRIORIDADE:
+            raise ValueError(f"PEP_PRIORIDADE inválido: {criterio} (use {CRITERIOS_PRIORIDADE})")
+
+    especialidades = _ler_lista("PEP_PRIORIDADE_ESPECIALIDADES")
+    unidades = _ler_lista("PEP_PRIORIDADE_UNIDADES")
+    janela = float(os.getenv("PEP_PRIORIDADE_JANELA_FALHAS", JANELA_FALHAS_HORAS))
+
+    def ordenar(plano: pd.DataFrame) -> pd.DataFrame:
+        falhas = ultimas_falhas(checkpoint, janela) if checkpoint is not None else {}
+
+        ic(f"Agendador: prioridade {', '.join(criterios) or 'ordem do CSV'}; "
+           f"{len(falhas)} matrícula(s) com falha recente para o fim da fila")
+
+        return ordenar_plano(plano, criterios, falhas, especialidades, unidades)
+
+    return ordenar
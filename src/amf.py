@@ -0,0 +1,753 @@
+"""
+Decodificador AMF0/AMF3 para as respostas de remoting (Flex/BlazeDS) do PEP.
+
+O back-end do PEP (AppDocumentoEletronicoController) responde em AMF: um
+pacote AMF0 cujo corpo troca para AMF3 (marcador 0x11). O decodificador lê
+de qualquer stream binário (arquivo, BytesIO, corpo HTTP) sem carregar tudo
+em memória e mantém as tabelas de referência de strings, objetos e traits
+exigidas pelo AMF3.
+
+Objetos tipados viram dicts com a chave "_classe". As mensagens compactas
+do BlazeDS (DSK, DSA, DSC) são expandidas para o formato das classes
+completas (AcknowledgeMessage, AsyncMessage, CommandMessage).
+
+O codificador (EscritorAMF3/codificar_pacote) monta as requisições enviadas
+pelo cliente de remoting (ver cliente_amf.py).
+
+Uso:
+    python src/amf.py dados_pacientes/amf_debug/*.bin
+    python src/amf.py --json dados_pacientes/amf_debug/13481038_amf_response_9.bin
+"""
+
+import io
+import sys
+import json
+import uuid
+import struct
+import argparse
+from pathlib import Path
+from typing import Any, Dict, List, Union, BinaryIO
+from datetime import datetime, timezone
+
+
+# ============================================================================
+# CONSTANTES
+# ============================================================================
+
+# Marcadores AMF0
+AMF0_NUMERO = 0x00
+AMF0_BOOLEANO = 0x01
+AMF0_STRING = 0x02
+AMF0_OBJETO = 0x03
+AMF0_NULO = 0x05
+AMF0_INDEFINIDO = 0x06
+AMF0_REFERENCIA = 0x07
+AMF0_ARRAY_ECMA = 0x08
+AMF0_FIM_OBJETO = 0x09
+AMF0_ARRAY_ESTRITO = 0x0A
+AMF0_DATA = 0x0B
+AMF0_STRING_LONGA = 0x0C
+AMF0_NAO_SUPORTADO = 0x0D
+AMF0_XML = 0x0F
+AMF0_OBJETO_TIPADO = 0x10
+AMF0_AMF3 = 0x11
+
+# Marcadores AMF3
+AMF3_INDEFINIDO = 0x00
+AMF3_NULO = 0x01
+AMF3_FALSO = 0x02
+AMF3_VERDADEIRO = 0x03
+AMF3_INTEIRO = 0x04
+AMF3_DOUBLE = 0x05
+AMF3_STRING = 0x06
+AMF3_XML_DOC = 0x07
+AMF3_DATA = 0x08
+AMF3_ARRAY = 0x09
+AMF3_OBJETO = 0x0A
+AMF3_XML = 0x0B
+AMF3_BYTE_ARRAY = 0x0C
+AMF3_VETOR_INT = 0x0D
+AMF3_VETOR_UINT = 0x0E
+AMF3_VETOR_DOUBLE = 0x0F
+AMF3_VETOR_OBJETO = 0x10
+AMF3_DICIONARIO = 0x11
+
+# Aliases compactos do BlazeDS → classe completa
+MENSAGENS_COMPACTAS = {
+    "DSK": "flex.messaging.messages.AcknowledgeMessage",
+    "DSA": "flex.messaging.messages.AsyncMessage",
+    "DSC": "flex.messaging.messages.CommandMessage",
+}
+
+# Campos de cada byte de flags do AbstractMessage, na ordem de leitura
+CAMPOS_ABSTRACT_MESSAGE = [
+    ["body", "clientId", "destination", "headers", "messageId", "timestamp", "timeToLive"],
+    ["clientIdBytes", "messageIdBytes"],
+]
+CAMPOS_ASYNC_MESSAGE = [["correlationId", "correlationIdBytes"]]
+CAMPOS_COMMAND_MESSAGE = [["operation"]]
+
+# Coleções externalizáveis que só embrulham outro valor
+PROXIES_EXTERNALIZAVEIS = {
+    "flex.messaging.io.ArrayCollection",
+    "flex.messaging.io.ObjectProxy",
+    "mx.collections.ArrayCollection",
+    "mx.utils.ObjectProxy",
+}
+
+_DOUBLE = struct.Struct(">d")
+_U16 = struct.Struct(">H")
+_U32 = struct.Struct(">I")
+_S32 = struct.Struct(">i")
+
+
+class ErroAMF(ValueError):
+    """Payload AMF inválido ou truncado"""
+
+
+# ============================================================================
+# LEITURA BÁSICA
+# ============================================================================
+
+class _Stream:
+    """Leitura sequencial de um stream binário com erro em caso de truncamento"""
+
+    def __init__(self, stream: BinaryIO):
+        self._stream = stream
+
+    def ler(self, n: int) -> bytes:
+        dados = self._stream.read(n)
+        if len(dados) != n:
+            raise ErroAMF(f"Payload truncado: esperados {n} bytes, lidos {len(dados)}")
+        return dados
+
+    def ler_u8(self) -> int:
+        return self.ler(1)[0]
+
+    def ler_u16(self) -> int:
+        return _U16.unpack(self.ler(2))[0]
+
+    def ler_u32(self) -> int:
+        return _U32.unpack(self.ler(4))[0]
+
+    def ler_double(self) -> float:
+        return _DOUBLE.unpack(self.ler(8))[0]
+
+    def ler_utf8(self, n: int) -> str:
+        return self.ler(n).decode("utf-8")
+
+
+def _abrir(dados: Union[bytes, bytearray, BinaryIO]) -> _Stream:
+    """Aceita bytes ou um stream binário já aberto"""
+    if isinstance(dados, (bytes, bytearray, memoryview)):
+        dados = io.BytesIO(dados)
+    return _Stream(dados)
+
+
+def _data_ms(ms: float) -> datetime:
+    """Converte milissegundos desde a epoch (UTC) em datetime"""
+    return datetime.fromtimestamp(ms / 1000, tz=timezone.utc)
+
+
+# ============================================================================
+# AMF3
+# ============================================================================
+
+class LeitorAMF3:
+    """
+    Decodificador AMF3 com tabelas de referência.
+
+    Uma instância corresponde a um corpo de mensagem: as tabelas de strings,
+    objetos e traits valem só dentro dele.
+
+    Args:
+        stream: Stream binário posicionado no primeiro marcador AMF3
+    """
+
+    def __init__(self, stream: Union[_Stream, BinaryIO]):
+        self.stream = stream if isinstance(stream, _Stream) else _Stream(stream)
+        self.strings: List[str] = []
+        self.objetos: List[Any] = []
+        self.traits: List[Dict] = []
+
+    def ler_u29(self) -> int:
+        """Inteiro variável de até 29 bits (U29)"""
+        ler_u8 = self.stream.ler_u8
+        valor = 0
+        for _ in range(3):
+            b = ler_u8()
+            if b < 0x80:
+                return (valor << 7) | b
+            valor = (valor << 7) | (b & 0x7F)
+        return (valor << 8) | ler_u8()
+
+    def ler_inteiro(self) -> int:
+        """Inteiro AMF3 (U29 com sinal)"""
+        valor = self.ler_u29()
+        return valor - (1 << 29) if valor & 0x10000000 else valor
+
+    def ler_string(self) -> str:
+        """String AMF3 (sem marcador), resolvendo referências"""
+        ref = self.ler_u29()
+        if not ref & 1:
+            return self.strings[ref >> 1]
+
+        tamanho = ref >> 1
+        if tamanho == 0:
+            return ""
+
+        valor = self.stream.ler_utf8(tamanho)
+        self.strings.append(valor)
+        return valor
+
+    def ler_valor(self) -> Any:
+        """Lê um valor AMF3 completo (marcador + dados)"""
+        marcador = self.stream.ler_u8()
+
+        if marcador == AMF3_STRING:
+            return self.ler_string()
+        if marcador == AMF3_OBJETO:
+            return self._ler_objeto()
+        if marcador == AMF3_INTEIRO:
+            return self.ler_inteiro()
+        if marcador == AMF3_NULO or marcador == AMF3_INDEFINIDO:
+            return None
+        if marcador == AMF3_FALSO:
+            return False
+        if marcador == AMF3_VERDADEIRO:
+            return True
+        if marcador == AMF3_DOUBLE:
+            return self.stream.ler_double()
+        if marcador == AMF3_ARRAY:
+            return self._ler_array()
+        if marcador == AMF3_DATA:
+            return self._ler_data()
+        if marcador == AMF3_BYTE_ARRAY:
+            return self._ler_byte_array()
+        if marcador in (AMF3_XML_DOC, AMF3_XML):
+            return self._ler_xml()
+        if marcador in (AMF3_VETOR_INT, AMF3_VETOR_UINT, AMF3_VETOR_DOUBLE, AMF3_VETOR_OBJETO):
+            return self._ler_vetor(marcador)
+        if marcador == AMF3_DICIONARIO:
+            return self._ler_dicionario()
+
+        raise ErroAMF(f"Marcador AMF3 desconhecido: 0x{marcador:02x}")
+
+    def _referencia(self):
+        """Lê o cabeçalho U29 de um tipo por referência: (é_referência, valor)"""
+        ref = self.ler_u29()
+        if not ref & 1:
+            return True, self.objetos[ref >> 1]
+        return False, ref >> 1
+
+    def _ler_data(self) -> datetime:
+        eh_ref, valor = self._referencia()
+        if eh_ref:
+            return valor
+        data = _data_ms(self.stream.ler_double())
+        self.objetos.append(data)
+        return data
+
+    def _ler_xml(self) -> str:
+        eh_ref, tamanho = self._referencia()
+        if eh_ref:
+            return tamanho
+        xml = self.stream.ler_utf8(tamanho)
+        self.objetos.append(xml)
+        return xml
+
+    def _ler_byte_array(self) -> bytes:
+        eh_ref, tamanho = self._referencia()
+        if eh_ref:
+            return tamanho
+        dados = self.stream.ler(tamanho)
+        self.objetos.append(dados)
+        return dados
+
+    def _ler_array(self) -> Union[List, Dict]:
+        eh_ref, tamanho = self._referencia()
+        if eh_ref:
+            return tamanho
+
+        chave = self.ler_string()
+        if not chave:
+            # Array denso (caso comum): lista Python
+            lista: List = []
+            self.objetos.append(lista)
+            for _ in range(tamanho):
+                lista.append(self.ler_valor())
+            return lista
+
+        # Array associativo: dict com as chaves e os índices densos
+        mapa: Dict = {}
+        self.objetos.append(mapa)
+        while chave:
+            mapa[chave] = self.ler_valor()
+            chave = self.ler_string()
+        for i in range(tamanho):
+            mapa[i] = self.ler_valor()
+        return mapa
+
+    def _ler_vetor(self, marcador: int) -> List:
+        eh_ref, tamanho = self._referencia()
+        if eh_ref:
+            return tamanho
+
+        self.stream.ler_u8()  # fixed-length
+        vetor: List = []
+        self.objetos.append(vetor)
+
+        if marcador == AMF3_VETOR_INT:
+            vetor.extend(_S32.unpack(self.stream.ler(4))[0] for _ in range(tamanho))
+        elif marcador == AMF3_VETOR_UINT:
+            vetor.extend(_U32.unpack(self.stream.ler(4))[0] for _ in range(tamanho))
+        elif marcador == AMF3_VETOR_DOUBLE:
+            vetor.extend(self.stream.ler_double() for _ in range(tamanho))
+        else:
+            self.ler_string()  # nome do tipo dos itens
+            vetor.extend(self.ler_valor() for _ in range(tamanho))
+        return vetor
+
+    def _ler_dicionario(self) -> Dict:
+        eh_ref, tamanho = self._referencia()
+        if eh_ref:
+            return tamanho
+
+        self.stream.ler_u8()  # weak-keys
+        mapa: Dict = {}
+        self.objetos.append(mapa)
+        for _ in range(tamanho):
+            chave = self.ler_valor()
+            mapa[chave if isinstance(chave, (str, int, float, bool)) else repr(chave)] = self.ler_valor()
+        return mapa
+
+    def _ler_traits(self, ref: int) -> Dict:
+        """Lê (ou resolve por referência) a descrição da classe de um objeto"""
+        if not ref & 1:
+            return self.traits[ref >> 1]
+
+        externalizavel = bool(ref & 2)
+        dinamico = bool(ref & 4)
+        n_selados = ref >> 3
+
+        traits = {
+            "classe": self.ler_string(),
+            "externalizavel": externalizavel,
+            "dinamico": dinamico,
+            "membros": [] if externalizavel else [self.ler_string() for _ in range(n_selados)]
+        }
+        self.traits.append(traits)
+        return traits
+
+    def _ler_objeto(self) -> Any:
+        ref = self.ler_u29()
+        if not ref & 1:
+            return self.objetos[ref >> 1]
+
+        traits = self._ler_traits(ref >> 1)
+        classe = traits["classe"]
+
+        if traits["externalizavel"]:
+            return self._ler_externalizavel(classe)
+
+        objeto: Dict = {"_classe": classe} if classe else {}
+        self.objetos.append(objeto)
+
+        for membro in traits["membros"]:
+            objeto[membro] = self.ler_valor()
+
+        if traits["dinamico"]:
+            chave = self.ler_string()
+            while chave:
+                objeto[chave] = self.ler_valor()
+                chave = self.ler_string()
+
+        return objeto
+
+    # ------------------------------------------------------------------
+    # Externalizáveis
+    # ------------------------------------------------------------------
+
+    def _ler_externalizavel(self, classe: str) -> Any:
+        if classe in PROXIES_EXTERNALIZAVEIS:
+            # A referência do objeto é a do proxy; o valor interno tem a sua
+            indice = len(self.objetos)
+            self.objetos.append(None)
+            valor = self.ler_valor()
+            self.objetos[indice] = valor
+            return valor
+
+        if classe in MENSAGENS_COMPACTAS:
+            mensagem: Dict = {"_classe": MENSAGENS_COMPACTAS[classe]}
+            self.objetos.append(mensagem)
+
+            self._ler_campos_com_flags(mensagem, CAMPOS_ABSTRACT_MESSAGE)
+            self._ler_campos_com_flags(mensagem, CAMPOS_ASYNC_MESSAGE)
+            if classe == "DSC":
+                self._ler_campos_com_flags(mensagem, CAMPOS_COMMAND_MESSAGE)
+            elif classe == "DSK":
+                self._ler_campos_com_flags(mensagem, [])
+
+            for campo in ("clientId", "messageId", "correlationId"):
+                bruto = mensagem.pop(campo + "Bytes", None)
+                if isinstance(bruto, bytes) and len(bruto) == 16:
+                    mensagem[campo] = str(uuid.UUID(bytes=bruto)).upper()
+            return mensagem
+
+        raise ErroAMF(f"Classe externalizável não suportada: {classe}")
+
+    def _ler_flags(self) -> List[int]:
+        """Bytes de flags do BlazeDS: o bit 0x80 indica que há mais um byte"""
+        flags = []
+        while True:
+            b = self.stream.ler_u8()
+            flags.append(b)
+            if not b & 0x80:
+                return flags
+
+    def _ler_campos_com_flags(self, mensagem: Dict, campos: List[List[str]]):
+        """Lê os campos marcados nas flags; bits desconhecidos são lidos e descartados"""
+        for i, flags in enumerate(self._ler_flags()):
+            nomes = campos[i] if i < len(campos) else []
+            for bit in range(7):
+                if not (flags >> bit) & 1:
+                    continue
+                valor = self.ler_valor()
+                if bit < len(nomes):
+                    mensagem[nomes[bit]] = valor
+
+
+def decodificar_amf3(dados: Union[bytes, BinaryIO]) -> Any:
+    """
+    Decodifica um único valor AMF3.
+
+    Args:
+        dados: Bytes ou stream binário
+
+    Returns:
+        Valor Python correspondente
+    """
+    return LeitorAMF3(_abrir(dados)).ler_valor()
+
+
+# ============================================================================
+# AMF0
+# ============================================================================
+
+class LeitorAMF0:
+    """
+    Decodificador AMF0 (envelope do pacote de remoting).
+
+    Ao encontrar o marcador 0x11 troca para AMF3, reaproveitando as tabelas
+    AMF3 dentro da mesma mensagem.
+
+    Args:
+        stream: Stream binário posicionado no primeiro marcador AMF0
+    """
+
+    def __init__(self, stream: Union[_Stream, BinaryIO]):
+        self.stream = stream if isinstance(stream, _Stream) else _Stream(stream)
+        self.objetos: List[Any] = []
+        self.amf3 = LeitorAMF3(self.stream)
+
+    def ler_string(self) -> str:
+        return self.stream.ler_utf8(self.stream.ler_u16())
+
+    def _ler_pares(self, objeto: Dict) -> Dict:
+        while True:
+            chave = self.ler_string()
+            marcador = self.stream.ler_u8()
+            if not chave and marcador == AMF0_FIM_OBJETO:
+                return objeto
+            objeto[chave] = self._ler_por_marcador(marcador)
+
+    def ler_valor(self) -> Any:
+        """Lê um valor AMF0 completo (marcador + dados)"""
+        return self._ler_por_marcador(self.stream.ler_u8())
+
+    def _ler_por_marcador(self, marcador: int) -> Any:
+        if marcador == AMF0_AMF3:
+            return self.amf3.ler_valor()
+        if marcador == AMF0_NUMERO:
+            return self.stream.ler_double()
+        if marcador == AMF0_BOOLEANO:
+            return self.stream.ler_u8() != 0
+        if marcador == AMF0_STRING:
+            return self.ler_string()
+        if marcador in (AMF0_NULO, AMF0_INDEFINIDO, AMF0_NAO_SUPORTADO):
+            return None
+        if marcador == AMF0_OBJETO:
+            objeto: Dict = {}
+            self.objetos.append(objeto)
+            return self._ler_pares(objeto)
+        if marcador == AMF0_OBJETO_TIPADO:
+            objeto = {"_classe": self.ler_string()}
+            self.objetos.append(objeto)
+            return self._ler_pares(objeto)
+        if marcador == AMF0_ARRAY_ECMA:
+            self.stream.ler_u32()  # contagem (só indicativa)
+            objeto = {}
+            self.objetos.append(objeto)
+            return self._ler_pares(objeto)
+        if marcador == AMF0_ARRAY_ESTRITO:
+            lista: List = []
+            self.objetos.append(lista)
+            for _ in range(self.stream.ler_u32()):
+                lista.append(self.ler_valor())
+            return lista
+        if marcador == AMF0_REFERENCIA:
+            return self.objetos[self.stream.ler_u16()]
+        if marcador == AMF0_DATA:
+            data = _data_ms(self.stream.ler_double())
+            self.stream.ler(2)  # fuso (não usado)
+            return data
+        if marcador in (AMF0_STRING_LONGA, AMF0_XML):
+            return self.stream.ler_utf8(self.stream.ler_u32())
+
+        raise ErroAMF(f"Marcador AMF0 desconhecido: 0x{marcador:02x}")
+
+
+def decodificar_pacote(dados: Union[bytes, BinaryIO]) -> Dict:
+    """
+    Decodifica um pacote de remoting AMF (requisição ou resposta).
+
+    Args:
+        dados: Bytes ou stream binário com o pacote completo
+
+    Returns:
+        {"versao": int, "cabecalhos": [...], "mensagens": [{"alvo", "resposta", "corpo"}]}
+    """
+    stream = _abrir(dados)
+    pacote = {"versao": stream.ler_u16(), "cabecalhos": [], "mensagens": []}
+
+    for _ in range(stream.ler_u16()):
+        nome = LeitorAMF0(stream).ler_string()
+        obrigatorio = stream.ler_u8() != 0
+        stream.ler_u32()  # tamanho (pode ser 0xFFFFFFFF = desconhecido)
+        pacote["cabecalhos"].append({
+            "nome": nome,
+            "obrigatorio": obrigatorio,
+            "valor": LeitorAMF0(stream).ler_valor()
+        })
+
+    for _ in range(stream.ler_u16()):
+        leitor = LeitorAMF0(stream)
+        alvo = leitor.ler_string()
+        resposta = leitor.ler_string()
+        stream.ler_u32()  # tamanho (pode ser 0xFFFFFFFF = desconhecido)
+        pacote["mensagens"].append({
+            "alvo": alvo,
+            "resposta": resposta,
+            "corpo": leitor.ler_valor()
+        })
+
+    return pacote
+
+
+def decodificar_arquivo(caminho: Union[str, Path]) -> Dict:
+    """Decodifica um pacote AMF salvo em disco (ex.: amf_debug/*.bin)"""
+    with open(caminho, "rb") as f:
+        pacote = decodificar_pacote(f)
+        if f.read(1):
+            raise ErroAMF(f"Bytes sobrando após o pacote em {caminho}")
+    return pacote
+
+
+# ============================================================================
+# CODIFICAÇÃO
+# ============================================================================
+
+# Faixa dos inteiros AMF3 (29 bits com sinal); fora dela vira double
+_INTEIRO_MIN = -(1 << 28)
+_INTEIRO_MAX = (1 << 28) - 1
+
+
+class EscritorAMF3:
+    """
+    Codificador AMF3 (usado para montar as requisições de remoting).
+
+    Dicts com "_classe" viram objetos selados dessa classe (as demais chaves,
+    na ordem, são os membros); dicts sem "_classe" viram objetos anônimos
+    dinâmicos. Strings e traits repetidas são enviadas por referência.
+    """
+
+    def __init__(self):
+        self.buffer = io.BytesIO()
+        self.strings: Dict[str, int] = {}
+        self.traits: Dict[tuple, int] = {}
+
+    def getvalue(self) -> bytes:
+        return self.buffer.getvalue()
+
+    def escrever_u29(self, valor: int):
+        """Inteiro variável de até 29 bits (U29)"""
+        valor &= 0x1FFFFFFF
+        if valor < 0x80:
+            self.buffer.write(bytes((valor,)))
+        elif valor < 0x4000:
+            self.buffer.write(bytes(((valor >> 7) | 0x80, valor & 0x7F)))
+        elif valor < 0x200000:
+            self.buffer.write(bytes(((valor >> 14) | 0x80, ((valor >> 7) & 0x7F) | 0x80, valor & 0x7F)))
+        else:
+            self.buffer.write(bytes((
+                (valor >> 22) | 0x80, ((valor >> 15) & 0x7F) | 0x80,
+                ((valor >> 8) & 0x7F) | 0x80, valor & 0xFF
+            )))
+
+    def escrever_string(self, valor: str):
+        """String AMF3 (sem marcador), usando a tabela de referências"""
+        if not valor:
+            self.buffer.write(b"\x01")
+            return
+        if valor in self.strings:
+            self.escrever_u29(self.strings[valor] << 1)
+            return
+
+        self.strings[valor] = len(self.strings)
+        dados = valor.encode("utf-8")
+        self.escrever_u29((len(dados) << 1) | 1)
+        self.buffer.write(dados)
+
+    def escrever_valor(self, valor: Any):
+        """Escreve um valor AMF3 completo (marcador + dados)"""
+        escrever = self.buffer.write
+
+        if valor is None:
+            escrever(bytes((AMF3_NULO,)))
+        elif valor is True:
+            escrever(bytes((AMF3_VERDADEIRO,)))
+        elif valor is False:
+            escrever(bytes((AMF3_FALSO,)))
+        elif isinstance(valor, int) and _INTEIRO_MIN <= valor <= _INTEIRO_MAX:
+            escrever(bytes((AMF3_INTEIRO,)))
+            self.escrever_u29(valor)
+        elif isinstance(valor, (int, float)):
+            escrever(bytes((AMF3_DOUBLE,)))
+            escrever(_DOUBLE.pack(valor))
+        elif isinstance(valor, str):
+            escrever(bytes((AMF3_STRING,)))
+            self.escrever_string(valor)
+        elif isinstance(valor, datetime):
+            escrever(bytes((AMF3_DATA,)))
+            self.escrever_u29(1)
+            escrever(_DOUBLE.pack(valor.timestamp() * 1000))
+        elif isinstance(valor, (bytes, bytearray)):
+            escrever(bytes((AMF3_BYTE_ARRAY,)))
+            self.escrever_u29((len(valor) << 1) | 1)
+            escrever(valor)
+        elif isinstance(valor, (list, tuple)):
+            escrever(bytes((AMF3_ARRAY,)))
+            self.escrever_u29((len(valor) << 1) | 1)
+            self.escrever_string("")
+            for item in valor:
+                self.escrever_valor(item)
+        elif isinstance(valor, dict):
+            escrever(bytes((AMF3_OBJETO,)))
+            self._escrever_objeto(valor)
+        else:
+            raise ErroAMF(f"Tipo não suportado na codificação AMF3: {type(valor).__name__}")
+
+    def _escrever_objeto(self, objeto: Dict):
+        classe = objeto.get("_classe", "")
+        membros = tuple(k for k in objeto if k != "_classe") if classe else ()
+        chave_traits = (classe, membros)
+
+        if chave_traits in self.traits:
+            # Referência de traits: bits 01 (objeto inline, traits por referência)
+            self.escrever_u29((self.traits[chave_traits] << 2) | 1)
+        else:
+            self.traits[chave_traits] = len(self.traits)
+            dinamico = 0 if classe else 1
+            self.escrever_u29((len(membros) << 4) | (dinamico << 3) | 0b011)
+            self.escrever_string(classe)
+            for membro in membros:
+                self.escrever_string(membro)
+
+        if classe:
+            for membro in membros:
+                self.escrever_valor(objeto[membro])
+            return
+
+        for chave, valor in objeto.items():
+            self.escrever_string(str(chave))
+            self.escrever_valor(valor)
+        self.escrever_string("")
+
+
+def codificar_pacote(mensagens: List[Dict], versao: int = 3) -> bytes:
+    """
+    Codifica um pacote de remoting AMF no formato enviado pelos clientes Flex.
+
+    Cada corpo vai como array AMF0 de um elemento contendo o valor em AMF3.
+
+    Args:
+        mensagens: Lista de {"alvo", "resposta", "corpo"}
+        versao: Versão do pacote AMF
+
+    Returns:
+        Bytes do pacote
+    """
+    saida = io.BytesIO()
+    saida.write(_U16.pack(versao))
+    saida.write(_U16.pack(0))  # sem cabeçalhos
+    saida.write(_U16.pack(len(mensagens)))
+
+    for mensagem in mensagens:
+        escritor = EscritorAMF3()
+        escritor.escrever_valor(mensagem["corpo"])
+        corpo = bytes((AMF0_ARRAY_ESTRITO,)) + _U32.pack(1) + bytes((AMF0_AMF3,)) + escritor.getvalue()
+
+        for texto in (mensagem.get("alvo") or "null", mensagem.get("resposta", "")):
+            dados = texto.encode("utf-8")
+            saida.write(_U16.pack(len(dados)))
+            saida.write(dados)
+        saida.write(_U32.pack(len(corpo)))
+        saida.write(corpo)
+
+    return saida.getvalue()
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+def _serializar(valor: Any) -> Any:
+    """default= do json.dump para bytes e datetime"""
+    if isinstance(valor, bytes):
+        return valor.hex()
+    if isinstance(valor, datetime):
+        return valor.isoformat()
+    return str(valor)
+
+
+def main():
+    """Decodifica os arquivos informados e mostra um resumo (ou o JSON completo)"""
+    parser = argparse.ArgumentParser(description="Decodificador de pacotes AMF do PEP")
+    parser.add_argument("arquivos", nargs="+", help="Arquivos .bin com pacotes AMF")
+    parser.add_argument("--json", action="store_true", help="Imprimir o conteúdo decodificado")
+    args = parser.parse_args()
+
+    falhas = 0
+    for caminho in args.arquivos:
+        try:
+            pacote = decodificar_arquivo(caminho)
+        except (ErroAMF, IndexError, UnicodeDecodeError) as e:
+            print(f"❌ {caminho}: {e}")
+            falhas += 1
+            continue
+
+        if args.json:
+            json.dump(pacote, sys.stdout, ensure_ascii=False, indent=2, default=_serializar)
+            print()
+            continue
+
+        for mensagem in pacote["mensagens"]:
+            corpo = mensagem["corpo"]
+            classe = corpo.get("_classe", type(corpo).__name__) if isinstance(corpo, dict) else type(corpo).__name__
+            print(f"✓ {Path(caminho).name}: {mensagem['alvo']} → {classe}")
+
+    sys.exit(1 if falhas else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""
+Cache de ingestão dos CSVs do SIGH em Parquet.
+
+Cada export já lido é guardado em data/cache/<nome>_<hash>.parquet e
+registrado em data/cache/manifesto.json com caminho, tamanho, mtime e hash
+(SHA-256) do conteúdo. Na próxima execução:
+
+- tamanho e mtime iguais ao manifesto → Parquet direto, sem ler o CSV;
+- tamanho igual mas mtime diferente → confere o hash; se bater, só atualiza
+  o mtime no manifesto (arquivo copiado/tocado sem mudança de conteúdo);
+- caso contrário → o CSV é parseado de novo e o Parquet substituído.
+
+O manifesto guarda também a versão do próprio formato e a do parser
+(load_sigh_data.VERSAO_PARSER): se alguma mudou, o cache inteiro é
+descartado. Entradas de CSVs apagados e Parquets órfãos são removidos ao
+fim de cada carga (ver podar_cache).
+"""
+
+import os
+import json
+import hashlib
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+import pandas as pd
+from icecream import ic
+
+
+NOME_MANIFESTO = "manifesto.json"
+
+# Versão do formato do manifesto/Parquet (incrementar ao mudar o layout)
+VERSAO_MANIFESTO = 2
+
+# Blocos de leitura do hash
+TAMANHO_BLOCO_HASH = 1024 * 1024
+
+_lock_manifesto = threading.Lock()
+
+
+def get_cache_dir(data_dir: Optional[Path] = None) -> Path:
+    """Diretório do cache (default: data/cache na raiz do projeto)"""
+    if data_dir is None:
+        data_dir = Path(__file__).parent.parent / "data"
+    return Path(data_dir) / "cache"
+
+
+def hash_arquivo(caminho: Path) -> str:
+    """SHA-256 do conteúdo do arquivo (lido em blocos)"""
+    digest = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(TAMANHO_BLOCO_HASH), b""):
+            digest.update(bloco)
+    return digest.hexdigest()
+
+
+def _chave(csv_file: Path) -> str:
+    """Chave do CSV no manifesto (caminho absoluto)"""
+    return str(Path(csv_file).resolve())
+
+
+def carregar_manifesto(cache_dir: Path, versao_parser: int = 0) -> Dict:
+    """
+    Carrega o manifesto do cache.
+
+    Args:
+        cache_dir: Diretório do cache
+        versao_parser: Versão atual do parser dos CSVs
+
+    Returns:
+        Dicionário {caminho_csv: {"tamanho", "mtime", "hash", "parquet"}},
+        vazio se o manifesto for de outra versão do formato ou do parser
+    """
+    manifesto_file = Path(cache_dir) / NOME_MANIFESTO
+
+    if not manifesto_file.exists():
+        return {}
+
+    try:
+        with open(manifesto_file, "r", encoding="utf-8") as f:
+            conteudo = json.load(f)
+    except Exception as e:
+        ic(f"⚠️ Manifesto do cache ilegível, ignorando: {e}")
+        return {}
+
+    if conteudo.get("formato") != VERSAO_MANIFESTO or conteudo.get("versao_parser") != versao_parser:
+        ic("↻ Cache gravado por outra versão do parser, relendo os CSVs")
+        return {}
+
+    return conteudo.get("arquivos", {})
+
+
+def salvar_manifesto(manifesto: Dict, cache_dir: Path, versao_parser: int = 0):
+    """Salva o manifesto de forma atômica, com as versões do formato e do parser"""
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    manifesto_file = cache_dir / NOME_MANIFESTO
+    tmp_file = manifesto_file.with_suffix(".json.tmp")
+
+    with _lock_manifesto:
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump(
+                {"formato": VERSAO_MANIFESTO, "versao_parser": versao_parser, "arquivos": manifesto},
+                f, ensure_ascii=False, indent=4
+            )
+        os.replace(tmp_file, manifesto_file)
+
+
+def consultar_cache(manifesto: Dict, csv_file: Path, cache_dir: Path) -> Optional[pd.DataFrame]:
+    """
+    Retorna o DataFrame em cache de um CSV, se o arquivo não mudou.
+
+    Args:
+        manifesto: Manifesto carregado (atualizado se só o mtime mudou)
+        csv_file: CSV de origem
+        cache_dir: Diretório do cache
+
+    Returns:
+        DataFrame lido do Parquet, ou None se o CSV é novo ou mudou
+    """
+    entrada = manifesto.get(_chave(csv_file))
+    if not entrada:
+        return None
+
+    parquet_file = Path(cache_dir) / entrada["parquet"]
+    if not parquet_file.exists():
+        return None
+
+    stat = csv_file.stat()
+    if stat.st_size != entrada["tamanho"]:
+        return None
+
+    if stat.st_mtime != entrada["mtime"]:
+        if hash_arquivo(csv_file) != entrada["hash"]:
+            return None
+        entrada["mtime"] = stat.st_mtime
+
+    try:
+        return pd.read_parquet(parquet_file)
+    except Exception as e:
+        ic(f"⚠️ Cache de {csv_file.name} ilegível, relendo o CSV: {e}")
+        return None
+
+
+def gravar_cache(manifesto: Dict, csv_file: Path, df: pd.DataFrame, cache_dir: Path):
+    """
+    Grava o DataFrame de um CSV no cache e registra no manifesto.
+
+    Args:
+        manifesto: Manifesto carregado (é atualizado)
+        csv_file: CSV de origem
+        df: DataFrame parseado do CSV
+        cache_dir: Diretório do cache
+    """
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+    stat = csv_file.stat()
+    digest = hash_arquivo(csv_file)
+    parquet_nome = f"{csv_file.stem}_{digest[:12]}.parquet"
+
+    # Remover o Parquet da versão anterior do mesmo CSV
+    anterior = manifesto.get(_chave(csv_file))
+    if anterior and anterior["parquet"] != parquet_nome:
+        _remover(cache_dir / anterior["parquet"])
+
+    df.to_parquet(cache_dir / parquet_nome, index=False, compression='snappy')
+
+    manifesto[_chave(csv_file)] = {
+        "tamanho": stat.st_size,
+        "mtime": stat.st_mtime,
+        "hash": digest,
+        "parquet": parquet_nome
+    }
+
+
+def _remover(arquivo: Path):
+    """Apaga o arquivo, se existir"""
+    try:
+        arquivo.unlink()
+    except FileNotFoundError:
+        pass
+
+
+def podar_cache(manifesto: Dict, cache_dir: Path) -> int:
+    """
+    Remove do manifesto os CSVs que não existem mais e apaga os Parquets
+    que nenhuma entrada referencia (CSVs apagados, versões antigas).
+
+    Args:
+        manifesto: Manifesto carregado (é atualizado)
+        cache_dir: Diretório do cache
+
+    Returns:
+        Número de entradas removidas
+    """
+    ausentes = [chave for chave in manifesto if not Path(chave).exists()]
+    for chave in ausentes:
+        del manifesto[chave]
+
+    referenciados = {entrada["parquet"] for entrada in manifesto.values()}
+    for parquet_file in Path(cache_dir).glob("*.parquet"):
+        if parquet_file.name not in referenciados:
+            _remover(parquet_file)
+
+    if ausentes:
+        ic(f"✓ Cache: {len(ausentes)} CSV(s) apagado(s) removido(s) do manifesto")
+    return len(ausentes)
@@ -0,0 +1,170 @@
+"""
+Captura dos atendimentos do histórico em várias abas do mesmo navegador.
+
+No modo sequencial cada item do histórico é clicado, esperado e lido antes
+do próximo, então a espera de carregamento de cada atendimento soma. Os
+itens do histórico são alvos de clique do SPA (não têm URL própria), então
+a captura paralela abre a página do paciente em até MAX_ABAS abas:
+
+- as abas extras são abertas de uma vez com window.open e carregam ao mesmo
+  tempo que a aba principal trabalha;
+- cada aba recebe um item da fila e só leva o clique, sem esperar;
+- as abas são visitadas em rodízio: quando o WebDriver volta a uma aba, o
+  atendimento dela já carregou em paralelo com as outras, a espera é curta,
+  o texto é lido e o próximo item da fila é clicado naquela aba.
+
+O WebDriver só comanda uma aba por vez, mas o carregamento (XHR do PEP e
+renderização) corre em todas. Com MAX_ABAS = 1 a captura é a sequencial de
+sempre. O caminho sem navegador para os mesmos dados é o backend AMF
+(PEP_BACKEND=amf, ver cliente_amf.py).
+"""
+
+import os
+from collections import deque
+from typing import Dict, List, Optional
+
+from selenium.common.exceptions import WebDriverException
+from icecream import ic
+
+from esperas import aguardar_pagina_pronta, erro_de_sessao
+from extracao import (
+    SCRIPT_ITENS_HISTORICO,
+    SCRIPT_TEXTO_CONTEUDO,
+    HISTORICO_SELECTORS,
+    CONTENT_SELECTORS,
+    extrair_dados_atendimento
+)
+
+
+# Abas abertas ao mesmo tempo por paciente, contando a principal (1 = sequencial)
+MAX_ABAS = 1
+
+
+def abas_por_paciente() -> int:
+    """
+    Limite de abas por paciente a partir do .env.
+
+    Variáveis de ambiente:
+        PEP_ABAS_ATENDIMENTO: abas simultâneas por paciente (1 = sequencial)
+
+    Returns:
+        Número de abas (>= 1)
+    """
+    return max(1, int(os.getenv("PEP_ABAS_ATENDIMENTO", MAX_ABAS)))
+
+
+def _clicar_item(driver, indice: int) -> bool:
+    """Clica (via JS) no item `indice` do histórico da aba atual"""
+    try:
+        itens = driver.execute_script(SCRIPT_ITENS_HISTORICO, HISTORICO_SELECTORS).get("itens") or []
+        if indice >= len(itens):
+            return False
+        driver.execute_script("arguments[0].scrollIntoView({block: 'center'}); arguments[0].click();", itens[indice])
+        return True
+    except WebDriverException as e:
+        if erro_de_sessao(e):
+            raise
+        ic(f"[Atendimento {indice + 1}] ⚠️ Erro ao clicar: {e}")
+        return False
+
+
+def _ler_item(driver, indice: int) -> Optional[Dict]:
+    """Espera o atendimento clicado na aba atual e extrai os dados"""
+    prefix = f"[Atendimento {indice + 1}] "
+    aguardar_pagina_pronta(driver, "atendimento")
+    try:
+        texto = driver.execute_script(SCRIPT_TEXTO_CONTEUDO, CONTENT_SELECTORS) or ""
+    except WebDriverException as e:
+        if erro_de_sessao(e):
+            raise
+        ic(f"{prefix}⚠️ Erro ao capturar texto: {e}")
+        return None
+    return extrair_dados_atendimento(texto, prefix)
+
+
+def capturar_atendimentos_em_abas(
+    driver,
+    indices: List[int],
+    max_abas: Optional[int] = None
+) -> Dict[int, Dict]:
+    """
+    Captura os itens `indices` do histórico em até `max_abas` abas.
+
+    O driver deve estar na página do paciente (ETAPA 5). Ao final as abas
+    extras são fechadas e o foco volta para a aba principal.
+
+    Args:
+        driver: WebDriver do Selenium
+        indices: Posições (0-based) dos itens do histórico a capturar
+        max_abas: Abas simultâneas, contando a principal (default: abas_por_paciente())
+
+    Returns:
+        {índice: dados do atendimento} dos itens capturados
+    """
+    n_itens = len(indices)
+    max_abas = min(max_abas or abas_por_paciente(), n_itens)
+    principal = driver.current_window_handle
+    url_paciente = driver.current_url
+
+    # Abas extras começam a carregar juntas, enquanto a principal já trabalha
+    antes = set(driver.window_handles)
+    for _ in range(max_abas - 1):
+        driver.execute_script("window.open(arguments[0], '_blank');", url_paciente)
+    extras = [h for h in driver.window_handles if h not in antes]
+
+    ic(f"Capturando {n_itens} atendimento(s) em {1 + len(extras)} aba(s)")
+
+    fila = deque(indices)
+    resultados: Dict[int, Dict] = {}
+    # aba -> índice do item clicado nela (None = ainda carregando a página)
+    em_curso: Dict[str, Optional[int]] = {principal: None}
+    em_curso.update({h: None for h in extras})
+    carregadas = {principal}
+
+    def proximo(aba: str):
+        """Clica na aba atual o próximo item da fila (ou libera a aba)"""
+        while fila:
+            indice = fila.popleft()
+            if _clicar_item(driver, indice):
+                em_curso[aba] = indice
+                return
+            if aba != principal:
+                # Histórico diferente nesta aba: o item fica para a principal
+                fila.append(indice)
+                break
+            ic(f"[Atendimento {indice + 1}] ⚠️ Item não encontrado, pulando")
+        em_curso.pop(aba, None)
+
+    try:
+        while em_curso:
+            for aba in list(em_curso):
+                driver.switch_to.window(aba)
+
+                if aba not in carregadas:
+                    aguardar_pagina_pronta(driver, "captura")
+                    carregadas.add(aba)
+                elif em_curso[aba] is not None:
+                    indice = em_curso[aba]
+                    dados = _ler_item(driver, indice)
+                    if dados:
+                        resultados[indice] = dados
+                        ic(f"✓ Atendimento {indice + 1} capturado ({len(resultados)}/{n_itens})")
+                    else:
+                        ic(f"⚠️ Falha ao capturar dados do atendimento {indice + 1}")
+
+                proximo(aba)
+
+                # Itens devolvidos por uma aba extra voltam para a principal
+                if fila and principal not in em_curso:
+                    em_curso[principal] = None
+
+    finally:
+        for aba in extras:
+            try:
+                driver.switch_to.window(aba)
+                driver.close()
+            except WebDriverException:
+                pass
+        driver.switch_to.window(principal)
+
+    return resultados
@@ -0,0 +1,192 @@
+"""
+Captura do tráfego de remoting (AMF/XHR) via Chrome DevTools Protocol.
+
+Substitui o proxy do selenium-wire usado para gerar os dumps de amf_debug:
+o Chrome registra os eventos de rede no log "performance" e os corpos das
+respostas são lidos com Network.getResponseBody, sem interceptar o tráfego.
+Só as requisições cujas URLs batem com PADROES_URL_REMOTING são guardadas.
+
+Cada paciente gera um arquivo zip em dados_pacientes/amf_capturas/ com os
+corpos binários (NNN_request.bin / NNN_response.bin, legíveis por amf.py)
+e um indice.json com URL, status e tempos de cada chamada.
+"""
+
+import io
+import os
+import json
+import base64
+import zipfile
+from pathlib import Path
+from typing import Dict, List, Optional
+from datetime import datetime
+
+from selenium.common.exceptions import WebDriverException
+from icecream import ic
+
+from esperas import PADROES_URL_REMOTING
+
+
+# Buffers do Chrome para manter os corpos das respostas disponíveis
+TAMANHO_BUFFER_RECURSO = 10 * 1024 * 1024
+TAMANHO_BUFFER_TOTAL = 100 * 1024 * 1024
+
+
+def captura_rede_habilitada() -> bool:
+    """Captura ligada via .env (PEP_CAPTURA_REDE=1)"""
+    return os.getenv("PEP_CAPTURA_REDE", "0").lower() in ("1", "true", "sim")
+
+
+def configurar_opcoes_captura(options):
+    """Liga o log de performance (eventos de rede do CDP) nas opções do Chrome"""
+    options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+
+
+class CapturaRede:
+    """
+    Coletor das chamadas de remoting de um navegador.
+
+    Args:
+        driver: WebDriver do Chrome criado com configurar_opcoes_captura
+        padroes_url: Trechos de URL que identificam as chamadas a guardar
+    """
+
+    def __init__(self, driver, padroes_url=PADROES_URL_REMOTING):
+        self.driver = driver
+        self.padroes_url = tuple(padroes_url)
+        self._pendentes: Dict[str, Dict] = {}
+        self.chamadas: List[Dict] = []
+
+        driver.execute_cdp_cmd("Network.enable", {
+            "maxResourceBufferSize": TAMANHO_BUFFER_RECURSO,
+            "maxTotalBufferSize": TAMANHO_BUFFER_TOTAL
+        })
+
+    def _interessa(self, url: str) -> bool:
+        return any(p in url for p in self.padroes_url)
+
+    def descartar(self):
+        """Esvazia o log e as chamadas acumuladas (início de um novo paciente)"""
+        try:
+            self.driver.get_log("performance")
+        except WebDriverException:
+            pass
+        self._pendentes.clear()
+        self.chamadas = []
+
+    def _corpo_requisicao(self, id_requisicao: str, requisicao: Dict) -> Optional[bytes]:
+        """Corpo enviado (postDataEntries traz os bytes exatos em base64)"""
+        entradas = requisicao.get("postDataEntries") or []
+        if entradas and all("bytes" in e for e in entradas):
+            return b"".join(base64.b64decode(e["bytes"]) for e in entradas)
+
+        if not requisicao.get("hasPostData"):
+            return None
+        try:
+            dados = self.driver.execute_cdp_cmd("Network.getRequestPostData", {"requestId": id_requisicao})
+            return dados["postData"].encode("latin-1", errors="replace")
+        except WebDriverException:
+            return None
+
+    def _corpo_resposta(self, id_requisicao: str) -> Optional[bytes]:
+        try:
+            dados = self.driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": id_requisicao})
+        except WebDriverException as e:
+            ic(f"⚠️ Corpo da resposta {id_requisicao} indisponível: {e}")
+            return None
+
+        if dados.get("base64Encoded"):
+            return base64.b64decode(dados["body"])
+        return dados["body"].encode("utf-8")
+
+    def coletar(self) -> List[Dict]:
+        """
+        Processa os eventos de rede desde a última coleta.
+
+        Returns:
+            Chamadas de remoting concluídas até agora (desde descartar())
+        """
+        try:
+            entradas = self.driver.get_log("performance")
+        except WebDriverException as e:
+            ic(f"⚠️ Log de performance indisponível: {e}")
+            return self.chamadas
+
+        for entrada in entradas:
+            evento = json.loads(entrada["message"])["message"]
+            metodo = evento.get("method")
+            params = evento.get("params", {})
+            id_requisicao = params.get("requestId")
+
+            if metodo == "Network.requestWillBeSent":
+                requisicao = params["request"]
+                if not self._interessa(requisicao["url"]):
+                    continue
+                self._pendentes[id_requisicao] = {
+                    "url": requisicao["url"],
+                    "metodo": requisicao["method"],
+                    "inicio": params.get("timestamp"),
+                    "requisicao": self._corpo_requisicao(id_requisicao, requisicao),
+                }
+
+            elif metodo == "Network.responseReceived" and id_requisicao in self._pendentes:
+                resposta = params["response"]
+                self._pendentes[id_requisicao].update({
+                    "status": resposta.get("status"),
+                    "tipo": resposta.get("mimeType"),
+                })
+
+            elif metodo == "Network.loadingFinished" and id_requisicao in self._pendentes:
+                chamada = self._pendentes.pop(id_requisicao)
+                chamada["fim"] = params.get("timestamp")
+                chamada["resposta"] = self._corpo_resposta(id_requisicao)
+                self.chamadas.append(chamada)
+
+            elif metodo == "Network.loadingFailed" and id_requisicao in self._pendentes:
+                chamada = self._pendentes.pop(id_requisicao)
+                chamada["erro"] = params.get("errorText")
+                self.chamadas.append(chamada)
+
+        return self.chamadas
+
+    def salvar(self, prontuario: str, root: Optional[Path] = None) -> Optional[Path]:
+        """
+        Grava as chamadas capturadas do paciente num arquivo zip.
+
+        Args:
+            prontuario: Número do prontuário
+            root: Raiz do projeto (default: diretório acima de src/)
+
+        Returns:
+            Caminho do arquivo, ou None se não houve chamadas
+        """
+        chamadas = self.coletar()
+        if not chamadas:
+            ic(f"⚠️ Nenhuma chamada de remoting capturada para {prontuario}")
+            return None
+
+        if root is None:
+            root = Path(__file__).parent.parent
+        destino_dir = Path(root) / "dados_pacientes" / "amf_capturas"
+        destino_dir.mkdir(parents=True, exist_ok=True)
+
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        destino = destino_dir / f"{prontuario}_{timestamp}.zip"
+
+        indice = []
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as arquivo:
+            for i, chamada in enumerate(chamadas):
+                item = {k: v for k, v in chamada.items() if k not in ("requisicao", "resposta")}
+                for parte in ("requisicao", "resposta"):
+                    if chamada.get(parte) is not None:
+                        nome = f"{i:03d}_{'request' if parte == 'requisicao' else 'response'}.bin"
+                        arquivo.writestr(nome, chamada[parte])
+                        item[parte] = nome
+                indice.append(item)
+            arquivo.writestr("indice.json", json.dumps(indice, ensure_ascii=False, indent=2))
+
+        destino.write_bytes(buffer.getvalue())
+        ic(f"✓ {len(chamadas)} chamada(s) de remoting salvas em: {destino}")
+
+        self.chamadas = []
+        return destino
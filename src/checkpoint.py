@@ -0,0 +1,349 @@
+"""
+Sistema de checkpoint com journal append-only.
+
+O estado do processamento é mantido em dois arquivos na raiz do projeto:
+- checkpoint.json: snapshot compactado (mesmo formato do checkpoint antigo)
+- checkpoint.jsonl: journal com um registro JSON por linha, um por paciente
+
+Cada paciente processado gera apenas um append no journal (O(1) em bytes
+escritos). Periodicamente o journal é compactado: o snapshot é reescrito de
+forma atômica (arquivo temporário + os.replace) e o journal é truncado.
+
+Cada registro do journal carrega um número de sequência ("seq"). Na carga,
+apenas registros com seq maior que o do snapshot são reaplicados, então um
+crash entre a troca do snapshot e o truncamento do journal não duplica
+entradas. Uma última linha incompleta (escrita interrompida) é descartada.
+
+Para o filtro de retomada, o checkpoint em memória mantém índices (sets) das
+matrículas processadas e com falha. Eles são montados uma vez na carga e
+atualizados a cada registro; chaves iniciadas com "_" não vão para o disco.
+
+As funções de escrita são protegidas por um lock, então várias sessões
+(threads) podem registrar resultados no mesmo checkpoint.
+"""
+
+import os
+import json
+import threading
+from itertools import compress
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from datetime import datetime
+
+from icecream import ic
+
+
+# Quantidade de appends no journal antes de compactar no snapshot
+COMPACTAR_A_CADA = 500
+
+# Serializa appends e compactações entre sessões paralelas
+_lock_checkpoint = threading.RLock()
+
+
+def get_checkpoint_paths(root: Optional[Path] = None):
+    """
+    Retorna os caminhos do snapshot e do journal do checkpoint.
+
+    Args:
+        root: Diretório onde ficam os arquivos (default: raiz do projeto)
+
+    Returns:
+        Tupla com (caminho_snapshot, caminho_journal)
+    """
+    if root is None:
+        root = Path(__file__).parent.parent
+    else:
+        root = Path(root)
+
+    return root / "checkpoint.json", root / "checkpoint.jsonl"
+
+
+def novo_checkpoint() -> Dict:
+    """Retorna um checkpoint vazio"""
+    checkpoint = {"processados": [], "falhas": [], "inicio": datetime.now().isoformat(), "seq": 0}
+    indexar_checkpoint(checkpoint)
+    return checkpoint
+
+
+def indexar_checkpoint(checkpoint: Dict) -> Dict:
+    """
+    Monta os índices em memória de matrículas processadas e com falha.
+
+    Args:
+        checkpoint: Dicionário do checkpoint
+
+    Returns:
+        O próprio checkpoint, com as chaves "_idx_processados" e "_idx_falhas"
+    """
+    checkpoint["_idx_processados"] = {p["matricula"] for p in checkpoint.get("processados", [])}
+    checkpoint["_idx_falhas"] = {p["matricula"] for p in checkpoint.get("falhas", [])}
+    return checkpoint
+
+
+def _aplicar_registro(checkpoint: Dict, registro: Dict):
+    """Aplica um registro do journal ao checkpoint em memória"""
+    if "_idx_processados" not in checkpoint:
+        indexar_checkpoint(checkpoint)
+
+    if registro.get("sucesso"):
+        checkpoint["processados"].append(registro)
+        checkpoint["_idx_processados"].add(registro["matricula"])
+    else:
+        checkpoint["falhas"].append(registro)
+        checkpoint["_idx_falhas"].add(registro["matricula"])
+
+    checkpoint["seq"] = max(checkpoint.get("seq", 0), registro.get("seq", 0))
+
+
+def _ler_journal(journal_file: Path):
+    """
+    Lê os registros válidos do journal.
+
+    Returns:
+        Tupla com (lista_registros, linhas_descartadas)
+    """
+    registros = []
+    descartadas = 0
+
+    with open(journal_file, "rb") as f:
+        for linha in f:
+            linha = linha.strip()
+            if not linha:
+                continue
+            try:
+                registros.append(json.loads(linha))
+            except ValueError:
+                # Escrita interrompida no meio da linha
+                descartadas += 1
+
+    return registros, descartadas
+
+
+def carregar_checkpoint(root: Optional[Path] = None) -> Dict:
+    """
+    Carrega checkpoint do processamento anterior.
+
+    Lê o snapshot compactado e reaplica o journal por cima dele.
+
+    Args:
+        root: Diretório do checkpoint (default: raiz do projeto)
+
+    Returns:
+        Dicionário com dados do checkpoint
+    """
+    checkpoint_file, journal_file = get_checkpoint_paths(root)
+
+    if not checkpoint_file.exists() and not journal_file.exists():
+        ic("Nenhum checkpoint encontrado, iniciando do zero")
+        return novo_checkpoint()
+
+    checkpoint = novo_checkpoint()
+
+    if checkpoint_file.exists():
+        try:
+            with open(checkpoint_file, "r", encoding="utf-8") as f:
+                checkpoint.update(json.load(f))
+            checkpoint.setdefault("seq", len(checkpoint["processados"]) + len(checkpoint["falhas"]))
+            indexar_checkpoint(checkpoint)
+        except Exception as e:
+            ic(f"⚠️ Erro ao carregar checkpoint: {e}")
+            checkpoint = novo_checkpoint()
+
+    if journal_file.exists():
+        try:
+            registros, descartadas = _ler_journal(journal_file)
+            seq_snapshot = checkpoint["seq"]
+
+            aplicados = 0
+            for registro in registros:
+                if registro.get("seq", 0) > seq_snapshot:
+                    _aplicar_registro(checkpoint, registro)
+                    aplicados += 1
+
+            if descartadas:
+                ic(f"⚠️ {descartadas} linha(s) corrompida(s) descartada(s) do journal")
+
+            if aplicados or descartadas:
+                # Incorporar o journal ao snapshot e começar um journal limpo
+                salvar_checkpoint(checkpoint, root)
+
+        except Exception as e:
+            ic(f"⚠️ Erro ao ler journal do checkpoint: {e}")
+
+    ic(f"✓ Checkpoint carregado: {len(checkpoint.get('processados', []))} pacientes já processados")
+    return checkpoint
+
+
+def salvar_checkpoint(checkpoint: Dict, root: Optional[Path] = None):
+    """
+    Compacta o checkpoint: grava o snapshot completo e trunca o journal.
+
+    O snapshot é escrito num arquivo temporário e trocado com os.replace,
+    então o checkpoint.json nunca fica parcialmente escrito.
+
+    Args:
+        checkpoint: Dicionário com dados do checkpoint
+        root: Diretório do checkpoint (default: raiz do projeto)
+    """
+    checkpoint_file, journal_file = get_checkpoint_paths(root)
+    tmp_file = checkpoint_file.with_suffix(".json.tmp")
+
+    with _lock_checkpoint:
+        try:
+            checkpoint["ultima_atualizacao"] = datetime.now().isoformat()
+
+            # Índices em memória (chaves "_") não são persistidos
+            snapshot = {k: v for k, v in checkpoint.items() if not k.startswith("_")}
+
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f, ensure_ascii=False, indent=4)
+                f.flush()
+                os.fsync(f.fileno())
+
+            os.replace(tmp_file, checkpoint_file)
+
+            # Snapshot já contém tudo até checkpoint["seq"]
+            with open(journal_file, "wb") as f:
+                os.fsync(f.fileno())
+
+        except Exception as e:
+            ic(f"⚠️ Erro ao salvar checkpoint: {e}")
+
+
+def adicionar_ao_checkpoint(
+    checkpoint: Dict,
+    matricula: str,
+    sucesso: bool,
+    motivo: str = "",
+    root: Optional[Path] = None,
+    etapa: str = ""
+):
+    """
+    Adiciona um paciente ao checkpoint.
+
+    Grava um único registro no journal e compacta a cada COMPACTAR_A_CADA
+    registros.
+
+    Args:
+        checkpoint: Dicionário do checkpoint
+        matricula: Número da matrícula
+        sucesso: Se processamento foi bem-sucedido
+        motivo: Motivo da falha (se aplicável)
+        root: Diretório do checkpoint (default: raiz do projeto)
+        etapa: Etapa da falha (ver retentativas.ETAPAS_FALHA)
+    """
+    _, journal_file = get_checkpoint_paths(root)
+
+    with _lock_checkpoint:
+        registro = {
+            "seq": checkpoint.get("seq", 0) + 1,
+            "matricula": matricula,
+            "timestamp": datetime.now().isoformat(),
+            "sucesso": sucesso
+        }
+        if not sucesso:
+            registro["motivo"] = motivo
+            if etapa:
+                registro["etapa"] = etapa
+
+        try:
+            linha = json.dumps(registro, ensure_ascii=False) + "\n"
+            with open(journal_file, "ab") as f:
+                f.write(linha.encode("utf-8"))
+                f.flush()
+                os.fsync(f.fileno())
+        except Exception as e:
+            ic(f"⚠️ Erro ao gravar journal do checkpoint: {e}")
+
+        _aplicar_registro(checkpoint, registro)
+
+        if checkpoint["seq"] % COMPACTAR_A_CADA == 0:
+            salvar_checkpoint(checkpoint, root)
+
+
+def ja_foi_processado(checkpoint: Dict, matricula: str) -> bool:
+    """
+    Verifica se uma matrícula já foi processada com sucesso.
+
+    Args:
+        checkpoint: Dicionário do checkpoint
+        matricula: Número da matrícula
+
+    Returns:
+        True se já foi processado
+    """
+    if "_idx_processados" not in checkpoint:
+        indexar_checkpoint(checkpoint)
+
+    return matricula in checkpoint["_idx_processados"]
+
+
+def ja_falhou(checkpoint: Dict, matricula: str) -> bool:
+    """
+    Verifica se uma matrícula já teve alguma falha registrada.
+
+    Args:
+        checkpoint: Dicionário do checkpoint
+        matricula: Número da matrícula
+
+    Returns:
+        True se há falha registrada para a matrícula
+    """
+    if "_idx_falhas" not in checkpoint:
+        indexar_checkpoint(checkpoint)
+
+    return matricula in checkpoint["_idx_falhas"]
+
+
+def filtrar_pendentes(
+    checkpoint: Dict,
+    matriculas: Iterable[str],
+    nomes: Iterable[str]
+) -> List[Tuple[str, str]]:
+    """
+    Filtra os pacientes que ainda não foram processados com sucesso.
+
+    Faz uma única consulta ao índice por paciente (O(n) no total).
+
+    Args:
+        checkpoint: Dicionário do checkpoint
+        matriculas: Matrículas a verificar
+        nomes: Nomes correspondentes às matrículas
+
+    Returns:
+        Lista de tuplas (matricula, nome) pendentes, na ordem original
+    """
+    if "_idx_processados" not in checkpoint:
+        indexar_checkpoint(checkpoint)
+
+    processados = checkpoint["_idx_processados"]
+    matriculas = list(matriculas)
+    mascara = [mat not in processados for mat in matriculas]
+    return list(compress(zip(matriculas, nomes), mascara))
+
+
+def iterar_pendentes(
+    checkpoint: Dict,
+    pacientes: Iterable[Tuple[str, str]]
+) -> Iterator[Tuple[str, str]]:
+    """
+    Versão preguiçosa de filtrar_pendentes para entradas em streaming.
+
+    A consulta ao índice acontece quando o paciente é consumido, então uma
+    matrícula repetida mais adiante no fluxo é pulada se já tiver sido
+    processada com sucesso nesse meio tempo.
+
+    Args:
+        checkpoint: Dicionário do checkpoint
+        pacientes: Iterável de tuplas (matricula, nome)
+
+    Yields:
+        Tuplas (matricula, nome) pendentes, na ordem original
+    """
+    if "_idx_processados" not in checkpoint:
+        indexar_checkpoint(checkpoint)
+
+    processados = checkpoint["_idx_processados"]
+    for matricula, nome in pacientes:
+        if matricula not in processados:
+            yield matricula, nome
@@ -0,0 +1,453 @@
+"""
+Backend sem navegador: chamadas de remoting AMF direto ao PEP.
+
+Depois do login (fazer_login), todos os dados do paciente chegam ao app por
+chamadas HTTP/AMF ao messagebroker do BlazeDS. Este módulo reaproveita os
+cookies da sessão autenticada do Selenium, repete essas chamadas com um
+cliente HTTP com pool de conexões keep-alive e converte as respostas
+decodificadas (amf.py) na mesma estrutura dados_paciente do scraper.
+
+As chamadas feitas para cada paciente formam um roteiro obrigatório
+(PEP_AMF_ROTEIRO): os corpos das requisições não estão nos dumps de
+amf_debug, então o roteiro tem de ser montado a partir de uma captura real
+(PEP_CAPTURA_REDE=1 grava os NNN_request.bin, ver captura_rede.py). Sem
+roteiro, PEP_BACKEND=amf é recusado na inicialização.
+
+Para testar sem o PEP, scripts/servidor_amf_fixture.py serve os arquivos
+gravados em dados_pacientes/amf_debug.
+"""
+
+import os
+import json
+import uuid
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+from datetime import datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+from icecream import ic
+
+from amf import ErroAMF, codificar_pacote, decodificar_pacote
+from extracao import CAMPOS_DEMOGRAFICOS, novo_dados_paciente, novo_dados_atendimento
+from indice_atendimentos import (
+    captura_incremental,
+    chaves_atendimentos,
+    carregar_registro,
+    itens_novos,
+    mesclar_registro,
+    gravar_registro
+)
+
+
+# Destino padrão das chamadas do prontuário eletrônico
+DESTINO_PADRAO = "appDocumentoEletronicoController"
+
+# As chamadas de remoting feitas para cada paciente vêm de um JSON em
+# PEP_AMF_ROTEIRO (lista de {"destino", "operacao", "argumentos"}; os
+# argumentos aceitam os marcadores {numero_atendimento} e {prontuario}). Não
+# há roteiro padrão: as operações têm de ser tiradas de uma captura real.
+
+# Operação de handshake do BlazeDS (CommandMessage.CLIENT_PING_OPERATION)
+OPERACAO_PING = 5
+
+CLASSE_REGISTRO = "mv.editor.core.data.Registry"
+CLASSE_ERRO = "flex.messaging.messages.ErrorMessage"
+
+# Campos do editor clínico (toolTip no XML do layout) → campo do atendimento
+CAMPOS_EDITOR = {
+    "cb_subespecialidade": "subespecialidade",
+    "cb_diagnostico": "diagnostico",
+    "ta_hist_anamnese": "historico_anamnese",
+    "tx_prestador": "medico",
+}
+
+
+class ErroRemoting(RuntimeError):
+    """O servidor respondeu com ErrorMessage ou a resposta não é AMF"""
+
+
+# Falhas de uma chamada que fazem o paciente voltar para o navegador: rede,
+# ErrorMessage/HTML, payload AMF inválido e corpo com formato inesperado
+ERROS_REMOTING = (
+    requests.RequestException, ErroRemoting, ErroAMF,
+    IndexError, KeyError, AttributeError, TypeError,
+)
+
+
+# ============================================================================
+# CLIENTE
+# ============================================================================
+
+class ClienteAMF:
+    """
+    Cliente de remoting AMF sobre uma sessão HTTP keep-alive.
+
+    Args:
+        url_amf: URL do endpoint (ex.: .../mvpep/messagebroker/amf)
+        cookies: Cookies da sessão autenticada (lista no formato do Selenium)
+        timeout: Timeout de cada requisição (segundos)
+        conexoes: Tamanho do pool de conexões
+    """
+
+    def __init__(
+        self,
+        url_amf: str,
+        cookies: Optional[List[Dict]] = None,
+        timeout: float = 30,
+        conexoes: int = 4
+    ):
+        self.url_amf = url_amf
+        self.timeout = timeout
+        self.ds_id = "nil"
+        self._contador = 0
+
+        self.sessao = requests.Session()
+        adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=conexoes)
+        self.sessao.mount("http://", adaptador)
+        self.sessao.mount("https://", adaptador)
+        self.sessao.headers.update({"Content-Type": "application/x-amf"})
+
+        for cookie in cookies or []:
+            self.sessao.cookies.set(
+                cookie["name"], cookie["value"],
+                domain=cookie.get("domain"), path=cookie.get("path", "/")
+            )
+
+    @classmethod
+    def de_driver(cls, driver, url_amf: str, **kwargs) -> "ClienteAMF":
+        """Cria o cliente com os cookies do navegador já logado"""
+        cliente = cls(url_amf, driver.get_cookies(), **kwargs)
+        cliente.sessao.headers["User-Agent"] = driver.execute_script("return navigator.userAgent")
+        return cliente
+
+    def fechar(self):
+        """Fecha as conexões do pool"""
+        self.sessao.close()
+
+    def _enviar(self, mensagem: Dict) -> Any:
+        """Envia uma mensagem Flex e devolve o corpo da resposta"""
+        self._contador += 1
+        pacote = codificar_pacote([{"alvo": "null", "resposta": f"/{self._contador}", "corpo": mensagem}])
+
+        resposta = self.sessao.post(self.url_amf, data=pacote, timeout=self.timeout)
+        resposta.raise_for_status()
+
+        if "amf" not in resposta.headers.get("Content-Type", ""):
+            # Sessão expirada costuma devolver a página de login em HTML
+            raise ErroRemoting(f"Resposta não é AMF ({resposta.headers.get('Content-Type')})")
+
+        corpo = decodificar_pacote(resposta.content)["mensagens"][0]["corpo"]
+
+        if isinstance(corpo, dict) and corpo.get("_classe") == CLASSE_ERRO:
+            raise ErroRemoting(f"{corpo.get('faultCode')}: {corpo.get('faultString')}")
+
+        return corpo
+
+    def _mensagem_base(self, classe: str, destino: str) -> Dict:
+        return {
+            "_classe": classe,
+            "destination": destino,
+            "headers": {"DSId": self.ds_id, "DSEndpoint": "my-amf"},
+            "clientId": None,
+            "messageId": str(uuid.uuid4()).upper(),
+            "timestamp": 0,
+            "timeToLive": 0,
+        }
+
+    def conectar(self):
+        """Handshake do BlazeDS: obtém o DSId usado nas chamadas seguintes"""
+        mensagem = self._mensagem_base("flex.messaging.messages.CommandMessage", "")
+        mensagem.update({"operation": OPERACAO_PING, "correlationId": "", "messageRefType": None, "body": {}})
+
+        corpo = self._enviar(mensagem)
+        self.ds_id = (corpo.get("headers") or {}).get("DSId", self.ds_id)
+        ic(f"✓ Conectado ao remoting AMF (DSId {self.ds_id})")
+
+    def chamar(self, operacao: str, *argumentos, destino: str = DESTINO_PADRAO) -> Any:
+        """
+        Chama uma operação remota.
+
+        Args:
+            operacao: Nome do método no destino
+            *argumentos: Argumentos do método
+            destino: Destino (controller) do BlazeDS
+
+        Returns:
+            Corpo da AcknowledgeMessage (resultado do método)
+        """
+        if self.ds_id == "nil":
+            self.conectar()
+
+        mensagem = self._mensagem_base("flex.messaging.messages.RemotingMessage", destino)
+        mensagem.update({"operation": operacao, "source": None, "body": list(argumentos)})
+
+        return self._enviar(mensagem).get("body")
+
+
+def criar_cliente_amf(driver) -> Optional[ClienteAMF]:
+    """
+    Cria o cliente AMF para uma sessão, se o backend AMF estiver habilitado.
+
+    Variáveis de ambiente:
+        PEP_BACKEND=amf, PEP_AMF_URL, PEP_AMF_ROTEIRO
+
+    Args:
+        driver: WebDriver já logado (fonte dos cookies)
+
+    Returns:
+        ClienteAMF ou None se PEP_BACKEND não for amf
+
+    Raises:
+        ValueError: backend AMF mal configurado (ver backend_amf_habilitado)
+    """
+    if not backend_amf_habilitado():
+        return None
+
+    return ClienteAMF.de_driver(driver, os.getenv("PEP_AMF_URL"))
+
+
+def backend_amf_habilitado() -> bool:
+    """
+    Verifica a configuração do backend AMF.
+
+    Variáveis de ambiente:
+        PEP_BACKEND=amf, PEP_AMF_URL, PEP_AMF_ROTEIRO
+
+    Returns:
+        True se PEP_BACKEND=amf (com URL e roteiro válidos)
+
+    Raises:
+        ValueError: PEP_BACKEND=amf sem PEP_AMF_URL ou sem roteiro válido
+    """
+    if os.getenv("PEP_BACKEND", "selenium").lower() != "amf":
+        return False
+
+    if not os.getenv("PEP_AMF_URL"):
+        raise ValueError("PEP_BACKEND=amf exige PEP_AMF_URL")
+
+    carregar_roteiro()
+    return True
+
+
+def carregar_roteiro() -> List[Dict]:
+    """
+    Roteiro de chamadas por paciente (JSON em PEP_AMF_ROTEIRO).
+
+    Raises:
+        ValueError: PEP_AMF_ROTEIRO ausente, ilegível ou sem chamadas
+    """
+    caminho = os.getenv("PEP_AMF_ROTEIRO")
+    if not caminho:
+        raise ValueError("PEP_BACKEND=amf exige PEP_AMF_ROTEIRO (roteiro tirado de uma captura real, "
+                         "ver captura_rede.py)")
+
+    try:
+        with open(caminho, "r", encoding="utf-8") as f:
+            roteiro = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        raise ValueError(f"PEP_AMF_ROTEIRO ilegível ({caminho}): {e}") from e
+
+    if not isinstance(roteiro, list) or not roteiro or not all(
+            isinstance(chamada, dict) and chamada.get("operacao") for chamada in roteiro):
+        raise ValueError(f"PEP_AMF_ROTEIRO inválido ({caminho}): esperada lista de chamadas com \"operacao\"")
+
+    return roteiro
+
+
+# ============================================================================
+# MAPEAMENTO PARA dados_paciente
+# ============================================================================
+
+def _preencher(valor: Any, contexto: Dict) -> Any:
+    """Substitui os marcadores {numero_atendimento}/{prontuario} nos argumentos"""
+    if isinstance(valor, str):
+        return valor.format(**contexto)
+    if isinstance(valor, list):
+        return [_preencher(v, contexto) for v in valor]
+    if isinstance(valor, dict):
+        return {k: _preencher(v, contexto) for k, v in valor.items()}
+    return valor
+
+
+def encontrar_registros(valor: Any) -> Iterator[Dict]:
+    """Percorre uma resposta decodificada e devolve os Registry do editor clínico"""
+    if isinstance(valor, dict):
+        if valor.get("_classe") == CLASSE_REGISTRO:
+            yield valor
+            return
+        for item in valor.values():
+            yield from encontrar_registros(item)
+    elif isinstance(valor, list):
+        for item in valor:
+            yield from encontrar_registros(item)
+
+
+def _texto_resposta(resposta: str) -> str:
+    """Respostas de combobox vêm como 'codigo||Rótulo'"""
+    return resposta.split("||")[-1].strip()
+
+
+def campos_registro(registro: Dict) -> Dict[str, str]:
+    """
+    Extrai os campos preenchidos de um Registry.
+
+    Args:
+        registro: Objeto mv.editor.core.data.Registry decodificado
+
+    Returns:
+        Dicionário {nome do campo (toolTip): resposta}
+    """
+    conteudo = (registro.get("layout") or {}).get("content") or ""
+    campos = {}
+
+    try:
+        raiz = ET.fromstring(conteudo)
+    except ET.ParseError as e:
+        ic(f"⚠️ Layout do registro {registro.get('id')} ilegível: {e}")
+        return campos
+
+    for el in raiz.iter():
+        nome = el.get("toolTip")
+        resposta = el.findtext("answer")
+        if nome and resposta:
+            campos[nome] = _texto_resposta(resposta)
+
+    return campos
+
+
+def parametros_registro(registro: Dict) -> Dict[str, str]:
+    """Parâmetros do Registry (PAR_CD_ATENDIMENTO, PAR_CD_PACIENTE, ...)"""
+    return {
+        p["data"]: p["label"]
+        for p in registro.get("parameters") or []
+        if p.get("data") and p.get("label") not in (None, "null")
+    }
+
+
+def mapear_registro(registro: Dict, numero_atendimento: str = "") -> Dict:
+    """
+    Converte um Registry no formato de atendimento do scraper.
+
+    A especialidade vem do nome do documento ("SEGUIMENTO - OFTALMOLOGIA" →
+    "OFTALMOLOGIA") e numero_atendimento do PAR_CD_ATENDIMENTO do registro
+    (ou do atendimento da requisição), que é a chave do índice incremental.
+
+    Args:
+        registro: Objeto mv.editor.core.data.Registry decodificado
+        numero_atendimento: Atendimento da requisição, se o registro não trouxer
+
+    Returns:
+        Dicionário no formato de novo_dados_atendimento
+    """
+    campos = campos_registro(registro)
+    parametros = parametros_registro(registro)
+
+    documento = (registro.get("layout") or {}).get("documentName", "")
+    linhas = [documento] if documento else []
+    linhas += [f"{nome}: {valor}" for nome, valor in campos.items()]
+
+    dados_atendimento = novo_dados_atendimento("\n".join(linhas))
+    for nome, campo in CAMPOS_EDITOR.items():
+        if campos.get(nome):
+            dados_atendimento[campo] = campos[nome]
+
+    if not dados_atendimento["medico"]:
+        dados_atendimento["medico"] = parametros.get("PAR_CD_USUARIO", "")
+    dados_atendimento["data_atendimento"] = parametros.get("PAR_DT_REGISTRO", "")
+    dados_atendimento["especialidade"] = documento.rpartition(" - ")[2].strip()
+    dados_atendimento["numero_atendimento"] = parametros.get("PAR_CD_ATENDIMENTO", numero_atendimento)
+
+    return dados_atendimento
+
+
+def capturar_dados_paciente_amf(
+    cliente: ClienteAMF,
+    prontuario: str,
+    numero_atendimento: str,
+    roteiro: Optional[List[Dict]] = None
+) -> Optional[Dict]:
+    """
+    Captura os dados do paciente pelas chamadas de remoting, sem navegador.
+
+    Args:
+        cliente: ClienteAMF autenticado
+        prontuario: Número do prontuário
+        numero_atendimento: Número do atendimento (ver resolver_atendimento)
+        roteiro: Chamadas a fazer (default: carregar_roteiro())
+
+    Os registros clínicos não trazem os dados demográficos (só o código do
+    paciente). Sem nenhum deles, o dados_paciente volta com
+    "captura_parcial": True e não é gravado: o chamador abre a página do
+    paciente e completa pelo navegador (pep_scraper.completar_dados_paciente).
+
+    Returns:
+        Dicionário dados_paciente (mesmo formato do scraper) ou None se falhou
+    """
+    roteiro = roteiro or carregar_roteiro()
+    contexto = {"numero_atendimento": numero_atendimento, "prontuario": prontuario}
+
+    registros = []
+    try:
+        for chamada in roteiro:
+            resultado = cliente.chamar(
+                chamada["operacao"],
+                *_preencher(chamada.get("argumentos", []), contexto),
+                destino=chamada.get("destino", DESTINO_PADRAO)
+            )
+            registros.extend(encontrar_registros(resultado))
+
+        atendimentos = [mapear_registro(r, numero_atendimento) for r in registros]
+    except ERROS_REMOTING as e:
+        # Rede, ErrorMessage, pacote malformado ou resposta em formato inesperado:
+        # o chamador volta para o navegador
+        ic(f"⚠️ Falha no remoting AMF do paciente {prontuario}: {type(e).__name__}: {e}")
+        return None
+
+    if not registros:
+        ic(f"⚠️ Nenhum registro clínico retornado para {prontuario}")
+        return None
+
+    dados_paciente = novo_dados_paciente(prontuario, atendimentos)
+
+    for registro in registros:
+        codigo = parametros_registro(registro).get("PAR_CD_PACIENTE")
+        if codigo:
+            dados_paciente["codigo_paciente"] = codigo
+            break
+
+    root = Path(__file__).parent.parent
+
+    if captura_incremental():
+        # Mesmo índice por prontuário da captura pelo navegador
+        registro = carregar_registro(prontuario, root)
+        chaves = chaves_atendimentos(atendimentos)
+        for atendimento, chave in zip(atendimentos, chaves):
+            atendimento["chave_historico"] = chave
+        novos = itens_novos(chaves, registro)
+        ic(f"Captura incremental via AMF: {len(novos)} atendimento(s) novo(s) de {len(atendimentos)}")
+
+        dados_paciente["atendimentos"] = [atendimentos[i] for i in novos]
+        dados_paciente = mesclar_registro(registro, dados_paciente, chaves)
+
+    # Os demográficos só existem na página do paciente (ou no registro
+    # incremental já completado por ela); o código vem dos parâmetros
+    if not any(dados_paciente.get(campo) for campo in CAMPOS_DEMOGRAFICOS if campo != "codigo_paciente"):
+        ic(f"⚠️ {len(atendimentos)} registro(s) via AMF sem dados demográficos: completar pelo navegador")
+        dados_paciente["captura_parcial"] = True
+        return dados_paciente
+
+    if captura_incremental():
+        filepath = gravar_registro(dados_paciente, root)
+    else:
+        # Salvar JSON (mesmo local e nome do scraper)
+        dados_dir = root / "dados_pacientes"
+        dados_dir.mkdir(parents=True, exist_ok=True)
+        filepath = dados_dir / f"paciente_{prontuario}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+
+        with open(filepath, "w", encoding="utf-8") as f:
+            json.dump(dados_paciente, f, ensure_ascii=False, indent=4)
+
+    ic(f"✓ {len(atendimentos)} registro(s) via AMF salvos em: {filepath}")
+    return dados_paciente
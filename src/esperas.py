@@ -0,0 +1,291 @@
+"""
+Camada de esperas baseadas em condição para o PEP.
+
+Substitui os time.sleep fixos do scraper: cada espera bloqueia só até uma
+condição concreta ser verdadeira (loading sumiu, DOM parou de mudar, não há
+XHR pendente, chegou resposta AMF) e retorna assim que a página está usável.
+Cada etapa tem um orçamento de tempo máximo; estourar o orçamento não é erro,
+o scraper segue adiante como fazia com os sleeps.
+"""
+
+import os
+import time
+from typing import Callable, Dict
+
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import (
+    TimeoutException,
+    WebDriverException,
+    JavascriptException,
+    InvalidSessionIdException,
+    NoSuchWindowException,
+    StaleElementReferenceException
+)
+from urllib3.exceptions import HTTPError as ErroHTTPDriver
+
+from icecream import ic
+
+
+# Orçamento máximo (segundos) de cada etapa do scraping.
+# Pode ser ajustado via .env: PEP_ESPERA_<ETAPA>, ex.: PEP_ESPERA_NAVEGACAO=30
+ORCAMENTOS_ESPERA: Dict[str, float] = {
+    "login": 15,
+    "navegacao": 20,
+    "busca": 10,
+    "selecao": 15,
+    "captura": 15,
+    "atendimento": 8,
+}
+
+# Intervalo entre verificações das condições
+INTERVALO_POLL = 0.1
+
+# Trechos de URL que identificam as chamadas de remoting (AMF) do PEP
+PADROES_URL_REMOTING = ("messagebroker", "/amf")
+
+# Instala contadores de XHR/fetch pendentes e de mutações do DOM na página.
+# É idempotente: só instala uma vez por documento.
+SCRIPT_INSTRUMENTAR = """
+if (!window.__pepEsperas) {
+    window.__pepEsperas = {pendentes: 0, ultimaMutacao: performance.now()};
+    var estado = window.__pepEsperas;
+
+    var enviar = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function() {
+        estado.pendentes++;
+        this.addEventListener('loadend', function() { estado.pendentes--; });
+        return enviar.apply(this, arguments);
+    };
+
+    if (window.fetch) {
+        var buscar = window.fetch;
+        window.fetch = function() {
+            estado.pendentes++;
+            return buscar.apply(this, arguments).finally(function() { estado.pendentes--; });
+        };
+    }
+
+    new MutationObserver(function() { estado.ultimaMutacao = performance.now(); })
+        .observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+}
+"""
+
+SCRIPT_LOADING_VISIVEL = """
+var els = document.getElementsByClassName('pep-loading-wrapper');
+for (var i = 0; i < els.length; i++) {
+    if (els[i].offsetParent !== null || els[i].getClientRects().length) return true;
+}
+return false;
+"""
+
+SCRIPT_ESTADO = """
+var estado = window.__pepEsperas;
+if (!estado) return null;
+return {pendentes: estado.pendentes, ociosoMs: performance.now() - estado.ultimaMutacao};
+"""
+
+SCRIPT_RESPOSTAS_REMOTING = """
+var padroes = arguments[0];
+return performance.getEntriesByType('resource').filter(function(e) {
+    return padroes.some(function(p) { return e.name.indexOf(p) !== -1; });
+}).length;
+"""
+
+
+def orcamento(etapa: str) -> float:
+    """
+    Retorna o orçamento de espera (segundos) de uma etapa.
+
+    Args:
+        etapa: Nome da etapa (chave de ORCAMENTOS_ESPERA)
+
+    Returns:
+        Tempo máximo de espera em segundos
+    """
+    padrao = ORCAMENTOS_ESPERA.get(etapa, 10)
+    return float(os.getenv(f"PEP_ESPERA_{etapa.upper()}", padrao))
+
+
+# Erros em que a condição é só tentada de novo (página trocando o DOM).
+# Os demais WebDriverException (sessão inválida, chromedriver morto...) sobem
+# na hora, para a falha ser classificada como de sessão sem gastar o orçamento.
+ERROS_TRANSITORIOS = (StaleElementReferenceException, JavascriptException)
+
+# Trechos da mensagem de um WebDriverException que indicam sessão perdida
+MENSAGENS_SESSAO = (
+    "invalid session id",
+    "session deleted",
+    "chrome not reachable",
+    "disconnected",
+    "no such window",
+)
+
+
+def erro_de_sessao(erro: BaseException) -> bool:
+    """
+    O erro indica que a sessão do WebDriver (ou o próprio navegador) caiu.
+
+    As funções de etapa do scraper relançam esses erros em vez de devolver
+    False/None, para a falha ser classificada como de sessão na hora (ver
+    retentativas.classificar_falha).
+
+    Args:
+        erro: Exceção capturada
+
+    Returns:
+        True para sessão inválida, janela fechada, navegador inacessível ou
+        chromedriver fora do ar (conexão recusada)
+    """
+    if isinstance(erro, (InvalidSessionIdException, NoSuchWindowException, ConnectionError, ErroHTTPDriver)):
+        return True
+    if isinstance(erro, WebDriverException):
+        mensagem = str(erro).lower()
+        return any(trecho in mensagem for trecho in MENSAGENS_SESSAO)
+    return False
+
+
+def aguardar_condicao(driver, condicao: Callable, timeout: float, descricao: str = "") -> bool:
+    """
+    Aguarda até a condição ser verdadeira ou o timeout estourar.
+
+    Args:
+        driver: WebDriver do Selenium
+        condicao: Função que recebe o driver e retorna valor truthy quando pronta
+        timeout: Tempo máximo em segundos
+        descricao: Texto para o log em caso de timeout
+
+    Returns:
+        True se a condição foi atendida, False se estourou o timeout
+
+    Raises:
+        WebDriverException: erro que não está em ERROS_TRANSITORIOS
+    """
+    try:
+        WebDriverWait(
+            driver, timeout, poll_frequency=INTERVALO_POLL,
+            ignored_exceptions=ERROS_TRANSITORIOS
+        ).until(condicao)
+        return True
+    except TimeoutException:
+        if descricao:
+            ic(f"⚠️ Timeout ({timeout:.0f}s) aguardando {descricao}, continuando...")
+        return False
+
+
+def instrumentar_pagina(driver):
+    """Instala os contadores de XHR e mutações na página atual"""
+    try:
+        driver.execute_script(SCRIPT_INSTRUMENTAR)
+    except ERROS_TRANSITORIOS:
+        pass
+
+
+def aguardar_documento_pronto(driver, timeout: float) -> bool:
+    """Aguarda document.readyState == 'complete'"""
+    return aguardar_condicao(
+        driver,
+        lambda d: d.execute_script("return document.readyState") == "complete",
+        timeout,
+        "documento carregar"
+    )
+
+
+def aguardar_loading(driver, timeout: float) -> bool:
+    """Aguarda o indicador .pep-loading-wrapper sumir (ou não existir)"""
+    return aguardar_condicao(
+        driver,
+        lambda d: not d.execute_script(SCRIPT_LOADING_VISIVEL),
+        timeout,
+        "loading desaparecer"
+    )
+
+
+def aguardar_estabilidade(driver, timeout: float, janela: float = 0.5) -> bool:
+    """
+    Aguarda a página ficar ociosa: sem XHR pendente e DOM sem mutações
+    durante `janela` segundos.
+
+    Args:
+        driver: WebDriver do Selenium
+        timeout: Tempo máximo em segundos
+        janela: Tempo mínimo sem mutações para considerar o DOM estável
+
+    Returns:
+        True se estabilizou dentro do timeout
+    """
+    instrumentar_pagina(driver)
+
+    def estavel(d):
+        estado = d.execute_script(SCRIPT_ESTADO)
+        if estado is None:
+            # Documento foi trocado: reinstalar contadores
+            instrumentar_pagina(d)
+            return False
+        return estado["pendentes"] <= 0 and estado["ociosoMs"] >= janela * 1000
+
+    return aguardar_condicao(driver, estavel, timeout, "página estabilizar")
+
+
+def contar_respostas_remoting(driver) -> int:
+    """Conta as respostas de remoting (AMF) já recebidas pela página"""
+    try:
+        return driver.execute_script(SCRIPT_RESPOSTAS_REMOTING, list(PADROES_URL_REMOTING))
+    except ERROS_TRANSITORIOS:
+        return 0
+
+
+def aguardar_resposta_remoting(driver, timeout: float, desde: int = 0) -> bool:
+    """
+    Aguarda chegar uma resposta de remoting (AMF) nova.
+
+    Args:
+        driver: WebDriver do Selenium
+        timeout: Tempo máximo em segundos
+        desde: Quantidade de respostas já vistas (ver contar_respostas_remoting)
+
+    Returns:
+        True se chegou uma resposta nova dentro do timeout
+    """
+    return aguardar_condicao(
+        driver,
+        lambda d: contar_respostas_remoting(d) > desde,
+        timeout,
+        "resposta AMF"
+    )
+
+
+def aguardar_pagina_pronta(driver, etapa: str, janela: float = 0.5) -> bool:
+    """
+    Espera composta usada entre as etapas do scraping.
+
+    Documento carregado → loading sumiu → rede ociosa e DOM estável, tudo
+    dentro do orçamento da etapa.
+
+    Args:
+        driver: WebDriver do Selenium
+        etapa: Nome da etapa (define o orçamento)
+        janela: Tempo mínimo sem mutações no DOM
+
+    Returns:
+        True se a página ficou pronta dentro do orçamento
+
+    Raises:
+        WebDriverException: sessão ou navegador perdido (ver ERROS_TRANSITORIOS)
+    """
+    limite = time.monotonic() + orcamento(etapa)
+
+    def restante() -> float:
+        return max(0.0, limite - time.monotonic())
+
+    inicio = time.monotonic()
+    pronto = (
+        aguardar_documento_pronto(driver, restante())
+        and aguardar_loading(driver, restante())
+        and aguardar_estabilidade(driver, restante(), janela)
+    )
+
+    ic(f"Página pronta em {time.monotonic() - inicio:.1f}s ({etapa})" if pronto
+       else f"⚠️ Orçamento de espera esgotado ({etapa}), continuando...")
+
+    return pronto
+
@@ -0,0 +1,447 @@
+"""
+Extração de dados do PEP a partir de um snapshot da página.
+
+Em vez de iterar elementos via WebDriver (um round trip ao chromedriver por
+.text, .is_displayed() ou get_attribute), a página é lida com uma única
+chamada execute_script que devolve um snapshot JSON compacto:
+
+    {
+        "texto": texto visível do body,
+        "h2_nome": texto do primeiro h2 candidato a nome,
+        "nomes_candidatos": textos de elementos com classe title/name/paciente,
+        "pares": textos de div/span/p com ':' e de label/dt (nessa ordem),
+        "inputs": [{"name", "id", "value"}, ...],
+        "historico": [{"texto", "visivel"}, ...]
+    }
+
+As heurísticas de regex e de label-valor rodam em Python sobre o snapshot.
+Este módulo não depende do Selenium, então também serve para reprocessar
+HTML salvo offline.
+"""
+
+import re
+from typing import Dict, List, Optional
+from datetime import datetime
+
+from icecream import ic
+
+
+# ============================================================================
+# SCRIPTS DE SNAPSHOT (executados no navegador)
+# ============================================================================
+
+# Funções auxiliares compartilhadas pelos scripts
+_JS_AUXILIARES = """
+function visivel(el) {
+    if (!el || !(el.offsetWidth || el.offsetHeight || el.getClientRects().length)) return false;
+    var estilo = window.getComputedStyle(el);
+    return estilo.visibility !== 'hidden' && estilo.display !== 'none';
+}
+function texto(el) { return visivel(el) ? (el.innerText || '').trim() : ''; }
+function primeiroTexto(el) {
+    for (var n = el.firstChild; n; n = n.nextSibling) {
+        if (n.nodeType === 3) return n.nodeValue;
+    }
+    return '';
+}
+function porSeletor(seletor) {
+    if (seletor.indexOf('//') === 0) {
+        var r = document.evaluate(seletor, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+        var lista = [];
+        for (var i = 0; i < r.snapshotLength; i++) lista.push(r.snapshotItem(i));
+        return lista;
+    }
+    return Array.prototype.slice.call(document.querySelectorAll(seletor));
+}
+function itensHistorico(seletores) {
+    for (var s = 0; s < seletores.length; s++) {
+        try {
+            var todos = porSeletor(seletores[s]);
+            var itens = todos.filter(function(el) { return visivel(el) && !el.disabled; });
+            if (itens.length) return {seletor: seletores[s], itens: itens, todos: todos};
+        } catch (e) {}
+    }
+    // Fallback: pais de elementos com texto de data/hora (DD/MM/YYYY HH:MM)
+    var pais = [];
+    porSeletor("//*[contains(text(), '/') and contains(text(), ':') and string-length(text()) >= 16]").forEach(function(el) {
+        var pai = el.parentElement;
+        if (pai && visivel(pai) && pais.indexOf(pai) === -1) pais.push(pai);
+    });
+    return {seletor: null, itens: pais, todos: pais};
+}
+"""
+
+SCRIPT_SNAPSHOT = _JS_AUXILIARES + """
+var snapshot = {texto: document.body ? document.body.innerText : '', h2_nome: '',
+                nomes_candidatos: [], pares: [], inputs: [], historico: []};
+
+// [1] Primeiro h2 com classe mat-card-title ou texto com espaço
+var h2s = document.getElementsByTagName('h2');
+for (var i = 0; i < h2s.length; i++) {
+    if ((h2s[i].className || '').toString().indexOf('mat-card-title') !== -1
+            || primeiroTexto(h2s[i]).indexOf(' ') !== -1) {
+        snapshot.h2_nome = texto(h2s[i]);
+        break;
+    }
+}
+
+// [1b] Elementos com classe title/name/paciente
+document.querySelectorAll("[class*='title'], [class*='name'], [class*='paciente']").forEach(function(el) {
+    var t = texto(el);
+    if (t) snapshot.nomes_candidatos.push(t);
+});
+
+// [3] Pares label-valor: div/span/p cujo primeiro texto tem ':', depois label e dt
+['div', 'span', 'p'].forEach(function(tag) {
+    var els = document.getElementsByTagName(tag);
+    for (var i = 0; i < els.length; i++) {
+        if (primeiroTexto(els[i]).indexOf(':') !== -1) {
+            var t = texto(els[i]);
+            if (t) snapshot.pares.push(t);
+        }
+    }
+});
+['label', 'dt'].forEach(function(tag) {
+    var els = document.getElementsByTagName(tag);
+    for (var i = 0; i < els.length; i++) {
+        var t = texto(els[i]);
+        if (t) snapshot.pares.push(t);
+    }
+});
+
+// [4] Inputs
+var inputs = document.getElementsByTagName('input');
+for (var i = 0; i < inputs.length; i++) {
+    snapshot.inputs.push({name: inputs[i].name || '', id: inputs[i].id || '', value: inputs[i].value || ''});
+}
+
+// Itens do histórico de atendimentos
+itensHistorico(arguments[0]).todos.forEach(function(el) {
+    snapshot.historico.push({texto: (el.innerText || '').trim(), visivel: visivel(el)});
+});
+
+return snapshot;
+"""
+
+# Retorna os itens do histórico (WebElements) do primeiro seletor com itens
+# visíveis e habilitados. Fallback: pais de textos com data/hora.
+SCRIPT_ITENS_HISTORICO = _JS_AUXILIARES + """
+var r = itensHistorico(arguments[0]);
+return {seletor: r.seletor, itens: r.itens};
+"""
+
+# Texto do primeiro container de conteúdo visível (fallback: body)
+SCRIPT_TEXTO_CONTEUDO = _JS_AUXILIARES + """
+var seletores = arguments[0];
+for (var s = 0; s < seletores.length; s++) {
+    var el = document.querySelector(seletores[s]);
+    if (el && visivel(el)) return el.innerText;
+}
+return document.body ? document.body.innerText : '';
+"""
+
+HISTORICO_SELECTORS = [
+    "div.historico-item",
+    "div[class*='historico']",
+    "div[class*='lista'] div[class*='item']",
+    "mat-list-item",
+    "div[role='listitem']",
+    ".history-item",
+    ".timeline-item",
+    # Seletores que contenham data (formato DD/MM/YYYY HH:MM)
+    "//div[contains(text(), '/') and contains(text(), ':')]/..",
+    # Elementos clicáveis que tenham texto com data
+    "//*[contains(@class, 'clickable') or @role='button'][.//*[contains(text(), '/')]]",
+]
+
+CONTENT_SELECTORS = [
+    "div[class*='content']",
+    "div[class*='conteudo']",
+    "mat-card-content",
+    "div[role='main']",
+    ".seguimento",
+    ".atendimento-content"
+]
+
+
+def capturar_snapshot(driver) -> Dict:
+    """
+    Lê a página inteira com uma única chamada execute_script.
+
+    Args:
+        driver: WebDriver do Selenium
+
+    Returns:
+        Snapshot da página (ver docstring do módulo)
+    """
+    return driver.execute_script(SCRIPT_SNAPSHOT, HISTORICO_SELECTORS)
+
+
+# ============================================================================
+# PADRÕES
+# ============================================================================
+
+PADROES_DEMOGRAFICOS = {
+    "data_nascimento": [
+        r'Data de nascimento[:\s]*(\d{2}/\d{2}/\d{4})',
+        r'Nascimento[:\s]*(\d{2}/\d{2}/\d{4})',
+        r'(\d{2}/\d{2}/\d{4})',
+    ],
+    "cpf": [
+        r'CPF[:\s]*(\d{11})',
+        r'CPF[:\s]*(\d{3}\.?\d{3}\.?\d{3}-?\d{2})',
+        r'(\d{11})',
+    ],
+    "codigo_paciente": [
+        r'Código do paciente[:\s]*(\d+)',
+        r'Código[:\s]*(\d+)',
+        r'SAME[:\s]*(\d+)',
+    ],
+    "raca": [
+        r'Raça[:\s]*(\w+)',
+        r'Cor[:\s]*(\w+)',
+        r'Etnia[:\s]*(\w+)',
+    ],
+    "naturalidade": [
+        r'Naturalidade[:\s]*(\w+)',
+        r'Natural de[:\s]*(\w+)',
+    ]
+}
+
+PADROES_ATENDIMENTO = {
+    "data_atendimento": [
+        r'(\d{2}/\d{2}/\d{4}\s+\d{2}:\d{2})',  # DD/MM/YYYY HH:MM
+        r'Data[:\s]*(\d{2}/\d{2}/\d{4})',
+    ],
+    "subespecialidade": [
+        r'Subespecialidade\s*\(por[:\s]*([^\n]+)',
+        r'Subespecialidade[:\s]*([^\n]+)',
+    ],
+    "diagnostico": [
+        r'Diagnóstico\s*\(por[:\s]*([^\n]+)',
+        r'Diagnóstico[:\s]*([^\n]+)',
+        r'Descolamento de retina[^\n]*',
+    ],
+    "medico": [
+        r'(?:Dr\.|Dra\.)\s*([A-Z\s]+)',
+    ]
+}
+
+PADROES_HISTORICO = [
+    r'Históri[oc]o/Anamnese[:\s]*(.{50,}?)(?=\n\n|\Z)',
+    r'POS RETIR[^\n]+\n(.{50,}?)(?=\n\n|\Z)',
+]
+
+CAMPOS_DEMOGRAFICOS = ["nome_registro", "data_nascimento", "raca", "cpf", "codigo_paciente", "naturalidade"]
+
+
+# ============================================================================
+# ESTRUTURAS
+# ============================================================================
+
+def novo_dados_paciente(prontuario: str, atendimentos: Optional[List[Dict]] = None) -> Dict:
+    """
+    Estrutura de dados do paciente (dados demográficos + lista de atendimentos).
+
+    Args:
+        prontuario: Número do prontuário
+        atendimentos: Lista de atendimentos capturados
+
+    Returns:
+        Dicionário dados_paciente com campos vazios
+    """
+    atendimentos = atendimentos or []
+    return {
+        "prontuario": prontuario,
+        "nome_registro": "",
+        "data_nascimento": "",
+        "raca": "",
+        "cpf": "",
+        "codigo_paciente": "",
+        "naturalidade": "",
+        "atendimentos": atendimentos,
+        "total_atendimentos": len(atendimentos),
+        "data_captura": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    }
+
+
+def novo_dados_atendimento(texto_completo: str = "") -> Dict:
+    """Estrutura de dados de um atendimento com campos vazios"""
+    return {
+        "data_atendimento": "",
+        "especialidade": "",
+        "medico": "",
+        "diagnostico": "",
+        "subespecialidade": "",
+        "historico_anamnese": "",
+        "texto_completo": texto_completo,
+        "data_captura": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    }
+
+
+# ============================================================================
+# EXTRAÇÃO
+# ============================================================================
+
+def _mapear_label(dados_paciente: Dict, label: str, valor: str):
+    """Preenche o campo correspondente a um par label-valor (estratégia 3)"""
+    if ('nome' in label or 'registro' in label) and not dados_paciente["nome_registro"]:
+        if len(valor) > 5:
+            dados_paciente["nome_registro"] = valor
+            ic(f"✓ Nome capturado: {valor}")
+
+    elif ('nascimento' in label or 'nasc' in label) and not dados_paciente["data_nascimento"]:
+        if re.match(r'\d{2}/\d{2}/\d{4}', valor):
+            dados_paciente["data_nascimento"] = valor
+            ic(f"✓ Data de nascimento capturada: {valor}")
+
+    elif ('raça' in label or 'raca' in label or 'cor' in label) and not dados_paciente["raca"]:
+        dados_paciente["raca"] = valor
+        ic(f"✓ Raça capturada: {valor}")
+
+    elif 'cpf' in label and not dados_paciente["cpf"]:
+        cpf_limpo = re.sub(r'[^\d]', '', valor)
+        if len(cpf_limpo) == 11:
+            dados_paciente["cpf"] = cpf_limpo
+            ic(f"✓ CPF capturado: {cpf_limpo}")
+
+    elif ('código' in label or 'codigo' in label or 'same' in label) and not dados_paciente["codigo_paciente"]:
+        codigo = re.sub(r'[^\d]', '', valor)
+        if codigo:
+            dados_paciente["codigo_paciente"] = codigo
+            ic(f"✓ Código capturado: {codigo}")
+
+    elif 'naturalidade' in label and not dados_paciente["naturalidade"]:
+        dados_paciente["naturalidade"] = valor
+        ic(f"✓ Naturalidade capturada: {valor}")
+
+
+def extrair_dados_demograficos(snapshot: Dict, dados_paciente: Dict) -> Dict:
+    """
+    Aplica as estratégias 1–4 de captura demográfica sobre o snapshot.
+
+    Args:
+        snapshot: Snapshot da página (ver capturar_snapshot)
+        dados_paciente: Estrutura a preencher (ver novo_dados_paciente)
+
+    Returns:
+        O próprio dados_paciente, preenchido
+    """
+    # ESTRATÉGIA 1: Capturar nome
+    ic("[1] Capturando nome do paciente...")
+    nome_completo = (snapshot.get("h2_nome") or "").strip()
+    if nome_completo and len(nome_completo) > 5:
+        dados_paciente["nome_registro"] = nome_completo
+        ic(f"✓ Nome capturado: {nome_completo}")
+
+    # Fallback para nome
+    if not dados_paciente["nome_registro"]:
+        for texto in snapshot.get("nomes_candidatos", []):
+            texto = texto.strip()
+            if len(texto) > 10 and ' ' in texto and texto.isupper():
+                dados_paciente["nome_registro"] = texto
+                ic(f"✓ Nome capturado (alternativa): {texto}")
+                break
+
+    # ESTRATÉGIA 2: Regex no texto da página
+    ic("[2] Analisando texto da página...")
+    page_text = snapshot.get("texto", "")
+
+    for campo, padroes in PADROES_DEMOGRAFICOS.items():
+        if not dados_paciente[campo]:
+            for padrao in padroes:
+                match = re.search(padrao, page_text, re.IGNORECASE)
+                if match:
+                    valor = match.group(1).strip()
+                    dados_paciente[campo] = valor
+                    ic(f"✓ {campo} capturado via regex: {valor}")
+                    break
+
+    # ESTRATÉGIA 3: Pares label-valor
+    ic("[3] Procurando estrutura de pares label-valor...")
+    for texto in snapshot.get("pares", []):
+        texto = texto.strip()
+        if ':' in texto:
+            label, valor = texto.split(':', 1)
+            _mapear_label(dados_paciente, label.strip().lower(), valor.strip())
+
+    # ESTRATÉGIA 4: Campos input
+    ic("[4] Verificando campos de input...")
+    for inp in snapshot.get("inputs", []):
+        value = inp.get("value") or ""
+        if not value:
+            continue
+
+        attrs = (inp.get("name") or "").lower() + " " + (inp.get("id") or "").lower()
+
+        if 'nome' in attrs and not dados_paciente["nome_registro"] and len(value) > 5:
+            dados_paciente["nome_registro"] = value
+            ic(f"✓ Nome capturado do input: {value}")
+
+        elif ('data' in attrs or 'nasc' in attrs) and not dados_paciente["data_nascimento"]:
+            if re.match(r'\d{2}/\d{2}/\d{4}', value):
+                dados_paciente["data_nascimento"] = value
+                ic(f"✓ Data capturada do input: {value}")
+
+        elif 'cpf' in attrs and not dados_paciente["cpf"]:
+            cpf_limpo = re.sub(r'[^\d]', '', value)
+            if len(cpf_limpo) == 11:
+                dados_paciente["cpf"] = cpf_limpo
+                ic(f"✓ CPF capturado do input: {cpf_limpo}")
+
+        elif ('raca' in attrs or 'cor' in attrs) and not dados_paciente["raca"]:
+            dados_paciente["raca"] = value
+            ic(f"✓ Raça capturada do input: {value}")
+
+        elif ('codigo' in attrs or 'same' in attrs) and not dados_paciente["codigo_paciente"]:
+            codigo = re.sub(r'[^\d]', '', value)
+            if codigo:
+                dados_paciente["codigo_paciente"] = codigo
+                ic(f"✓ Código capturado do input: {codigo}")
+
+        elif 'naturalidade' in attrs and not dados_paciente["naturalidade"]:
+            dados_paciente["naturalidade"] = value
+            ic(f"✓ Naturalidade capturada do input: {value}")
+
+    return dados_paciente
+
+
+def extrair_dados_atendimento(texto_completo: str, prefix: str = "") -> Dict:
+    """
+    Aplica os regex de atendimento sobre o texto da área de conteúdo.
+
+    Args:
+        texto_completo: Texto visível do atendimento selecionado
+        prefix: Prefixo para os logs
+
+    Returns:
+        Dicionário com os dados do atendimento
+    """
+    dados_atendimento = novo_dados_atendimento(texto_completo)
+    page_text = texto_completo or ""
+
+    for campo, padroes in PADROES_ATENDIMENTO.items():
+        if not dados_atendimento[campo]:
+            for padrao in padroes:
+                match = re.search(padrao, page_text, re.IGNORECASE)
+                if match:
+                    valor = match.group(1).strip() if match.lastindex else match.group(0).strip()
+                    dados_atendimento[campo] = valor
+                    ic(f"{prefix}✓ {campo}: {valor}")
+                    break
+
+    # Capturar histórico/anamnese (geralmente texto longo)
+    for pattern in PADROES_HISTORICO:
+        match = re.search(pattern, page_text, re.IGNORECASE | re.DOTALL)
+        if match:
+            dados_atendimento["historico_anamnese"] = match.group(1).strip()[:500]  # Limitar a 500 chars
+            ic(f"{prefix}✓ Histórico capturado ({len(dados_atendimento['historico_anamnese'])} chars)")
+            break
+
+    # Verificar se capturou algo útil
+    campos_preenchidos = sum(1 for k, v in dados_atendimento.items()
+                             if k not in ["texto_completo", "data_captura"] and v)
+
+    ic(f"{prefix}Campos capturados: {campos_preenchidos}/5")
+
+    return dados_atendimento
@@ -0,0 +1,330 @@
+"""
+Reextração offline sobre HTMLs salvos do PEP.
+
+Quando faltam campos, capturar_dados_paciente salva o page_source em
+dados_pacientes/page_source_{prontuario}_{timestamp}.html. Este script roda
+de novo as heurísticas de extracao.py sobre esses arquivos, sem navegador:
+o HTML é lido com lxml, convertido no mesmo snapshot que o navegador
+produziria e passado para extrair_dados_demograficos/extrair_dados_atendimento.
+Os arquivos são processados em paralelo (um processo por núcleo).
+
+Uso:
+    python src/extracao_offline.py
+    python src/extracao_offline.py --entrada dados_pacientes --saida dados_pacientes/reextraidos --processos 8
+"""
+
+import re
+import json
+import argparse
+from pathlib import Path
+from typing import Dict, List, Optional
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+import lxml.html
+from icecream import ic
+
+from extracao import (
+    HISTORICO_SELECTORS,
+    CONTENT_SELECTORS,
+    CAMPOS_DEMOGRAFICOS,
+    novo_dados_paciente,
+    extrair_dados_demograficos,
+    extrair_dados_atendimento
+)
+
+
+# Tags que não geram texto visível
+TAGS_IGNORADAS = {"script", "style", "noscript", "template", "head", "title", "meta", "link", "svg"}
+
+# Tags renderizadas como bloco (quebram linha no innerText)
+TAGS_BLOCO = {
+    "address", "article", "aside", "blockquote", "dd", "div", "dl", "dt", "fieldset",
+    "figcaption", "figure", "footer", "form", "h1", "h2", "h3", "h4", "h5", "h6",
+    "header", "hr", "li", "main", "nav", "ol", "pre", "section", "table", "tbody",
+    "thead", "tr", "ul", "mat-card", "mat-card-content", "mat-list-item",
+}
+
+PADRAO_ARQUIVO = re.compile(r"page_source_(?P<prontuario>\d+)_(?P<timestamp>\d{8}_\d{6})\.html$")
+PADRAO_OCULTO = re.compile(r"display\s*:\s*none|visibility\s*:\s*hidden", re.IGNORECASE)
+
+
+# ============================================================================
+# SNAPSHOT A PARTIR DO HTML
+# ============================================================================
+
+def _oculto(el) -> bool:
+    """Aproximação de visibilidade sem layout: atributo hidden ou estilo inline"""
+    return el.get("hidden") is not None or bool(PADRAO_OCULTO.search(el.get("style") or ""))
+
+
+def _renderizar(el, partes: List[str]):
+    """Acumula em `partes` o texto do elemento no formato do innerText"""
+    tag = el.tag if isinstance(el.tag, str) else ""
+
+    if tag in TAGS_IGNORADAS or not tag or _oculto(el):
+        return
+
+    if tag == "br":
+        partes.append("\n")
+        return
+
+    bloco = tag in TAGS_BLOCO
+    separador = "\n\n" if tag == "p" else "\n"
+
+    if bloco or tag == "p":
+        partes.append(separador)
+    if el.text:
+        partes.append(re.sub(r"\s+", " ", el.text))
+
+    for filho in el:
+        _renderizar(filho, partes)
+        if filho.tail:
+            partes.append(re.sub(r"\s+", " ", filho.tail))
+
+    if bloco or tag == "p":
+        partes.append(separador)
+
+
+def texto_visivel(el) -> str:
+    """
+    Texto de um elemento como o navegador devolveria em innerText.
+
+    Args:
+        el: Elemento lxml
+
+    Returns:
+        Texto com quebras de linha entre blocos e espaços colapsados
+    """
+    partes: List[str] = []
+    _renderizar(el, partes)
+
+    linhas = [linha.strip() for linha in "".join(partes).split("\n")]
+    texto = "\n".join(linhas).strip()
+    return re.sub(r"\n{3,}", "\n\n", texto)
+
+
+def _visivel(el) -> bool:
+    """Elemento e ancestrais sem marcação de oculto"""
+    return not _oculto(el) and not any(_oculto(a) for a in el.iterancestors())
+
+
+def _por_seletor(root, seletor: str) -> List:
+    """Aplica seletor CSS ou XPath (iniciado por //)"""
+    if seletor.startswith("//"):
+        return root.xpath(seletor)
+    return root.cssselect(seletor)
+
+
+def _primeiro_texto(el) -> str:
+    """Primeiro nó de texto filho (equivalente ao text() do XPath 1.0)"""
+    nos = el.xpath("text()")
+    return str(nos[0]) if nos else ""
+
+
+def construir_snapshot_html(html: str) -> Dict:
+    """
+    Constrói a partir do HTML o mesmo snapshot que capturar_snapshot produz
+    no navegador.
+
+    Args:
+        html: Conteúdo do page_source salvo
+
+    Returns:
+        Snapshot (ver extracao.py)
+    """
+    root = lxml.html.fromstring(html)
+    body = root.find("body")
+    if body is None:
+        body = root
+
+    def texto(el) -> str:
+        return texto_visivel(el) if _visivel(el) else ""
+
+    snapshot = {
+        "texto": texto_visivel(body),
+        "h2_nome": "",
+        "nomes_candidatos": [],
+        "pares": [],
+        "inputs": [],
+        "historico": []
+    }
+
+    # [1] Primeiro h2 com classe mat-card-title ou texto com espaço
+    for h2 in body.iter("h2"):
+        if "mat-card-title" in (h2.get("class") or "") or " " in _primeiro_texto(h2):
+            snapshot["h2_nome"] = texto(h2)
+            break
+
+    # [1b] Elementos com classe title/name/paciente
+    for el in body.xpath("//*[contains(@class, 'title') or contains(@class, 'name') or contains(@class, 'paciente')]"):
+        t = texto(el)
+        if t:
+            snapshot["nomes_candidatos"].append(t)
+
+    # [3] Pares label-valor
+    for tag in ("div", "span", "p"):
+        for el in body.iter(tag):
+            if ":" in _primeiro_texto(el):
+                t = texto(el)
+                if t:
+                    snapshot["pares"].append(t)
+    for tag in ("label", "dt"):
+        for el in body.iter(tag):
+            t = texto(el)
+            if t:
+                snapshot["pares"].append(t)
+
+    # [4] Inputs
+    for inp in body.iter("input"):
+        snapshot["inputs"].append({
+            "name": inp.get("name") or "",
+            "id": inp.get("id") or "",
+            "value": inp.get("value") or ""
+        })
+
+    # Histórico: primeiro seletor com algum item visível
+    for seletor in HISTORICO_SELECTORS:
+        try:
+            itens = _por_seletor(body, seletor)
+        except Exception:
+            continue
+        if any(_visivel(el) for el in itens):
+            snapshot["historico"] = [
+                {"texto": texto_visivel(el), "visivel": _visivel(el)} for el in itens
+            ]
+            break
+
+    # Texto do atendimento selecionado (mesma regra de SCRIPT_TEXTO_CONTEUDO)
+    snapshot["texto_conteudo"] = snapshot["texto"]
+    for seletor in CONTENT_SELECTORS:
+        encontrados = body.cssselect(seletor)
+        if encontrados and _visivel(encontrados[0]):
+            snapshot["texto_conteudo"] = texto_visivel(encontrados[0])
+            break
+
+    return snapshot
+
+
+# ============================================================================
+# REEXTRAÇÃO
+# ============================================================================
+
+def reextrair_arquivo(html_path: Path, prontuario: Optional[str] = None) -> Dict:
+    """
+    Reextrai os dados de um page_source salvo.
+
+    Args:
+        html_path: Caminho do HTML
+        prontuario: Número do prontuário (default: extraído do nome do arquivo)
+
+    Returns:
+        Dicionário no mesmo formato de capturar_dados_paciente
+    """
+    html_path = Path(html_path)
+    match = PADRAO_ARQUIVO.search(html_path.name)
+
+    if prontuario is None:
+        prontuario = match.group("prontuario") if match else html_path.stem
+
+    with open(html_path, "r", encoding="utf-8") as f:
+        snapshot = construir_snapshot_html(f.read())
+
+    atendimentos = []
+    if snapshot["texto_conteudo"]:
+        atendimentos.append(extrair_dados_atendimento(snapshot["texto_conteudo"]))
+
+    dados_paciente = novo_dados_paciente(prontuario, atendimentos)
+    extrair_dados_demograficos(snapshot, dados_paciente)
+
+    # A captura aconteceu quando o HTML foi salvo, não agora
+    if match:
+        capturado = datetime.strptime(match.group("timestamp"), "%Y%m%d_%H%M%S")
+        dados_paciente["data_captura"] = capturado.strftime("%Y-%m-%d %H:%M:%S")
+        for atendimento in atendimentos:
+            atendimento["data_captura"] = dados_paciente["data_captura"]
+
+    return dados_paciente
+
+
+def _processar(args) -> Dict:
+    """Worker do pool: reextrai um arquivo e salva o JSON"""
+    html_path, saida_dir, verbose = args
+
+    if not verbose:
+        ic.disable()
+
+    try:
+        dados_paciente = reextrair_arquivo(html_path)
+    except Exception as e:
+        return {"arquivo": html_path.name, "erro": str(e)}
+
+    nome_saida = html_path.name.replace("page_source_", "paciente_").replace(".html", ".json")
+    with open(saida_dir / nome_saida, "w", encoding="utf-8") as f:
+        json.dump(dados_paciente, f, ensure_ascii=False, indent=4)
+
+    capturados = sum(1 for campo in CAMPOS_DEMOGRAFICOS if dados_paciente[campo])
+    return {"arquivo": html_path.name, "capturados": capturados}
+
+
+def reextrair_diretorio(
+    entrada_dir: Path,
+    saida_dir: Path,
+    processos: Optional[int] = None,
+    padrao: str = "page_source_*.html",
+    verbose: bool = False
+) -> List[Dict]:
+    """
+    Reextrai todos os HTMLs de um diretório em paralelo.
+
+    Args:
+        entrada_dir: Diretório com os page_source_*.html
+        saida_dir: Diretório de saída dos JSONs
+        processos: Número de processos (default: número de núcleos)
+        padrao: Glob dos arquivos HTML
+        verbose: Mostrar logs de extração de cada arquivo
+
+    Returns:
+        Lista com o resumo de cada arquivo
+    """
+    arquivos = sorted(Path(entrada_dir).glob(padrao))
+    saida_dir = Path(saida_dir)
+    saida_dir.mkdir(parents=True, exist_ok=True)
+
+    ic(f"Reextraindo {len(arquivos)} arquivo(s) de {entrada_dir} → {saida_dir}")
+
+    if not arquivos:
+        return []
+
+    tarefas = [(arquivo, saida_dir, verbose) for arquivo in arquivos]
+
+    with ProcessPoolExecutor(max_workers=processos) as executor:
+        resultados = list(executor.map(_processar, tarefas, chunksize=8))
+
+    erros = [r for r in resultados if "erro" in r]
+    for r in erros:
+        ic(f"⚠️ {r['arquivo']}: {r['erro']}")
+
+    ic(f"✓ {len(resultados) - len(erros)} arquivo(s) reextraído(s), {len(erros)} erro(s)")
+    return resultados
+
+
+def main():
+    """Função principal do script"""
+    root = Path(__file__).parent.parent
+
+    parser = argparse.ArgumentParser(description="Reextração offline dos page_source salvos do PEP")
+    parser.add_argument("--entrada", default=str(root / "dados_pacientes"), help="Diretório com os HTMLs")
+    parser.add_argument("--saida", default=str(root / "dados_pacientes" / "reextraidos"), help="Diretório de saída")
+    parser.add_argument("--processos", type=int, default=None, help="Número de processos (default: núcleos)")
+    parser.add_argument("--padrao", default="page_source_*.html", help="Glob dos arquivos HTML")
+    parser.add_argument("--verbose", action="store_true", help="Mostrar logs de cada extração")
+    args = parser.parse_args()
+
+    ic.configureOutput(prefix=lambda: f'[{datetime.now().strftime("%H:%M:%S")}] ')
+
+    reextrair_diretorio(Path(args.entrada), Path(args.saida), args.processos, args.padrao, args.verbose)
+
+
+if __name__ == "__main__":
+    main()
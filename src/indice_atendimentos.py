@@ -0,0 +1,254 @@
+"""
+Captura incremental: índice, por prontuário, dos atendimentos já capturados.
+
+Cada item do histórico recebe uma chave tirada do texto do próprio item: o
+número do atendimento ("ATENDIMENTO 9082530") quando o item o mostra, senão
+"data|especialidade" (ver chave_item_historico). O backend AMF monta a mesma
+chave a partir do PAR_CD_ATENDIMENTO do registro (ver chaves_atendimentos),
+então os dois caminhos compartilham o índice. O registro do paciente fica em
+dados_pacientes/incremental/paciente_<prontuario>.json, com os atendimentos
+e o índice {chave: data_captura}. Ao reprocessar o paciente:
+
+- as chaves do histórico atual são comparadas com o índice;
+- só os itens novos são abertos e capturados;
+- os novos são mesclados ao registro gravado (dados demográficos atualizados,
+  atendimentos antigos mantidos), que é regravado de forma atômica.
+
+Assim a atualização periódica de uma coorte custa proporcionalmente às
+consultas novas, não ao histórico inteiro.
+"""
+
+import os
+import re
+import json
+from pathlib import Path
+from typing import Dict, List, Optional
+from datetime import datetime
+
+from icecream import ic
+
+from extracao import CAMPOS_DEMOGRAFICOS
+
+
+PASTA_INCREMENTAL = "incremental"
+
+_RE_DATA = re.compile(r"\d{2}/\d{2}/\d{4}(?:\s+\d{2}:\d{2})?")
+_RE_NUMERO_ATENDIMENTO = re.compile(r"\bATENDIMENTO\s+(\d+)", re.IGNORECASE)
+
+
+def captura_incremental() -> bool:
+    """PEP_CAPTURA_INCREMENTAL=1 liga a captura incremental"""
+    return os.getenv("PEP_CAPTURA_INCREMENTAL", "0").lower() in ("1", "true", "sim")
+
+
+def chave_atendimento(numero: str) -> str:
+    """Chave de um atendimento identificado pelo número"""
+    return f"ATENDIMENTO {numero}"
+
+
+def chave_item_historico(texto: str) -> str:
+    """
+    Chave de um item do histórico.
+
+    Se o texto traz o número do atendimento ("Atendimento 9082530, ..."),
+    a chave é chave_atendimento(numero). Senão é "data|especialidade": a
+    data é a primeira data (com hora, se houver) do texto e a especialidade
+    a primeira linha restante. Sem data, a chave é o texto normalizado.
+
+    Args:
+        texto: innerText do item do histórico
+
+    Returns:
+        Chave do atendimento
+    """
+    numero = _RE_NUMERO_ATENDIMENTO.search(texto or "")
+    if numero:
+        return chave_atendimento(numero.group(1))
+
+    linhas = [" ".join(linha.split()).upper() for linha in (texto or "").splitlines()]
+    linhas = [linha for linha in linhas if linha]
+
+    data = ""
+    especialidade = ""
+    for linha in linhas:
+        encontrada = _RE_DATA.search(linha)
+        if encontrada and not data:
+            data = " ".join(encontrada.group(0).split())
+            linha = (linha[:encontrada.start()] + linha[encontrada.end():]).strip(" -|")
+        if linha and not especialidade:
+            especialidade = linha
+
+    if not data:
+        return " ".join(linhas)
+    return f"{data}|{especialidade}"
+
+
+def chaves_historico(textos: List[str]) -> List[str]:
+    """
+    Chaves dos itens do histórico, na ordem da lista.
+
+    Itens repetidos (mesma data e especialidade) recebem sufixo #2, #3...
+    contado a partir do fim da lista: o histórico do PEP vem do mais novo
+    para o mais antigo, então um atendimento novo repetido ganha o maior
+    sufixo e as chaves dos antigos não mudam.
+
+    Args:
+        textos: innerText de cada item do histórico (mais novo primeiro)
+
+    Returns:
+        Lista de chaves únicas
+    """
+    vistas: Dict[str, int] = {}
+    chaves = []
+    for texto in reversed(textos):
+        chave = chave_item_historico(texto)
+        vistas[chave] = vistas.get(chave, 0) + 1
+        chaves.append(chave if vistas[chave] == 1 else f"{chave}#{vistas[chave]}")
+    return chaves[::-1]
+
+
+def _data_ordenavel(texto: str) -> str:
+    """Primeira data DD/MM/AAAA [HH:MM] do texto como AAAAMMDD HH:MM ("" se não houver)"""
+    encontrada = _RE_DATA.search(texto or "")
+    if not encontrada:
+        return ""
+    data, _, hora = " ".join(encontrada.group(0).split()).partition(" ")
+    dia, mes, ano = data.split("/")
+    return f"{ano}{mes}{dia} {hora}"
+
+
+def chaves_atendimentos(atendimentos: List[Dict]) -> List[str]:
+    """
+    Chaves de atendimentos já extraídos (ex. pelo backend AMF).
+
+    Usa numero_atendimento quando presente (mesma chave do item do histórico
+    que mostra o número), senão data_atendimento e especialidade com a mesma
+    normalização dos itens do histórico. Os repetidos (ex.: dois documentos
+    do mesmo atendimento) são numerados do mais antigo para o mais novo
+    (ordem das datas), como em chaves_historico, seja qual for a ordem da
+    lista recebida.
+
+    Args:
+        atendimentos: Atendimentos no formato de novo_dados_atendimento
+
+    Returns:
+        Chaves, na ordem da lista recebida
+    """
+    textos = [
+        chave_atendimento(a["numero_atendimento"]) if a.get("numero_atendimento")
+        else f"{a.get('data_atendimento', '')}\n{a.get('especialidade', '')}"
+        for a in atendimentos
+    ]
+    ordem = sorted(
+        range(len(textos)),
+        key=lambda i: _data_ordenavel(atendimentos[i].get("data_atendimento", "")),
+        reverse=True
+    )
+
+    chaves = [""] * len(textos)
+    for posicao, chave in zip(ordem, chaves_historico([textos[i] for i in ordem])):
+        chaves[posicao] = chave
+    return chaves
+
+
+def caminho_registro(prontuario: str, root: Path) -> Path:
+    """Arquivo do registro incremental do prontuário"""
+    return Path(root) / "dados_pacientes" / PASTA_INCREMENTAL / f"paciente_{prontuario}.json"
+
+
+def carregar_registro(prontuario: str, root: Path) -> Optional[Dict]:
+    """
+    Carrega o registro incremental gravado do prontuário.
+
+    Args:
+        prontuario: Número do prontuário
+        root: Raiz do projeto
+
+    Returns:
+        dados_paciente com "indice_atendimentos", ou None se não houver
+    """
+    arquivo = caminho_registro(prontuario, root)
+    if not arquivo.exists():
+        return None
+
+    try:
+        with open(arquivo, "r", encoding="utf-8") as f:
+            registro = json.load(f)
+    except Exception as e:
+        ic(f"⚠️ Registro incremental de {prontuario} ilegível, recapturando tudo: {e}")
+        return None
+
+    registro.setdefault("indice_atendimentos", {})
+    return registro
+
+
+def itens_novos(chaves: List[str], registro: Optional[Dict]) -> List[int]:
+    """
+    Posições do histórico cujas chaves ainda não estão no índice.
+
+    Args:
+        chaves: Chaves do histórico atual (chaves_historico)
+        registro: Registro gravado (ou None)
+
+    Returns:
+        Índices (0-based) dos itens a capturar
+    """
+    indice = registro.get("indice_atendimentos", {}) if registro else {}
+    return [i for i, chave in enumerate(chaves) if chave not in indice]
+
+
+def mesclar_registro(registro: Optional[Dict], dados_paciente: Dict, chaves: List[str]) -> Dict:
+    """
+    Mescla a captura atual (só atendimentos novos) no registro gravado.
+
+    Os atendimentos seguem a ordem do histórico atual; os que sumiram do
+    histórico continuam no fim. Campos demográficos vazios na captura atual
+    mantêm o valor gravado.
+
+    Args:
+        registro: Registro gravado (ou None na primeira captura)
+        dados_paciente: Captura atual; atendimentos com "chave_historico"
+        chaves: Chaves do histórico atual
+
+    Returns:
+        Registro mesclado, com "indice_atendimentos" atualizado
+    """
+    registro = registro or {"indice_atendimentos": {}, "atendimentos": []}
+
+    por_chave = {a.get("chave_historico"): a for a in registro.get("atendimentos", [])}
+    indice = dict(registro.get("indice_atendimentos", {}))
+    for atendimento in dados_paciente["atendimentos"]:
+        chave = atendimento["chave_historico"]
+        por_chave[chave] = atendimento
+        indice[chave] = atendimento.get("data_captura", "")
+
+    atendimentos = [por_chave.pop(chave) for chave in chaves if chave in por_chave]
+    atendimentos += list(por_chave.values())
+
+    mesclado = dict(dados_paciente)
+    for campo in CAMPOS_DEMOGRAFICOS:
+        if not mesclado.get(campo):
+            mesclado[campo] = registro.get(campo, "")
+    mesclado["atendimentos"] = atendimentos
+    mesclado["total_atendimentos"] = len(atendimentos)
+    mesclado["indice_atendimentos"] = indice
+    mesclado["data_atualizacao"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    return mesclado
+
+
+def gravar_registro(registro: Dict, root: Path) -> Path:
+    """
+    Grava o registro incremental de forma atômica.
+
+    Returns:
+        Caminho do arquivo gravado
+    """
+    arquivo = caminho_registro(registro["prontuario"], root)
+    arquivo.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = arquivo.with_suffix(".json.tmp")
+
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(registro, f, ensure_ascii=False, indent=4)
+    os.replace(tmp_file, arquivo)
+
+    return arquivo
@@ -9,10 +9,60 @@ import os
 import pandas as pd
 from io import StringIO
 from pathlib import Path
-from typing import List, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence, Tuple
 from icecream import ic
 from datetime import datetime
 
+from cache_sigh import (
+    get_cache_dir,
+    carregar_manifesto,
+    salvar_manifesto,
+    consultar_cache,
+    gravar_cache,
+    podar_cache
+)
+
+
+# Linhas por bloco na leitura em streaming (ver iterar_pacientes_sigh)
+TAMANHO_CHUNK = 50_000
+
+# Opções do parser C para o formato do SIGH (todos os campos entre aspas)
+OPCOES_CSV_SIGH = {
+    "sep": ",",
+    "quotechar": '"',
+    "encoding": "iso-8859-1",
+    "dtype": str,
+    "na_filter": False,
+    "engine": "c",
+}
+
+# Versão do parser (OPCOES_CSV_SIGH/carregar_csv_sigh): incrementar a cada
+# mudança no resultado da leitura, para o cache Parquet ser descartado
+VERSAO_PARSER = 1
+
+# Colunas do SIGH levadas ao plano por paciente (usadas pelo agendador)
+COLUNAS_PLANO = {
+    "NOME ESPECIALIDADE": "especialidade",
+    "UNIDADE": "unidade",
+}
+
+# Tipos da tabela em memória (ver tipar_dataframe_sigh). As colunas de texto
+# repetitivo (unidades, serviços, tipos...) viram categóricas; as que não
+# estão em nenhuma lista (nome do paciente etc.) continuam como texto.
+# MATRÍCULA fica como texto: zeros à esquerda e separadores ("0123-4") são
+# normalizados em normalizar_pacientes e não podem virar <NA> antes disso.
+COLUNAS_CATEGORICAS = [
+    "UNIDADE", "SERVIÇO", "NOME SERVIÇO", "ESPEC", "NOME ESPECIALIDADE",
+    "NOME UNIDADE", "TIPO", "DS_TIPO", "DC", "SIT. PÓS-CONSULTA",
+    "NM_RESPONSAVEL", "REG_CONS",
+]
+COLUNAS_INTEIRAS = ["CNS"]
+COLUNAS_DATAHORA = {
+    "DATA": "%d/%m/%Y",
+    "DH_INCL_CONS": "%d/%m/%Y %H:%M:%S",
+}
+
 
 def setup_icecream():
     """Configura icecream com timestamp"""
@@ -42,7 +92,9 @@ def encontrar_csvs(data_dir: str = None) -> List[Path]:
         ic(f"⚠️ Diretório não existe: {data_dir}")
         return []
 
-    csv_files = list(data_dir.glob("*.csv"))
+    # Ordenados pelo nome: AGE_CONS_REAL_RES_<data> fica em ordem cronológica
+    # e a ordem (que decide qual duplicata fica) não depende do sistema de arquivos
+    csv_files = sorted(data_dir.glob("*.csv"))
     ic(f"✓ {len(csv_files)} arquivo(s) CSV encontrado(s)")
 
     for csv_file in csv_files:
@@ -51,12 +103,30 @@ def encontrar_csvs(data_dir: str = None) -> List[Path]:
     return csv_files
 
 
+def _carregar_csv_sigh_legado(filepath: Path) -> pd.DataFrame:
+    """
+    Leitura antiga: troca vírgulas por ' ; ' e parseia com o engine python.
+
+    Mantida só como fallback para arquivos que o parser C rejeitar (e como
+    referência no benchmark scripts/bench_csv_sigh.py).
+    """
+    with open(filepath, "r", encoding="iso-8859-1") as f:
+        content = f.read().replace(",", " ; ")
+
+    df = pd.read_csv(StringIO(content), sep=" ; ", engine='python')
+    df = df.replace('"', '', regex=True)
+    df.columns = [col.replace('"', '') for col in df.columns]
+    return df
+
+
 def carregar_csv_sigh(filepath: Path) -> pd.DataFrame:
     """
-    Carrega um arquivo CSV do SIGH com tratamento especial para vírgulas.
+    Carrega um arquivo CSV do SIGH.
 
-    O SIGH exporta CSVs mal-formatados com vírgulas dentro dos campos.
-    Esta função trata isso substituindo vírgulas por ' ; ' antes do parse.
+    O SIGH exporta todos os campos entre aspas e alguns deles contêm
+    vírgulas. O parser C do pandas respeita as aspas, então o arquivo é lido
+    numa única passada, sem cópia intermediária nem limpeza por regex.
+    Todos os campos ficam como texto (campos vazios = "").
 
     Args:
         filepath: Caminho para o arquivo CSV
@@ -67,19 +137,16 @@ def carregar_csv_sigh(filepath: Path) -> pd.DataFrame:
     ic(f"Carregando: {filepath.name}")
 
     try:
-        # Ler arquivo e substituir vírgulas
-        with open(filepath, "r", encoding="iso-8859-1") as f:
-            content = f.read().replace(",", " ; ")
+        df = pd.read_csv(filepath, **OPCOES_CSV_SIGH)
 
-        # Parsear como CSV
-        df = pd.read_csv(StringIO(content), sep=" ; ", engine='python')
-
-        # Limpar aspas de todos os valores
-        df = df.replace('"', '', regex=True)
+        ic(f"✓ {len(df)} linhas carregadas de {filepath.name}")
+        return df
 
-        # Limpar aspas dos nomes das colunas
-        df.columns = [col.replace('"', '') for col in df.columns]
+    except pd.errors.ParserError as e:
+        ic(f"⚠️ Parser rápido falhou em {filepath.name} ({e}), usando leitura antiga")
 
+    try:
+        df = _carregar_csv_sigh_legado(filepath)
         ic(f"✓ {len(df)} linhas carregadas de {filepath.name}")
         return df
 
@@ -88,6 +155,97 @@ def carregar_csv_sigh(filepath: Path) -> pd.DataFrame:
         return pd.DataFrame()
 
 
+def carregar_csvs(
+    csv_files: List[Path],
+    processos: int = None,
+    usar_cache: bool = None
+) -> List[pd.DataFrame]:
+    """
+    Carrega vários CSVs, usando o cache Parquet e processos em paralelo.
+
+    Arquivos sem mudança desde a última leitura vêm do cache (ver
+    cache_sigh.py); só os novos ou modificados são parseados, um processo
+    por arquivo. O resultado mantém a ordem de `csv_files` (executor.map
+    preserva a ordem), então unificar_dataframes continua mantendo a mesma
+    ocorrência de cada duplicata que mantinha na leitura sequencial.
+
+    Args:
+        csv_files: Arquivos a carregar
+        processos: Número de processos (default: PEP_PROCESSOS_CSV ou núcleos)
+        usar_cache: Usar o cache Parquet (default: PEP_CACHE_CSV, ligado)
+
+    Returns:
+        Lista de DataFrames não vazios, na ordem dos arquivos
+    """
+    if not csv_files:
+        return []
+
+    if usar_cache is None:
+        usar_cache = os.getenv("PEP_CACHE_CSV", "1") != "0"
+
+    dataframes = [None] * len(csv_files)
+    pendentes = list(range(len(csv_files)))
+
+    if usar_cache:
+        cache_dir = get_cache_dir(csv_files[0].parent)
+        manifesto = carregar_manifesto(cache_dir, VERSAO_PARSER)
+
+        for i, csv_file in enumerate(csv_files):
+            dataframes[i] = consultar_cache(manifesto, csv_file, cache_dir)
+
+        pendentes = [i for i, df in enumerate(dataframes) if df is None]
+        ic(f"Cache: {len(csv_files) - len(pendentes)} arquivo(s) sem mudança, {len(pendentes)} para ler")
+
+    if pendentes:
+        arquivos = [csv_files[i] for i in pendentes]
+
+        if processos is None:
+            processos = int(os.getenv("PEP_PROCESSOS_CSV", "0")) or os.cpu_count() or 1
+        processos = max(1, min(processos, len(arquivos)))
+
+        if processos == 1:
+            lidos = [carregar_csv_sigh(csv_file) for csv_file in arquivos]
+        else:
+            ic(f"Carregando {len(arquivos)} arquivo(s) em {processos} processo(s)...")
+            with ProcessPoolExecutor(max_workers=processos) as executor:
+                lidos = list(executor.map(carregar_csv_sigh, arquivos))
+
+        for i, df in zip(pendentes, lidos):
+            dataframes[i] = df
+            if usar_cache and not df.empty:
+                gravar_cache(manifesto, csv_files[i], df, cache_dir)
+
+    if usar_cache:
+        podar_cache(manifesto, cache_dir)
+        salvar_manifesto(manifesto, cache_dir, VERSAO_PARSER)
+
+    return [df for df in dataframes if not df.empty]
+
+
+def ler_csv_sigh_em_chunks(filepath: Path, tamanho_chunk: int = TAMANHO_CHUNK) -> Iterator[pd.DataFrame]:
+    """
+    Lê um CSV do SIGH em blocos de `tamanho_chunk` linhas.
+
+    Args:
+        filepath: Caminho para o arquivo CSV
+        tamanho_chunk: Linhas por bloco
+
+    Yields:
+        DataFrames com no máximo `tamanho_chunk` linhas
+    """
+    try:
+        with pd.read_csv(filepath, chunksize=tamanho_chunk, **OPCOES_CSV_SIGH) as leitor:
+            yield from leitor
+        return
+    except pd.errors.ParserError as e:
+        ic(f"⚠️ Parser rápido falhou em {filepath.name} ({e}), usando leitura antiga")
+
+    # Fallback: o arquivo inteiro num bloco só
+    df = carregar_csv_sigh(filepath)
+    if not df.empty:
+        yield df
+
+
 def unificar_dataframes(dataframes: List[pd.DataFrame]) -> pd.DataFrame:
     """
     Unifica múltiplos DataFrames em um único, removendo duplicatas.
@@ -118,67 +276,270 @@ def unificar_dataframes(dataframes: List[pd.DataFrame]) -> pd.DataFrame:
     return df_unificado
 
 
-def processar_dados_pacientes(df: pd.DataFrame) -> Tuple[List[str], List[str], List]:
+def tipar_dataframe_sigh(df: pd.DataFrame) -> pd.DataFrame:
     """
-    Processa o DataFrame e extrai listas de nomes, matrículas e datas.
+    Converte a tabela do SIGH (só texto) para tipos compactos.
+
+    - COLUNAS_CATEGORICAS → category
+    - COLUNAS_INTEIRAS → Int64 (vazio ou não numérico vira <NA>)
+    - COLUNAS_DATAHORA → datetime64 (inválido vira NaT)
+    - HORA → timedelta64 (hora do dia, somável à DATA)
+
+    Colunas ausentes são ignoradas. Deve rodar depois de unificar_dataframes:
+    concatenar categóricas com categorias diferentes volta para texto.
+
+    Args:
+        df: DataFrame como lido por carregar_csv_sigh
+
+    Returns:
+        Novo DataFrame com as colunas convertidas
+    """
+    df = df.copy()
+
+    for coluna in COLUNAS_CATEGORICAS:
+        if coluna in df.columns:
+            df[coluna] = df[coluna].astype("category")
+
+    for coluna in COLUNAS_INTEIRAS:
+        if coluna in df.columns:
+            df[coluna] = pd.to_numeric(df[coluna].str.strip(), errors="coerce").astype("Int64")
+
+    for coluna, formato in COLUNAS_DATAHORA.items():
+        if coluna in df.columns:
+            df[coluna] = pd.to_datetime(df[coluna], format=formato, errors="coerce")
+
+    if "HORA" in df.columns:
+        df["HORA"] = pd.to_timedelta(df["HORA"] + ":00", errors="coerce")
+
+    return df
+
+
+def relatorio_memoria(antes: pd.DataFrame, depois: pd.DataFrame) -> pd.DataFrame:
+    """
+    Compara o uso de memória por coluna de dois DataFrames.
+
+    Args:
+        antes: DataFrame original
+        depois: Mesmo DataFrame com outros tipos
+
+    Returns:
+        DataFrame com tipo e MB antes/depois por coluna, mais a linha TOTAL
+    """
+    mb_antes = antes.memory_usage(deep=True, index=False) / 1024 / 1024
+    mb_depois = depois.memory_usage(deep=True, index=False) / 1024 / 1024
+
+    relatorio = pd.DataFrame({
+        "tipo_antes": antes.dtypes.astype(str),
+        "mb_antes": mb_antes,
+        "tipo_depois": depois.dtypes.astype(str),
+        "mb_depois": mb_depois,
+    })
+    relatorio.loc["TOTAL"] = ["", mb_antes.sum(), "", mb_depois.sum()]
+    relatorio["reducao"] = relatorio["mb_antes"] / relatorio["mb_depois"]
+    return relatorio
+
+
+def normalizar_pacientes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Normaliza nomes (strip + upper), matrículas (só dígitos) e datas, e
+    descarta as linhas sem matrícula.
+
+    Tudo em operações de coluna (str.strip/str.upper/str.replace com regex
+    e to_datetime), sem passar os valores por listas Python. Aceita a
+    tabela crua ou já tipada (tipar_dataframe_sigh); na crua, converte
+    df["DATA"] para datetime no próprio DataFrame, como antes.
+
+    Args:
+        df: DataFrame com NOME PACIENTE, MATRÍCULA e DATA
+
+    Returns:
+        DataFrame com as colunas nome, matricula e data, mais as de
+        COLUNAS_PLANO presentes no CSV (índice 0..n-1)
+    """
+    if not pd.api.types.is_datetime64_any_dtype(df["DATA"]):
+        df["DATA"] = pd.to_datetime(df["DATA"], format="%d/%m/%Y", errors='coerce')
+
+    pacientes = pd.DataFrame({
+        "nome": df["NOME PACIENTE"].astype(str).str.strip().str.upper(),
+        "matricula": df["MATRÍCULA"].astype(str).str.replace(r"[^0-9]+", "", regex=True),
+        "data": df["DATA"],
+    })
+    for coluna, nome in COLUNAS_PLANO.items():
+        if coluna in df.columns:
+            pacientes[nome] = df[coluna].to_numpy()
+
+    # Remover entradas vazias (só manter se matrícula não estiver vazia)
+    validos = pacientes["matricula"].str.len() > 0
+    removidos = len(pacientes) - int(validos.sum())
+    if removidos:
+        ic(f"⚠️ {removidos} entrada(s) removida(s) por matrícula vazia")
+
+    return pacientes[validos].reset_index(drop=True)
+
+
+def planejar_por_paciente(pacientes: pd.DataFrame) -> pd.DataFrame:
+    """
+    Agrupa os atendimentos por matrícula: cada prontuário é visitado uma vez.
+
+    O PEP mostra todos os atendimentos do paciente na mesma visita, então
+    basta uma entrada por matrícula, com as datas agregadas. A ordem é a da
+    primeira aparição de cada matrícula, e o nome também vem dela.
+
+    Args:
+        pacientes: Saída de normalizar_pacientes (nome, matricula, data)
+
+    Returns:
+        DataFrame com matricula, nome, datas (lista ordenada, sem repetição)
+        e n_atendimentos, uma linha por paciente, mais especialidades e
+        unidades (listas, na ordem de aparição) quando presentes
+    """
+    primeiros = pacientes.drop_duplicates("matricula")
+
+    datas = (
+        pacientes.dropna(subset=["data"])
+        .drop_duplicates(["matricula", "data"])
+        .sort_values("data", kind="stable")
+        .groupby("matricula", sort=False)["data"]
+        .agg(list)
+    )
+    contagem = pacientes.groupby("matricula", sort=False).size()
+
+    plano = pd.DataFrame({
+        "matricula": primeiros["matricula"].to_numpy(),
+        "nome": primeiros["nome"].to_numpy(),
+    })
+    plano["datas"] = [d if isinstance(d, list) else [] for d in plano["matricula"].map(datas)]
+    plano["n_atendimentos"] = plano["matricula"].map(contagem).to_numpy()
+
+    for nome in COLUNAS_PLANO.values():
+        if nome in pacientes.columns:
+            valores = (
+                pacientes.drop_duplicates(["matricula", nome])
+                .groupby("matricula", sort=False)[nome]
+                .agg(list)
+            )
+            plano[nome + "s"] = plano["matricula"].map(valores).to_numpy()
+
+    return plano
+
+
+def processar_dados_pacientes(
+    df: pd.DataFrame,
+    ordenar: Optional[Callable[[pd.DataFrame], pd.DataFrame]] = None
+) -> Tuple[Sequence[str], Sequence[str], Sequence]:
+    """
+    Processa o DataFrame e monta o plano de trabalho por paciente.
 
     Args:
         df: DataFrame com dados dos pacientes
+        ordenar: Função que reordena o plano (ex. agendador.criar_agendamento);
+            sem ela fica a ordem do CSV
 
     Returns:
-        Tupla com (lista_nomes, lista_matriculas, lista_datas)
+        Tupla com (nomes, matriculas, datas), uma posição por paciente
+        (ver planejar_por_paciente); datas traz a lista de datas dos
+        atendimentos de cada um
     """
     ic("Processando dados dos pacientes...")
 
-    # Extrair listas
-    nome_paciente_list = df["NOME PACIENTE"].tolist()
-    matricula_list = df["MATRÍCULA"].tolist()
+    pacientes = normalizar_pacientes(df)
+    plano = planejar_por_paciente(pacientes)
+    if ordenar is not None:
+        plano = ordenar(plano)
+    nomes = plano["nome"].array
+    matriculas = plano["matricula"].array
+    datas = plano["datas"].tolist()
 
-    # Converter DATA para datetime
-    df["DATA"] = pd.to_datetime(df["DATA"], format="%d/%m/%Y", errors='coerce')
-    data_list = df["DATA"].tolist()
+    ic(f"✓ {len(pacientes)} atendimento(s) de {len(matriculas)} paciente(s) único(s)")
+    ic(f"Exemplo - Nome: {nomes[0] if len(nomes) else 'N/A'}")
+    ic(f"Exemplo - Matrícula: {matriculas[0] if len(matriculas) else 'N/A'}")
 
-    # Limpar espaços
-    nome_paciente_list = [str(name).strip() for name in nome_paciente_list]
-    matricula_list = [str(matricula).strip() for matricula in matricula_list]
+    return nomes, matriculas, datas
 
-    # Uppercase nos nomes
-    nome_paciente_list = [name.upper() for name in nome_paciente_list]
 
-    # Apenas números na matrícula
-    matricula_list = [''.join(filter(str.isdigit, matricula)) for matricula in matricula_list]
+def iterar_pacientes_unicos(
+    registros: Iterable[Tuple[str, str, pd.Timestamp]]
+) -> Iterator[Tuple[str, str, pd.Timestamp]]:
+    """
+    Versão em streaming de planejar_por_paciente: só a primeira ocorrência
+    de cada matrícula segue adiante.
 
-    # Remover entradas vazias
-    dados_validos = [
-        (nome, matricula, data)
-        for nome, matricula, data in zip(nome_paciente_list, matricula_list, data_list)
-        if matricula  # Só manter se matrícula não estiver vazia
-    ]
+    As datas dos atendimentos seguintes não podem ser agregadas sem esperar
+    o fim da leitura; como o prontuário inteiro é capturado na visita, elas
+    são só descartadas.
 
-    if len(dados_validos) < len(nome_paciente_list):
-        ic(f"⚠️ {len(nome_paciente_list) - len(dados_validos)} entrada(s) removida(s) por matrícula vazia")
+    Args:
+        registros: Tuplas (nome, matricula, data), ex. de iterar_pacientes_sigh
 
-    nome_paciente_list, matricula_list, data_list = zip(*dados_validos) if dados_validos else ([], [], [])
-    nome_paciente_list = list(nome_paciente_list)
-    matricula_list = list(matricula_list)
-    data_list = list(data_list)
+    Yields:
+        Tuplas (nome, matricula, data) com matrícula inédita
+    """
+    vistas = set()
+    for nome, matricula, data in registros:
+        if matricula not in vistas:
+            vistas.add(matricula)
+            yield nome, matricula, data
 
-    ic(f"✓ {len(matricula_list)} paciente(s) processado(s)")
-    ic(f"Exemplo - Nome: {nome_paciente_list[0] if nome_paciente_list else 'N/A'}")
-    ic(f"Exemplo - Matrícula: {matricula_list[0] if matricula_list else 'N/A'}")
 
-    return nome_paciente_list, matricula_list, data_list
+def iterar_pacientes_sigh(
+    data_dir: str = None,
+    tamanho_chunk: int = TAMANHO_CHUNK
+) -> Iterator[Tuple[str, str, pd.Timestamp]]:
+    """
+    Versão em streaming de carregar_dados_sigh.
 
+    Lê os CSVs bloco a bloco e remove duplicatas de (MATRÍCULA, DATA) na
+    hora, com um set das chaves já vistas. Mesma ordem e mesma regra de
+    duplicatas de unificar_dataframes (fica a primeira ocorrência), mas só
+    um bloco fica em memória por vez e o primeiro paciente sai antes de
+    terminar a leitura.
 
-def carregar_dados_sigh(data_dir: str = None) -> Tuple[pd.DataFrame, List[str], List[str], List]:
+    Args:
+        data_dir: Caminho para o diretório de dados (opcional)
+        tamanho_chunk: Linhas por bloco
+
+    Yields:
+        Tuplas (nome, matricula, data) já normalizadas
+    """
+    vistos = set()
+    total = 0
+
+    for csv_file in encontrar_csvs(data_dir):
+        ic(f"Lendo em blocos: {csv_file.name}")
+
+        for chunk in ler_csv_sigh_em_chunks(csv_file, tamanho_chunk):
+            if 'MATRÍCULA' in chunk.columns and 'DATA' in chunk.columns:
+                chaves = zip(chunk['MATRÍCULA'].tolist(), chunk['DATA'].tolist())
+                mascara = []
+                for chave in chaves:
+                    mascara.append(chave not in vistos)
+                    vistos.add(chave)
+                chunk = chunk[mascara]
+
+            if chunk.empty:
+                continue
+
+            pacientes = normalizar_pacientes(chunk)
+            total += len(pacientes)
+            yield from pacientes[["nome", "matricula", "data"]].itertuples(index=False, name=None)
+
+    ic(f"✓ Streaming concluído: {total} registro(s) único(s)")
+
+
+def carregar_dados_sigh(
+    data_dir: str = None,
+    ordenar: Optional[Callable[[pd.DataFrame], pd.DataFrame]] = None
+) -> Tuple[pd.DataFrame, Sequence[str], Sequence[str], Sequence]:
     """
     Função principal que carrega todos os CSVs e retorna dados processados.
 
     Args:
         data_dir: Caminho para o diretório de dados (opcional)
+        ordenar: Ordem de processamento do plano (ver processar_dados_pacientes)
 
     Returns:
-        Tupla com (dataframe_completo, lista_nomes, lista_matriculas, lista_datas)
+        Tupla com (dataframe_completo, nomes, matriculas, datas), uma
+        posição por paciente único (datas = lista das datas de atendimento)
     """
     setup_icecream()
 
@@ -193,12 +554,8 @@ def carregar_dados_sigh(data_dir: str = None) -> Tuple[pd.DataFrame, List[str],
         ic("❌ Nenhum arquivo CSV encontrado!")
         return pd.DataFrame(), [], [], []
 
-    # Carregar cada CSV
-    dataframes = []
-    for csv_file in csv_files:
-        df = carregar_csv_sigh(csv_file)
-        if not df.empty:
-            dataframes.append(df)
+    # Carregar os CSVs (em paralelo quando há mais de um)
+    dataframes = carregar_csvs(csv_files)
 
     if not dataframes:
         ic("❌ Nenhum DataFrame válido carregado!")
@@ -207,8 +564,15 @@ def carregar_dados_sigh(data_dir: str = None) -> Tuple[pd.DataFrame, List[str],
     # Unificar DataFrames
     df_unificado = unificar_dataframes(dataframes)
 
+    # Tipos compactos (categóricas, inteiros, datas)
+    df_texto = df_unificado
+    df_unificado = tipar_dataframe_sigh(df_texto)
+    memoria = relatorio_memoria(df_texto, df_unificado).loc["TOTAL"]
+    ic(f"✓ Memória da tabela: {memoria['mb_antes']:.1f} MB → {memoria['mb_depois']:.1f} MB ({memoria['reducao']:.1f}x menor)")
+    del df_texto
+
     # Processar dados
-    nome_list, matricula_list, data_list = processar_dados_pacientes(df_unificado)
+    nome_list, matricula_list, data_list = processar_dados_pacientes(df_unificado, ordenar)
 
     ic("="*70)
     ic(f"✓✓✓ CARREGAMENTO CONCLUÍDO: {len(matricula_list)} pacientes prontos")
@@ -248,8 +612,8 @@ if __name__ == "__main__":
         print("="*70)
         print(f"Total de pacientes: {len(matriculas)}")
         print(f"Colunas disponíveis: {list(df.columns)}")
-        print(f"\nPrimeiras 3 matrículas: {matriculas[:3]}")
-        print(f"Primeiros 3 nomes: {nomes[:3]}")
+        print(f"\nPrimeiras 3 matrículas: {list(matriculas[:3])}")
+        print(f"Primeiros 3 nomes: {list(nomes[:3])}")
 
         # Salvar DataFrame processado
         salvar_dataframe_processado(df)
@@ -9,26 +9,46 @@ Este script:
 """
 
 import os
-import sys
-import json
-import time
-from pathlib import Path
-from typing import List, Dict, Optional
+import queue
+import threading
+from itertools import islice
+from typing import Iterable, List, Dict, Optional, Tuple
 from datetime import datetime
 
 from icecream import ic
 from dotenv import load_dotenv
 
 # Imports dos módulos locais
-from load_sigh_data import carregar_dados_sigh
+from load_sigh_data import carregar_dados_sigh, iterar_pacientes_sigh, iterar_pacientes_unicos
+from rate_limiter import LimitadorTaxa, criar_limitador
+from agendador import criar_agendamento
+from retentativas import (
+    AgendaRetentativas, criar_agenda_retentativas, intercalar, classificar_falha,
+    MOTIVOS_FALHA, ETAPA_BUSCA, ETAPA_SELECAO, ETAPA_CAPTURA, ETAPA_SESSAO, ETAPA_ERRO
+)
+from sessao import GerenciadorSessao
+from pool_navegadores import PoolNavegadores, criar_pool_navegadores
+from checkpoint import (
+    carregar_checkpoint,
+    salvar_checkpoint,
+    adicionar_ao_checkpoint,
+    filtrar_pendentes,
+    iterar_pendentes
+)
 from pep_scraper import (
-    configurar_driver,
-    fazer_login,
     navegar_para_pagina,
     buscar_paciente,
     selecionar_paciente,
+    abrir_pagina_paciente,
     capturar_dados_paciente,
-    get_root_path
+    completar_dados_paciente
+)
+from cliente_amf import backend_amf_habilitado, capturar_dados_paciente_amf
+from resolver_atendimento import (
+    carregar_cache_atendimentos,
+    obter_numero_atendimento,
+    registrar_numero_atendimento,
+    remover_numero_atendimento
 )
 
 
@@ -65,140 +85,369 @@ def carregar_credenciais() -> Dict[str, str]:
 
 
 # ============================================================================
-# CHECKPOINT SYSTEM
+# PROCESSAMENTO DE PACIENTE
 # ============================================================================
 
-def carregar_checkpoint() -> Dict:
+def abrir_paciente(driver, matricula: str, credenciais: Dict, cache_atendimentos: Dict) -> str:
     """
-    Carrega checkpoint do processamento anterior.
+    Abre a página do paciente, indo direto pela URL quando o número do
+    atendimento já está no cache.
+
+    Sem cache (ou se a URL direta falhar), volta para a página de busca,
+    busca e seleciona o paciente, e guarda o número descoberto no cache.
+
+    Args:
+        driver: WebDriver do Selenium
+        matricula: Número da matrícula (prontuário)
+        credenciais: Dicionário com credenciais
+        cache_atendimentos: Cache matrícula → número do atendimento
 
     Returns:
-        Dicionário com dados do checkpoint
+        "" se a página do paciente foi aberta, senão a etapa que falhou
+        (ETAPA_BUSCA ou ETAPA_SELECAO)
     """
-    root = get_root_path()
-    checkpoint_file = root / "checkpoint.json"
-
-    if checkpoint_file.exists():
-        try:
-            with open(checkpoint_file, "r", encoding="utf-8") as f:
-                checkpoint = json.load(f)
-            ic(f"✓ Checkpoint carregado: {len(checkpoint.get('processados', []))} pacientes já processados")
-            return checkpoint
-        except Exception as e:
-            ic(f"⚠️ Erro ao carregar checkpoint: {e}")
-            return {"processados": [], "falhas": [], "inicio": datetime.now().isoformat()}
-    else:
-        ic("Nenhum checkpoint encontrado, iniciando do zero")
-        return {"processados": [], "falhas": [], "inicio": datetime.now().isoformat()}
+    numero_atendimento = obter_numero_atendimento(cache_atendimentos, matricula)
+
+    if numero_atendimento:
+        ic(f"✓ Atendimento em cache ({numero_atendimento}), indo direto para o paciente")
+        if abrir_pagina_paciente(driver, numero_atendimento, credenciais["url_destino"]):
+            return ""
+
+        ic(f"⚠️ URL direta falhou, removendo {matricula} do cache")
+        remover_numero_atendimento(cache_atendimentos, matricula)
+
+    # Voltar para a página de busca se a sessão estiver em outra página
+    if driver.current_url != credenciais["url_destino"]:
+        if not navegar_para_pagina(driver, credenciais["url_destino"]):
+            return ETAPA_BUSCA
 
+    # Buscar paciente
+    if not buscar_paciente(driver, matricula):
+        ic(f"❌ Falha na busca do paciente {matricula}")
+        return ETAPA_BUSCA
 
-def salvar_checkpoint(checkpoint: Dict):
+    # Selecionar paciente
+    numero_atendimento = selecionar_paciente(driver, matricula)
+    if not numero_atendimento:
+        ic(f"❌ Falha na seleção do paciente {matricula}")
+        return ETAPA_SELECAO
+
+    registrar_numero_atendimento(cache_atendimentos, matricula, numero_atendimento)
+    return ""
+
+
+def processar_paciente(
+    driver,
+    matricula: str,
+    nome: str,
+    credenciais: Dict,
+    cache_atendimentos: Optional[Dict] = None,
+    cliente_amf=None
+) -> Tuple[bool, str]:
     """
-    Salva checkpoint do processamento.
+    Processa um único paciente: busca, seleciona e captura dados.
+
+    Com o backend AMF habilitado e o atendimento em cache, os atendimentos
+    vêm direto das chamadas de remoting; o navegador só é usado se isso
+    falhar ou, numa captura parcial, para ler os dados demográficos.
 
     Args:
-        checkpoint: Dicionário com dados do checkpoint
+        driver: WebDriver do Selenium
+        matricula: Número da matrícula (prontuário)
+        nome: Nome do paciente (para referência)
+        credenciais: Dicionário com credenciais
+        cache_atendimentos: Cache matrícula → número do atendimento (opcional)
+        cliente_amf: ClienteAMF da sessão (opcional, ver cliente_amf.py)
+
+    Returns:
+        Tupla (sucesso, etapa): etapa é "" no sucesso, senão a etapa da
+        falha (ver retentativas.ETAPAS_FALHA)
     """
-    root = get_root_path()
-    checkpoint_file = root / "checkpoint.json"
+    if cache_atendimentos is None:
+        cache_atendimentos = {}
 
     try:
-        checkpoint["ultima_atualizacao"] = datetime.now().isoformat()
-        with open(checkpoint_file, "w", encoding="utf-8") as f:
-            json.dump(checkpoint, f, ensure_ascii=False, indent=4)
-        # ic(f"✓ Checkpoint salvo: {len(checkpoint['processados'])} processados")
+        ic(f"Processando: {nome} (Matrícula: {matricula})")
+
+        numero_atendimento = obter_numero_atendimento(cache_atendimentos, matricula)
+        dados_amf = None
+        if cliente_amf is not None and numero_atendimento:
+            dados_amf = capturar_dados_paciente_amf(cliente_amf, matricula, numero_atendimento)
+            if dados_amf and not dados_amf.get("captura_parcial"):
+                ic(f"✓ Paciente {matricula} processado via AMF!")
+                return True, ""
+            if not dados_amf:
+                ic("⚠️ Captura via AMF falhou, usando o navegador")
+
+        captura = getattr(driver, "captura_rede", None)
+        if captura:
+            captura.descartar()
+
+        # Abrir página do paciente (direto pelo cache ou via busca)
+        etapa = abrir_paciente(driver, matricula, credenciais, cache_atendimentos)
+        if etapa:
+            return False, classificar_falha(driver, etapa)
+
+        # Capturar dados (ou só os demográficos, se os atendimentos vieram do AMF)
+        if dados_amf:
+            dados = completar_dados_paciente(driver, dados_amf)
+        else:
+            dados = capturar_dados_paciente(driver, matricula)
+        if not dados:
+            ic(f"⚠️ Falha na captura de dados do paciente {matricula}")
+            return False, classificar_falha(driver, ETAPA_CAPTURA)
+
+        if captura:
+            captura.salvar(matricula)
+
+        ic(f"✓ Paciente {matricula} processado com sucesso!")
+
+        # A volta para a página de busca só acontece se o próximo paciente
+        # não estiver no cache (ver abrir_paciente)
+        return True, ""
+
     except Exception as e:
-        ic(f"⚠️ Erro ao salvar checkpoint: {e}")
+        ic(f"⚠️ Erro ao processar paciente {matricula}: {e}")
+        return False, classificar_falha(driver, ETAPA_ERRO, e)
 
 
-def adicionar_ao_checkpoint(checkpoint: Dict, matricula: str, sucesso: bool, motivo: str = ""):
+# ============================================================================
+# SESSÕES
+# ============================================================================
+
+# Teto global de sessões simultâneas no PEP (independente do pedido)
+MAX_SESSOES = int(os.getenv("PEP_MAX_SESSOES", "4"))
+
+
+def processar_com_sessao(
+    sessao: GerenciadorSessao,
+    matricula: str,
+    nome: str,
+    credenciais: Dict,
+    cache_atendimentos: Dict
+) -> Tuple[bool, str]:
     """
-    Adiciona um paciente ao checkpoint.
+    Processa um paciente garantindo a sessão antes e depois.
 
-    Args:
-        checkpoint: Dicionário do checkpoint
-        matricula: Número da matrícula
-        sucesso: Se processamento foi bem-sucedido
-        motivo: Motivo da falha (se aplicável)
+    Se a falha for de sessão expirada, refaz o login e retoma o mesmo
+    paciente uma vez, em vez de deixá-lo (e os seguintes) falhar.
+
+    Returns:
+        Tupla (sucesso, etapa), como processar_paciente
     """
+    if not sessao.garantir():
+        return False, ETAPA_SESSAO
+
+    sucesso, etapa = processar_paciente(
+        sessao.driver, matricula, nome, credenciais, cache_atendimentos, sessao.cliente_amf
+    )
+
+    sessao.pacientes += 1
+
+    if not sucesso and etapa == ETAPA_SESSAO and sessao.relogar():
+        ic(f"↻ Retomando paciente {matricula} após o re-login")
+        sucesso, etapa = processar_paciente(
+            sessao.driver, matricula, nome, credenciais, cache_atendimentos, sessao.cliente_amf
+        )
+
     if sucesso:
-        checkpoint["processados"].append({
-            "matricula": matricula,
-            "timestamp": datetime.now().isoformat(),
-            "sucesso": True
-        })
-    else:
-        checkpoint["falhas"].append({
-            "matricula": matricula,
-            "timestamp": datetime.now().isoformat(),
-            "sucesso": False,
-            "motivo": motivo
-        })
+        sessao.registrar_atividade()
+    return sucesso, etapa
 
-    salvar_checkpoint(checkpoint)
 
+def _executar_sessao(
+    id_sessao: int,
+    fila: queue.Queue,
+    checkpoint: Dict,
+    credenciais: Dict,
+    resultados: Dict,
+    lock_resultados: threading.Lock,
+    parar: threading.Event,
+    limitador: LimitadorTaxa,
+    cache_atendimentos: Dict,
+    agenda: AgendaRetentativas,
+    pool: PoolNavegadores
+):
+    """
+    Worker de uma sessão: consome matrículas da fila até receber o fim (None).
 
-def ja_foi_processado(checkpoint: Dict, matricula: str) -> bool:
+    Cada sessão usa um navegador logado do pool (trocado quando precisa ser
+    reciclado). Os resultados vão para o checkpoint compartilhado (que é
+    thread-safe) e para a agenda de retentativas, e o ritmo é ditado pelo
+    limitador global.
     """
-    Verifica se uma matrícula já foi processada com sucesso.
+    prefixo = f"[Sessão {id_sessao}] "
+    sessao = None
 
-    Args:
-        checkpoint: Dicionário do checkpoint
-        matricula: Número da matrícula
+    try:
+        # O pool escalona os logins (AQUECEDORES navegadores subindo por vez)
+        sessao = pool.obter(parar)
+        if sessao is None:
+            return
 
-    Returns:
-        True se já foi processado
-    """
-    matriculas_processadas = [p["matricula"] for p in checkpoint.get("processados", [])]
-    return matricula in matriculas_processadas
+        while not parar.is_set():
+            item = fila.get()
+            if item is None:
+                # Fim da fila: repassar o sinal para as outras sessões
+                fila.put(None)
+                fila.task_done()
+                break
+            matricula, nome = item
+
+            limitador.aguardar(parar)
+            if parar.is_set():
+                fila.task_done()
+                break
+
+            sucesso, etapa = False, ETAPA_ERRO
+            try:
+                sucesso, etapa = processar_com_sessao(
+                    sessao, matricula, nome, credenciais, cache_atendimentos
+                )
+            finally:
+                fila.task_done()
+                reagendado = agenda.registrar(matricula, nome, sucesso, etapa)
+
+            limitador.registrar_resultado(sucesso)
+
+            # Falha reagendada não é definitiva: só vai ao checkpoint quando a
+            # agenda desiste (senão o agendador a veria como falha recente)
+            if sucesso:
+                adicionar_ao_checkpoint(checkpoint, matricula, True)
+            elif not reagendado:
+                adicionar_ao_checkpoint(checkpoint, matricula, False, MOTIVOS_FALHA[etapa], etapa=etapa)
 
+            with lock_resultados:
+                if reagendado:
+                    resultados["retentativas"] += 1
+                else:
+                    resultados["sucessos" if sucesso else "falhas"] += 1
+                total = resultados["sucessos"] + resultados["falhas"]
+            ic(f"{prefixo}[{total}/{resultados['total']}] Paciente {matricula} finalizado")
+
+            sessao = pool.trocar_se_preciso(sessao)
+
+    except Exception as e:
+        ic(f"{prefixo}❌ Erro na sessão: {e}")
+
+    finally:
+        if sessao:
+            pool.devolver(sessao)
+
+
+def _alimentar_fila(pacientes: Iterable[Tuple[str, str]], fila: queue.Queue, parar: threading.Event):
+    """Produtor: coloca os pacientes na fila (bloqueia se ela estiver cheia) e depois o fim (None)"""
+    try:
+        for paciente in pacientes:
+            while not parar.is_set():
+                try:
+                    fila.put(paciente, timeout=1)
+                    break
+                except queue.Full:
+                    continue
+            if parar.is_set():
+                return
+    except Exception as e:
+        ic(f"❌ Erro lendo a lista de pacientes: {e}")
+    finally:
+        fila.put(None)
 
-# ============================================================================
-# PROCESSAMENTO DE PACIENTE
-# ============================================================================
 
-def processar_paciente(driver, matricula: str, nome: str, credenciais: Dict) -> bool:
+def processar_em_paralelo(
+    pacientes_pendentes: Iterable[Tuple[str, str]],
+    checkpoint: Dict,
+    credenciais: Dict,
+    n_sessoes: int,
+    limitador: LimitadorTaxa,
+    cache_atendimentos: Dict,
+    agenda: Optional[AgendaRetentativas] = None,
+    pool: Optional[PoolNavegadores] = None
+) -> Dict:
     """
-    Processa um único paciente: busca, seleciona e captura dados.
+    Processa pacientes com várias sessões (navegadores) em paralelo.
+
+    As sessões são threads que puxam matrículas de uma fila compartilhada e
+    limitada, alimentada por um produtor que intercala as retentativas
+    vencidas com os pacientes novos (ver retentativas.intercalar). Com um
+    gerador (ingestão em streaming), as sessões começam enquanto a leitura
+    ainda acontece. O número de sessões é limitado por MAX_SESSOES e a taxa
+    total de pacientes pelo limitador compartilhado.
 
     Args:
-        driver: WebDriver do Selenium
-        matricula: Número da matrícula (prontuário)
-        nome: Nome do paciente (para referência)
+        pacientes_pendentes: Lista ou iterável de tuplas (matricula, nome)
+        checkpoint: Checkpoint compartilhado
         credenciais: Dicionário com credenciais
+        n_sessoes: Número de sessões desejado
+        limitador: Rate limiter global compartilhado pelas sessões
+        cache_atendimentos: Cache matrícula → número do atendimento
+        agenda: Agenda de retentativas (default: uma só com a 1ª tentativa)
+        pool: Pool de navegadores (default: um novo, fechado ao final)
 
     Returns:
-        True se processamento bem-sucedido
+        Dicionário com contagem de sucessos, falhas (definitivas) e retentativas
     """
-    try:
-        ic(f"Processando: {nome} (Matrícula: {matricula})")
+    if isinstance(pacientes_pendentes, list):
+        total = len(pacientes_pendentes)
+        n_sessoes = max(1, min(n_sessoes, MAX_SESSOES, total))
+    else:
+        total = "?"
+        n_sessoes = max(1, min(n_sessoes, MAX_SESSOES))
+    fila = queue.Queue(maxsize=n_sessoes * 4)
 
-        # Buscar paciente
-        if not buscar_paciente(driver, matricula):
-            ic(f"❌ Falha na busca do paciente {matricula}")
-            return False
+    if agenda is None:
+        agenda = AgendaRetentativas(tentativas_maximas=1)
 
-        # Selecionar paciente
-        if not selecionar_paciente(driver, matricula):
-            ic(f"❌ Falha na seleção do paciente {matricula}")
-            return False
+    pool_proprio = pool is None
+    if pool_proprio:
+        pool = criar_pool_navegadores(credenciais)
+        pool.aquecer(n_sessoes + pool.reservas)
 
-        # Capturar dados
-        dados = capturar_dados_paciente(driver, matricula)
-        if not dados:
-            ic(f"⚠️ Falha na captura de dados do paciente {matricula}")
-            return False
+    ic(f"Iniciando {n_sessoes} sessão(ões) em paralelo (máximo: {MAX_SESSOES})")
 
-        ic(f"✓ Paciente {matricula} processado com sucesso!")
+    resultados = {"sucessos": 0, "falhas": 0, "retentativas": 0, "total": total}
+    lock_resultados = threading.Lock()
+    parar = threading.Event()
 
-        # Voltar para página de busca para próximo paciente
-        navegar_para_pagina(driver, credenciais["url_destino"])
+    produtor = threading.Thread(
+        target=_alimentar_fila, args=(intercalar(pacientes_pendentes, agenda, parar), fila, parar),
+        name="produtor", daemon=True
+    )
+    produtor.start()
+
+    threads = [
+        threading.Thread(
+            target=_executar_sessao,
+            args=(i, fila, checkpoint, credenciais, resultados, lock_resultados,
+                  parar, limitador, cache_atendimentos, agenda, pool),
+            name=f"sessao-{i}",
+            daemon=True
+        )
+        for i in range(1, n_sessoes + 1)
+    ]
 
-        return True
+    for thread in threads:
+        thread.start()
 
-    except Exception as e:
-        ic(f"⚠️ Erro ao processar paciente {matricula}: {e}")
-        return False
+    try:
+        while any(thread.is_alive() for thread in threads):
+            for thread in threads:
+                thread.join(timeout=1)
+    except KeyboardInterrupt:
+        ic("\n⚠️ Interrompendo sessões (aguardando pacientes em andamento)...")
+        parar.set()
+        for thread in threads:
+            thread.join()
+        raise
+    finally:
+        parar.set()
+        if pool_proprio:
+            pool.fechar()
+
+    restantes = sum(1 for item in list(fila.queue) if item is not None)
+    if restantes or produtor.is_alive():
+        ic(f"⚠️ Paciente(s) não processado(s): todas as sessões encerraram")
+
+    return resultados
 
 
 # ============================================================================
@@ -211,7 +460,11 @@ def processar_lista_pacientes(
     credenciais: Dict,
     limite: Optional[int] = None,
     intervalo_min: int = 5,
-    intervalo_max: int = 15
+    intervalo_max: int = 15,
+    n_sessoes: int = 1,
+    pacientes: Optional[Iterable[Tuple[str, str]]] = None,
+    pool: Optional[PoolNavegadores] = None,
+    checkpoint: Optional[Dict] = None
 ):
     """
     Processa lista de pacientes em loop.
@@ -223,76 +476,107 @@ def processar_lista_pacientes(
         limite: Limite de pacientes a processar (None = todos)
         intervalo_min: Intervalo mínimo entre pacientes (segundos)
         intervalo_max: Intervalo máximo entre pacientes (segundos)
+        n_sessoes: Número de sessões em paralelo (1 = modo sequencial)
+        pacientes: Iterável de (matricula, nome) em streaming; se informado,
+            substitui matriculas/nomes e o processamento começa antes de a
+            leitura terminar (ver iterar_pacientes_sigh)
+        pool: Pool de navegadores já aquecendo (ver main); sem ele, um pool
+            é criado aqui e fechado ao final
+        checkpoint: Checkpoint já carregado (ver main); sem ele, é carregado aqui
+
+    Os intervalos definem a taxa padrão do rate limiter (ver criar_limitador);
+    o tempo gasto processando um paciente é descontado da espera.
     """
-    import random
-
     ic("="*70)
     ic("INÍCIO DO PROCESSAMENTO EM LOTE")
     ic("="*70)
 
-    # Carregar checkpoint
-    checkpoint = carregar_checkpoint()
+    # Carregar checkpoint (uma vez por execução: o replay compacta o journal)
+    if checkpoint is None:
+        checkpoint = carregar_checkpoint()
 
-    # Filtrar pacientes já processados
-    pacientes_pendentes = [
-        (mat, nom) for mat, nom in zip(matriculas, nomes)
-        if not ja_foi_processado(checkpoint, mat)
-    ]
+    if pacientes is not None:
+        # Streaming: pendentes filtrados à medida que são consumidos
+        pacientes_pendentes = iterar_pendentes(checkpoint, pacientes)
+        ic("Pacientes em streaming: total conhecido só ao final da leitura")
 
-    ic(f"Total de pacientes: {len(matriculas)}")
-    ic(f"Já processados: {len(matriculas) - len(pacientes_pendentes)}")
-    ic(f"Pendentes: {len(pacientes_pendentes)}")
+        if limite:
+            pacientes_pendentes = islice(pacientes_pendentes, limite)
+            ic(f"⚠️ MODO TESTE: Processando apenas {limite} pacientes")
 
-    if limite:
-        pacientes_pendentes = pacientes_pendentes[:limite]
-        ic(f"⚠️ MODO TESTE: Processando apenas {limite} pacientes")
-
-    if not pacientes_pendentes:
-        ic("✓ Todos os pacientes já foram processados!")
-        return
+    else:
+        # Filtrar pacientes já processados
+        pacientes_pendentes = filtrar_pendentes(checkpoint, matriculas, nomes)
 
-    # Configurar driver
-    ic("Configurando WebDriver...")
-    driver = None
+        ic(f"Total de pacientes: {len(matriculas)}")
+        ic(f"Já processados: {len(matriculas) - len(pacientes_pendentes)}")
+        ic(f"Pendentes: {len(pacientes_pendentes)}")
 
-    try:
-        driver = configurar_driver()
+        if limite:
+            pacientes_pendentes = pacientes_pendentes[:limite]
+            ic(f"⚠️ MODO TESTE: Processando apenas {limite} pacientes")
 
-        # Fazer login
-        ic("Fazendo login...")
-        if not fazer_login(driver, credenciais["usuario"], credenciais["senha"], credenciais["empresa"]):
-            ic("❌ Falha no login. Encerrando...")
+        if not pacientes_pendentes:
+            ic("✓ Todos os pacientes já foram processados!")
             return
 
-        # Navegar para página de busca
-        ic("Navegando para página de busca...")
-        if not navegar_para_pagina(driver, credenciais["url_destino"]):
-            ic("❌ Falha na navegação. Encerrando...")
-            return
-
-        # Processar cada paciente
-        sucessos = 0
-        falhas = 0
+    total = len(pacientes_pendentes) if isinstance(pacientes_pendentes, list) else "?"
 
-        for i, (matricula, nome) in enumerate(pacientes_pendentes, 1):
-            ic("="*70)
-            ic(f"[{i}/{len(pacientes_pendentes)}] Processando paciente...")
-            ic("="*70)
+    sessao = None
+    limitador = criar_limitador(intervalo_min, intervalo_max)
+    agenda = criar_agenda_retentativas()
+    cache_atendimentos = carregar_cache_atendimentos()
 
-            sucesso = processar_paciente(driver, matricula, nome, credenciais)
+    pool_proprio = pool is None
+    if pool_proprio:
+        pool = criar_pool_navegadores(credenciais)
+        pool.aquecer(n_sessoes + pool.reservas)
 
-            if sucesso:
-                adicionar_ao_checkpoint(checkpoint, matricula, True)
-                sucessos += 1
-            else:
-                adicionar_ao_checkpoint(checkpoint, matricula, False, "Erro no processamento")
-                falhas += 1
-
-            # Rate limiting: delay aleatório entre pacientes
-            if i < len(pacientes_pendentes):  # Não esperar após o último
-                intervalo = random.randint(intervalo_min, intervalo_max)
-                ic(f"⏳ Aguardando {intervalo}s antes do próximo paciente...")
-                time.sleep(intervalo)
+    try:
+        if n_sessoes > 1:
+            resultados = processar_em_paralelo(
+                pacientes_pendentes, checkpoint, credenciais, n_sessoes, limitador,
+                cache_atendimentos, agenda, pool
+            )
+            sucessos = resultados["sucessos"]
+            falhas = resultados["falhas"]
+            retentativas = resultados["retentativas"]
+
+        else:
+            sessao = pool.obter()
+            if sessao is None:
+                return
+
+            # Processar cada paciente (com as retentativas intercaladas)
+            sucessos = 0
+            falhas = 0
+            retentativas = 0
+
+            for i, (matricula, nome) in enumerate(intercalar(pacientes_pendentes, agenda), 1):
+                ic("="*70)
+                ic(f"[{i}/{total}] Processando paciente...")
+                ic("="*70)
+
+                # Rate limiting: espera só o que faltar para o próximo token
+                limitador.aguardar()
+
+                sucesso, etapa = processar_com_sessao(
+                    sessao, matricula, nome, credenciais, cache_atendimentos
+                )
+                limitador.registrar_resultado(sucesso)
+                reagendado = agenda.registrar(matricula, nome, sucesso, etapa)
+
+                if sucesso:
+                    adicionar_ao_checkpoint(checkpoint, matricula, True)
+                    sucessos += 1
+                elif reagendado:
+                    # Só a falha definitiva vai ao checkpoint
+                    retentativas += 1
+                else:
+                    adicionar_ao_checkpoint(checkpoint, matricula, False, MOTIVOS_FALHA[etapa], etapa=etapa)
+                    falhas += 1
+
+                sessao = pool.trocar_se_preciso(sessao)
 
         # Resumo final
         ic("="*70)
@@ -300,7 +584,9 @@ def processar_lista_pacientes(
         ic("="*70)
         ic(f"✓ Sucessos: {sucessos}")
         ic(f"✗ Falhas: {falhas}")
-        ic(f"Taxa de sucesso: {(sucessos / (sucessos + falhas) * 100):.1f}%")
+        ic(f"↻ Retentativas: {retentativas}")
+        if sucessos + falhas:
+            ic(f"Taxa de sucesso: {(sucessos / (sucessos + falhas) * 100):.1f}%")
 
     except KeyboardInterrupt:
         ic("\n⚠️ Processamento interrompido pelo usuário")
@@ -312,9 +598,13 @@ def processar_lista_pacientes(
         traceback.print_exc()
 
     finally:
-        if driver:
-            ic("Fechando navegador...")
-            driver.quit()
+        # Compactar journal no snapshot ao encerrar
+        salvar_checkpoint(checkpoint)
+
+        if sessao:
+            pool.devolver(sessao)
+        if pool_proprio:
+            pool.fechar()
 
 
 # ============================================================================
@@ -332,43 +622,104 @@ def main():
     # Carregar credenciais
     ic("Carregando credenciais...")
     credenciais = carregar_credenciais()
+    n_sessoes = min(int(os.getenv("PEP_SESSOES", "1")), MAX_SESSOES)
 
-    # Carregar dados do SIGH
-    ic("Carregando dados do SIGH...")
-    df, nomes, matriculas, datas = carregar_dados_sigh()
+    # Backend AMF mal configurado falha aqui, antes de abrir qualquer navegador
+    if backend_amf_habilitado():
+        ic("Backend AMF habilitado (navegador como fallback)")
 
-    if not matriculas:
-        ic("❌ Nenhum paciente encontrado para processar!")
-        return
+    # Navegadores só sobem (e fazem login no PEP) depois da confirmação
+    pool = None
 
-    # Confirmar processamento
-    print("\n" + "="*70)
-    print(f"Total de pacientes a processar: {len(matriculas)}")
-    print("="*70)
+    try:
+        # Ingestão em streaming: o scraping começa enquanto os CSVs são lidos
+        if os.getenv("PEP_INGESTAO", "").lower() == "streaming":
+            # A priorização ordena a lista completa; no streaming a fila segue o CSV
+            if os.getenv("PEP_PRIORIDADE"):
+                raise ValueError("PEP_PRIORIDADE exige a lista completa de pacientes e não pode ser "
+                                 "usado com PEP_INGESTAO=streaming")
 
-    # Modo teste ou produção
-    resposta = input("\nProcessar apenas os primeiros 5 pacientes? (s/N): ").strip().lower()
+            ic("Lendo dados do SIGH em streaming...")
+            pacientes = ((matricula, nome) for nome, matricula, _ in iterar_pacientes_unicos(iterar_pacientes_sigh()))
 
-    if resposta == 's':
-        limite = 5
-        ic("⚠️ MODO TESTE: Processando apenas 5 pacientes")
-    else:
-        limite = None
-        resposta_confirma = input(f"\n⚠️ Você está prestes a processar {len(matriculas)} pacientes.\nIsso levará aproximadamente {len(matriculas) * 20 / 3600:.1f} horas.\nContinuar? (s/N): ").strip().lower()
+            resposta = input("\nProcessar apenas os primeiros 5 pacientes? (s/N): ").strip().lower()
 
-        if resposta_confirma != 's':
-            ic("Processamento cancelado pelo usuário")
+            if resposta == 's':
+                limite = 5
+                ic("⚠️ MODO TESTE: Processando apenas 5 pacientes")
+            else:
+                limite = None
+                resposta_confirma = input("\n⚠️ Você está prestes a processar todos os pacientes dos CSVs do SIGH "
+                                          "(total conhecido só ao final da leitura).\nContinuar? (s/N): ").strip().lower()
+
+                if resposta_confirma != 's':
+                    ic("Processamento cancelado pelo usuário")
+                    return
+
+            # Logins em background enquanto o streaming lê os CSVs
+            pool = criar_pool_navegadores(credenciais)
+            pool.aquecer(n_sessoes + pool.reservas)
+
+            processar_lista_pacientes(
+                matriculas=[],
+                nomes=[],
+                credenciais=credenciais,
+                limite=limite,
+                intervalo_min=5,
+                intervalo_max=15,
+                n_sessoes=n_sessoes,
+                pacientes=pacientes,
+                pool=pool
+            )
             return
 
-    # Processar pacientes
-    processar_lista_pacientes(
-        matriculas=matriculas,
-        nomes=nomes,
-        credenciais=credenciais,
-        limite=limite,
-        intervalo_min=5,
-        intervalo_max=15
-    )
+        # Carregar dados do SIGH
+        ic("Carregando dados do SIGH...")
+        checkpoint = carregar_checkpoint()
+        df, nomes, matriculas, datas = carregar_dados_sigh(ordenar=criar_agendamento(checkpoint))
+
+        if len(matriculas) == 0:
+            ic("❌ Nenhum paciente encontrado para processar!")
+            return
+
+        # Confirmar processamento
+        print("\n" + "="*70)
+        print(f"Total de pacientes a processar: {len(matriculas)}")
+        print("="*70)
+
+        # Modo teste ou produção
+        resposta = input("\nProcessar apenas os primeiros 5 pacientes? (s/N): ").strip().lower()
+
+        if resposta == 's':
+            limite = 5
+            ic("⚠️ MODO TESTE: Processando apenas 5 pacientes")
+        else:
+            limite = None
+            resposta_confirma = input(f"\n⚠️ Você está prestes a processar {len(matriculas)} pacientes.\nIsso levará aproximadamente {len(matriculas) * 20 / 3600 / n_sessoes:.1f} horas.\nContinuar? (s/N): ").strip().lower()
+
+            if resposta_confirma != 's':
+                ic("Processamento cancelado pelo usuário")
+                return
+
+        pool = criar_pool_navegadores(credenciais)
+        pool.aquecer(n_sessoes + pool.reservas)
+
+        # Processar pacientes
+        processar_lista_pacientes(
+            matriculas=matriculas,
+            nomes=nomes,
+            credenciais=credenciais,
+            limite=limite,
+            intervalo_min=5,
+            intervalo_max=15,
+            n_sessoes=n_sessoes,
+            pool=pool,
+            checkpoint=checkpoint
+        )
+
+    finally:
+        if pool is not None:
+            pool.fechar()
 
     ic("="*70)
     ic("✓✓✓ SCRIPT CONCLUÍDO ✓✓✓")
@@ -8,26 +8,51 @@ Contém todas as funções necessárias para:
 - Capturar dados demográficos
 """
 
-import os
-import re
-import time
 import json
 from pathlib import Path
-from typing import Optional, Dict
+from typing import Optional, Dict, List
 from datetime import datetime
 
 from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import Select
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
 
 from icecream import ic
 
+from esperas import (
+    orcamento,
+    aguardar_condicao,
+    aguardar_pagina_pronta,
+    aguardar_documento_pronto,
+    erro_de_sessao
+)
+from resolver_atendimento import montar_url_paciente
+from captura_rede import CapturaRede, captura_rede_habilitada, configurar_opcoes_captura
+from perfis_driver import carregar_perfil, montar_opcoes, criar_service, aplicar_bloqueios
+from captura_abas import abas_por_paciente, capturar_atendimentos_em_abas
+from indice_atendimentos import (
+    captura_incremental,
+    chaves_historico,
+    carregar_registro,
+    itens_novos,
+    mesclar_registro,
+    gravar_registro
+)
+from extracao import (
+    SCRIPT_ITENS_HISTORICO,
+    SCRIPT_TEXTO_CONTEUDO,
+    HISTORICO_SELECTORS,
+    CONTENT_SELECTORS,
+    CAMPOS_DEMOGRAFICOS,
+    capturar_snapshot,
+    novo_dados_paciente,
+    extrair_dados_demograficos,
+    extrair_dados_atendimento
+)
+
 
 # ============================================================================
 # CONFIGURAÇÃO
@@ -47,44 +72,43 @@ def get_root_path() -> Path:
 # CONFIGURAÇÃO DO DRIVER
 # ============================================================================
 
-def configurar_driver() -> webdriver.Chrome:
+def configurar_driver(captura_rede: Optional[bool] = None, perfil: Optional[str] = None) -> webdriver.Chrome:
     """
     Configura e retorna o driver do Selenium.
 
+    Args:
+        captura_rede: Gravar as chamadas de remoting via CDP (default: PEP_CAPTURA_REDE).
+            O coletor fica em driver.captura_rede (ver captura_rede.py)
+        perfil: Perfil do navegador (default: PEP_PERFIL_DRIVER, ver perfis_driver.py)
+
     Returns:
         WebDriver configurado e pronto para uso
     """
-    root = get_root_path()
-
-    # Caminhos
-    cent_path = r"C:\CentBrowser\chrome.exe"
-    driver_path = root / "3rdparty" / "chromedriver.exe"
-
-    ic(f"Driver path: {driver_path}")
+    if captura_rede is None:
+        captura_rede = captura_rede_habilitada()
 
-    # Configurar opções
-    options = Options()
-    options.binary_location = cent_path
+    root = get_root_path()
+    perfil = carregar_perfil(perfil)
 
-    # Opções anti-detecção
-    options.add_argument("--cb-disable-components-auto-update")
-    options.add_argument("--start-maximized")
-    options.add_argument("--ignore-certificate-errors")
-    options.add_argument("--allow-insecure-localhost")
-    options.add_argument("--disable-direct-write")
-    options.add_argument("--disable-blink-features=AutomationControlled")
-    options.add_argument("--no-sandbox")
-    options.add_argument("--disable-dev-shm-usage")
+    ic(f"Perfil do driver: {perfil['nome']} ({'headless' if perfil['headless'] else 'com interface'})")
 
-    options.add_experimental_option("excludeSwitches", ["enable-automation"])
-    options.add_experimental_option('useAutomationExtension', False)
+    # Configurar opções e service
+    options = montar_opcoes(perfil)
+    if captura_rede:
+        configurar_opcoes_captura(options)
 
-    # Configurar service
-    service = Service(executable_path=str(driver_path))
+    service = criar_service(perfil, root)
 
     ic("Iniciando navegador...")
     driver = webdriver.Chrome(service=service, options=options)
 
+    aplicar_bloqueios(driver, perfil)
+
+    driver.captura_rede = None
+    if captura_rede:
+        driver.captura_rede = CapturaRede(driver)
+        ic("✓ Captura de rede (CDP) habilitada")
+
     return driver
 
 
@@ -136,8 +160,6 @@ def fazer_login(driver: webdriver.Chrome, usuario: str, senha: str, empresa: str
         password_field.clear()
         password_field.send_keys(senha)
 
-        time.sleep(1)
-
         # Selecionar empresa
         ic(f"Selecionando empresa: {empresa}")
         company_select_element = wait.until(
@@ -150,26 +172,34 @@ def fazer_login(driver: webdriver.Chrome, usuario: str, senha: str, empresa: str
         try:
             company_select.select_by_visible_text(empresa)
             ic(f"✓ Empresa '{empresa}' selecionada por texto!")
-        except:
+        except Exception as e:
+            if erro_de_sessao(e):
+                raise
             try:
                 company_select.select_by_value(empresa)
                 ic(f"✓ Empresa '{empresa}' selecionada por value!")
-            except:
+            except Exception as e:
+                if erro_de_sessao(e):
+                    raise
                 for option in company_select.options:
                     if empresa.upper() in option.text.upper():
                         company_select.select_by_visible_text(option.text)
                         ic(f"✓ Empresa '{option.text}' selecionada!")
                         break
 
-        time.sleep(1)
-
         # Submeter formulário
         ic("Submetendo formulário...")
         submit_button = driver.find_element(By.CSS_SELECTOR, "input.btn-submit[type='submit']")
         submit_button.click()
 
         ic("Aguardando login processar...")
-        time.sleep(5)
+        aguardar_condicao(
+            driver,
+            lambda d: "login" not in d.current_url.lower(),
+            orcamento("login"),
+            "redirecionamento pós-login"
+        )
+        aguardar_documento_pronto(driver, orcamento("login"))
 
         ic(f"URL atual: {driver.current_url}")
         ic(f"Título: {driver.title}")
@@ -185,6 +215,8 @@ def fazer_login(driver: webdriver.Chrome, usuario: str, senha: str, empresa: str
             return True
 
     except Exception as e:
+        if erro_de_sessao(e):
+            raise
         ic(f"⚠️ Erro no login: {e}")
         root = get_root_path()
         driver.save_screenshot(str(root / "errors" / "erro_login_exception.png"))
@@ -215,7 +247,7 @@ def navegar_para_pagina(driver: webdriver.Chrome, url: str) -> bool:
         driver.get(url)
 
         ic("Aguardando página Angular carregar...")
-        time.sleep(8)  # Angular precisa de mais tempo
+        aguardar_pagina_pronta(driver, "navegacao")
 
         ic(f"URL atual: {driver.current_url}")
         ic(f"Título: {driver.title}")
@@ -224,6 +256,8 @@ def navegar_para_pagina(driver: webdriver.Chrome, url: str) -> bool:
         return True
 
     except Exception as e:
+        if erro_de_sessao(e):
+            raise
         ic(f"⚠️ Erro na navegação: {e}")
         root = get_root_path()
         driver.save_screenshot(str(root / "errors" / "erro_navegacao.png"))
@@ -277,7 +311,9 @@ def buscar_paciente(driver: webdriver.Chrome, prontuario: str) -> bool:
                 )
                 ic(f"✓ Campo de pesquisa encontrado: {selector}")
                 break
-            except:
+            except Exception as e:
+                if erro_de_sessao(e):
+                    raise
                 continue
 
         # Fallback heurístico
@@ -300,9 +336,13 @@ def buscar_paciente(driver: webdriver.Chrome, prontuario: str) -> bool:
         # Preencher campo
         ic(f"Preenchendo prontuário: {prontuario}")
         search_field.clear()
-        time.sleep(0.5)
         search_field.send_keys(prontuario)
-        time.sleep(1)
+        aguardar_condicao(
+            driver,
+            lambda d: search_field.get_attribute("value") == prontuario,
+            orcamento("busca"),
+            "campo de pesquisa preenchido"
+        )
 
         # Procurar botão de pesquisar
         ic("Procurando botão de pesquisar...")
@@ -328,7 +368,9 @@ def buscar_paciente(driver: webdriver.Chrome, prontuario: str) -> bool:
                 if search_button and search_button.is_displayed():
                     ic(f"✓ Botão de pesquisar encontrado: {selector}")
                     break
-            except:
+            except Exception as e:
+                if erro_de_sessao(e):
+                    raise
                 continue
 
         # Submit
@@ -342,6 +384,7 @@ def buscar_paciente(driver: webdriver.Chrome, prontuario: str) -> bool:
 
         ic("Aguardando processamento da busca...")
         ic("Aguardando estabilização da página...")
+        aguardar_pagina_pronta(driver, "busca")
 
         # Verificar resultados
         try:
@@ -357,12 +400,16 @@ def buscar_paciente(driver: webdriver.Chrome, prontuario: str) -> bool:
                 driver.save_screenshot(str(root / "errors" / "sem_resultados.png"))
 
         except Exception as e:
+            if erro_de_sessao(e):
+                raise
             ic(f"⚠️ Não foi possível verificar os resultados: {e}")
 
         ic("✓ Busca concluída e resultados carregados!")
         return True
 
     except Exception as e:
+        if erro_de_sessao(e):
+            raise
         ic(f"⚠️ Erro ao buscar paciente: {e}")
         root = get_root_path()
         driver.save_screenshot(str(root / "errors" / "erro_busca_paciente.png"))
@@ -373,29 +420,21 @@ def buscar_paciente(driver: webdriver.Chrome, prontuario: str) -> bool:
 # SELEÇÃO DE PACIENTE
 # ============================================================================
 
-def selecionar_paciente(driver: webdriver.Chrome, prontuario: Optional[str] = None) -> bool:
+def capturar_numero_atendimento(driver: webdriver.Chrome) -> Optional[str]:
     """
-    Captura o número do atendimento e navega para a página do paciente.
+    Captura o número do atendimento na página de resultados da busca.
 
     Args:
         driver: WebDriver do Selenium
-        prontuario: Número do prontuário (opcional, apenas para referência)
 
     Returns:
-        True se seleção bem-sucedida
+        Número do atendimento ou None se não encontrado
     """
     try:
-        ic("="*70)
-        ic("ETAPA 4: SELEÇÃO DO PACIENTE")
-        ic("="*70)
-
-        wait = WebDriverWait(driver, 10)
-
         ic("Aguardando estabilização...")
-        time.sleep(3)
+        aguardar_pagina_pronta(driver, "selecao")
 
-        url_base = driver.current_url
-        ic(f"URL atual: {url_base}")
+        ic(f"URL atual: {driver.current_url}")
 
         # Procurar número do atendimento
         ic("Procurando número do atendimento...")
@@ -429,13 +468,17 @@ def selecionar_paciente(driver: webdriver.Chrome, prontuario: Optional[str] = No
                                 numero_atendimento = texto.replace(' ', '')
                                 ic(f"✓ Número do atendimento capturado: {numero_atendimento}")
                                 break
-                    except:
+                    except Exception as e:
+                        if erro_de_sessao(e):
+                            raise
                         continue
 
                 if numero_atendimento:
                     break
 
-            except:
+            except Exception as e:
+                if erro_de_sessao(e):
+                    raise
                 continue
 
         # Fallback: buscar em outros elementos
@@ -457,10 +500,14 @@ def selecionar_paciente(driver: webdriver.Chrome, prontuario: Optional[str] = No
                                 numero_atendimento = texto.replace(' ', '')
                                 ic(f"✓ Número encontrado em {element.tag_name}: {numero_atendimento}")
                                 break
-                    except:
+                    except Exception as e:
+                        if erro_de_sessao(e):
+                            raise
                         continue
 
             except Exception as e:
+                if erro_de_sessao(e):
+                    raise
                 ic(f"⚠️ Erro ao buscar número em outros elementos: {e}")
 
         if not numero_atendimento:
@@ -471,59 +518,102 @@ def selecionar_paciente(driver: webdriver.Chrome, prontuario: Optional[str] = No
             with open(root / "errors" / "page_source.html", "w", encoding="utf-8") as f:
                 f.write(driver.page_source)
 
-            return False
+            return None
 
-        # Construir URL de destino
-        ic("Construindo URL de destino...")
+        return numero_atendimento
 
-        try:
-            parts = url_base.split('/#/')
-            base_url = parts[0]
+    except Exception as e:
+        if erro_de_sessao(e):
+            raise
+        ic(f"⚠️ Erro ao capturar número do atendimento: {e}")
+        return None
 
-            nova_url = f"{base_url}/#/d/3622/MVPEP_LISTA_TODOS_PACIENTES_HTML5/2512/LISTA_TODOS_PACIENTES/h/{numero_atendimento}"
 
-            ic(f"URL de destino: {nova_url}")
+def abrir_pagina_paciente(
+    driver: webdriver.Chrome,
+    numero_atendimento: str,
+    url_referencia: Optional[str] = None
+) -> bool:
+    """
+    Navega direto para a página do paciente a partir do número do atendimento.
 
-            # Navegar
-            ic("Navegando para a página do paciente...")
-            driver.get(nova_url)
+    Args:
+        driver: WebDriver do Selenium
+        numero_atendimento: Número do atendimento do paciente
+        url_referencia: URL do PEP usada como base (default: URL atual)
 
-            time.sleep(3)
+    Returns:
+        True se a página do paciente foi aberta
+    """
+    try:
+        # Construir URL de destino
+        ic("Construindo URL de destino...")
+        nova_url = montar_url_paciente(url_referencia or driver.current_url, numero_atendimento)
 
-            # Aguardar loading
-            ic("Aguardando página carregar...")
-            try:
-                wait.until(EC.invisibility_of_element_located((By.CLASS_NAME, "pep-loading-wrapper")))
-                ic("✓ Loading desapareceu!")
-            except:
-                ic("⚠️ Timeout no loading, mas continuando...")
+        ic(f"URL de destino: {nova_url}")
 
-            time.sleep(2)
+        # Navegar
+        ic("Navegando para a página do paciente...")
+        driver.get(nova_url)
 
-            url_final = driver.current_url
-            ic(f"URL final: {url_final}")
+        # Aguardar loading
+        ic("Aguardando página carregar...")
+        aguardar_pagina_pronta(driver, "selecao")
 
-            if numero_atendimento in url_final or '/h/' in url_final:
-                ic("✓ Paciente selecionado com sucesso!")
-                ic(f"Número do atendimento: {numero_atendimento}")
-                return True
-            else:
-                ic("⚠️ URL final não parece estar correta")
-                root = get_root_path()
-                driver.save_screenshot(str(root / "errors" / "url_incorreta.png"))
-                return False
+        url_final = driver.current_url
+        ic(f"URL final: {url_final}")
 
-        except Exception as e:
-            ic(f"⚠️ Erro ao construir/navegar para URL: {e}")
+        if numero_atendimento in url_final or '/h/' in url_final:
+            ic("✓ Paciente selecionado com sucesso!")
+            ic(f"Número do atendimento: {numero_atendimento}")
+            return True
+        else:
+            ic("⚠️ URL final não parece estar correta")
             root = get_root_path()
-            driver.save_screenshot(str(root / "errors" / "erro_navegacao.png"))
+            driver.save_screenshot(str(root / "errors" / "url_incorreta.png"))
             return False
 
     except Exception as e:
+        if erro_de_sessao(e):
+            raise
+        ic(f"⚠️ Erro ao construir/navegar para URL: {e}")
+        root = get_root_path()
+        driver.save_screenshot(str(root / "errors" / "erro_navegacao.png"))
+        return False
+
+
+def selecionar_paciente(driver: webdriver.Chrome, prontuario: Optional[str] = None) -> Optional[str]:
+    """
+    Captura o número do atendimento e navega para a página do paciente.
+
+    Args:
+        driver: WebDriver do Selenium
+        prontuario: Número do prontuário (opcional, apenas para referência)
+
+    Returns:
+        Número do atendimento se seleção bem-sucedida, None caso contrário
+    """
+    try:
+        ic("="*70)
+        ic("ETAPA 4: SELEÇÃO DO PACIENTE")
+        ic("="*70)
+
+        numero_atendimento = capturar_numero_atendimento(driver)
+        if not numero_atendimento:
+            return None
+
+        if not abrir_pagina_paciente(driver, numero_atendimento):
+            return None
+
+        return numero_atendimento
+
+    except Exception as e:
+        if erro_de_sessao(e):
+            raise
         ic(f"⚠️ Erro ao selecionar paciente: {e}")
         root = get_root_path()
         driver.save_screenshot(str(root / "errors" / "erro_geral_selecao.png"))
-        return False
+        return None
 
 
 # ============================================================================
@@ -532,7 +622,9 @@ def selecionar_paciente(driver: webdriver.Chrome, prontuario: Optional[str] = No
 
 def clicar_em_todos_atendimentos(driver: webdriver.Chrome) -> List:
     """
-    Clica em cada item do histórico de atendimentos (lado direito) e retorna lista de elementos.
+    Retorna a lista de itens clicáveis do histórico de atendimentos (lado direito).
+
+    Os seletores são testados no navegador numa única chamada execute_script.
 
     Args:
         driver: WebDriver do Selenium
@@ -542,74 +634,49 @@ def clicar_em_todos_atendimentos(driver: webdriver.Chrome) -> List:
     """
     ic("Procurando lista de atendimentos no histórico...")
 
-    # Possíveis seletores para os itens do histórico (lado direito)
-    historico_selectors = [
-        "div.historico-item",
-        "div[class*='historico']",
-        "div[class*='lista'] div[class*='item']",
-        "mat-list-item",
-        "div[role='listitem']",
-        ".history-item",
-        ".timeline-item",
-        # Seletores que contenham data (formato DD/MM/YYYY HH:MM)
-        "//div[contains(text(), '/') and contains(text(), ':')]/..",
-        # Elementos clicáveis que tenham texto com data
-        "//*[contains(@class, 'clickable') or @role='button'][.//*[contains(text(), '/')]]",
-    ]
-
-    itens_historico = []
-
-    for selector in historico_selectors:
-        try:
-            if selector.startswith('//'):
-                elements = driver.find_elements(By.XPATH, selector)
-            else:
-                elements = driver.find_elements(By.CSS_SELECTOR, selector)
-
-            if elements:
-                # Filtrar apenas elementos visíveis e clicáveis
-                elementos_visiveis = [
-                    elem for elem in elements
-                    if elem.is_displayed() and elem.is_enabled()
-                ]
-
-                if elementos_visiveis:
-                    ic(f"✓ Encontrados {len(elementos_visiveis)} itens com seletor: {selector}")
-                    itens_historico = elementos_visiveis
-                    break
-        except:
-            continue
-
-    if not itens_historico:
-        ic("⚠️ Tentando estratégia alternativa: procurar por textos com data...")
+    try:
+        resultado = driver.execute_script(SCRIPT_ITENS_HISTORICO, HISTORICO_SELECTORS)
+    except Exception as e:
+        if erro_de_sessao(e):
+            raise
+        ic(f"⚠️ Erro ao procurar histórico: {e}")
+        return []
 
-        # Estratégia alternativa: procurar qualquer elemento que contenha data/hora
-        try:
-            # Procurar elementos que contenham padrão DD/MM/YYYY HH:MM
-            all_elements = driver.find_elements(
-                By.XPATH,
-                "//*[contains(text(), '/') and contains(text(), ':') and string-length(text()) >= 16]"
-            )
-
-            # Pegar os elementos pais (que são clicáveis)
-            parent_elements = []
-            for elem in all_elements:
-                try:
-                    parent = elem.find_element(By.XPATH, "..")
-                    if parent.is_displayed() and parent not in parent_elements:
-                        parent_elements.append(parent)
-                except:
-                    continue
+    itens_historico = resultado.get("itens") or []
 
-            if parent_elements:
-                ic(f"✓ Encontrados {len(parent_elements)} itens via estratégia alternativa")
-                itens_historico = parent_elements
-        except Exception as e:
-            ic(f"⚠️ Erro na estratégia alternativa: {e}")
+    if itens_historico and resultado.get("seletor"):
+        ic(f"✓ Encontrados {len(itens_historico)} itens com seletor: {resultado['seletor']}")
+    elif itens_historico:
+        ic(f"✓ Encontrados {len(itens_historico)} itens via estratégia alternativa")
 
     return itens_historico
 
 
+def textos_itens_historico(driver: webdriver.Chrome, itens_historico: List) -> List[str]:
+    """
+    Texto de cada item do histórico (uma chamada execute_script).
+
+    Args:
+        driver: WebDriver do Selenium
+        itens_historico: Saída de clicar_em_todos_atendimentos
+
+    Returns:
+        innerText de cada item, ou lista vazia em caso de erro
+    """
+    if not itens_historico:
+        return []
+    try:
+        return driver.execute_script(
+            "return arguments[0].map(function (el) { return (el.innerText || '').trim(); });",
+            itens_historico
+        ) or []
+    except Exception as e:
+        if erro_de_sessao(e):
+            raise
+        ic(f"⚠️ Erro ao ler textos do histórico: {e}")
+        return []
+
+
 def capturar_dados_atendimento(driver: webdriver.Chrome, index: int = None) -> Optional[Dict]:
     """
     Captura dados de UM ÚNICO atendimento (o que está atualmente selecionado).
@@ -626,115 +693,30 @@ def capturar_dados_atendimento(driver: webdriver.Chrome, index: int = None) -> O
     try:
         ic(f"{prefix}Capturando dados do atendimento...")
 
-        # Aguardar página carregar
-        time.sleep(2)
-
-        # Dicionário para armazenar os dados deste atendimento
-        dados_atendimento = {
-            "data_atendimento": "",
-            "especialidade": "",
-            "medico": "",
-            "diagnostico": "",
-            "subespecialidade": "",
-            "historico_anamnese": "",
-            "texto_completo": "",
-            "data_captura": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        }
-
-        # Capturar todo o texto visível da área de conteúdo
+        # Capturar todo o texto visível da área de conteúdo (uma chamada)
         try:
-            # Tentar encontrar área de conteúdo principal
-            content_selectors = [
-                "div[class*='content']",
-                "div[class*='conteudo']",
-                "mat-card-content",
-                "div[role='main']",
-                ".seguimento",
-                ".atendimento-content"
-            ]
-
-            conteudo_element = None
-            for selector in content_selectors:
-                try:
-                    conteudo_element = driver.find_element(By.CSS_SELECTOR, selector)
-                    if conteudo_element.is_displayed():
-                        break
-                except:
-                    continue
-
-            if conteudo_element:
-                dados_atendimento["texto_completo"] = conteudo_element.text
-            else:
-                # Fallback: pegar body inteiro
-                dados_atendimento["texto_completo"] = driver.find_element(By.TAG_NAME, "body").text
-
-            page_text = dados_atendimento["texto_completo"]
-
+            texto_completo = driver.execute_script(SCRIPT_TEXTO_CONTEUDO, CONTENT_SELECTORS) or ""
         except Exception as e:
+            if erro_de_sessao(e):
+                raise
             ic(f"{prefix}⚠️ Erro ao capturar texto: {e}")
-            page_text = ""
-
-        # Estratégias de captura via regex
-        patterns = {
-            "data_atendimento": [
-                r'(\d{2}/\d{2}/\d{4}\s+\d{2}:\d{2})',  # DD/MM/YYYY HH:MM
-                r'Data[:\s]*(\d{2}/\d{2}/\d{4})',
-            ],
-            "subespecialidade": [
-                r'Subespecialidade\s*\(por[:\s]*([^\n]+)',
-                r'Subespecialidade[:\s]*([^\n]+)',
-            ],
-            "diagnostico": [
-                r'Diagnóstico\s*\(por[:\s]*([^\n]+)',
-                r'Diagnóstico[:\s]*([^\n]+)',
-                r'Descolamento de retina[^\n]*',
-            ],
-            "medico": [
-                r'(?:Dr\.|Dra\.)\s*([A-Z\s]+)',
-            ]
-        }
-
-        for campo, padroes in patterns.items():
-            if not dados_atendimento[campo]:
-                for padrao in padroes:
-                    match = re.search(padrao, page_text, re.IGNORECASE)
-                    if match:
-                        valor = match.group(1).strip() if match.lastindex >= 1 else match.group(0).strip()
-                        dados_atendimento[campo] = valor
-                        ic(f"{prefix}✓ {campo}: {valor}")
-                        break
-
-        # Capturar histórico/anamnese (geralmente texto longo)
-        try:
-            # Procurar por seções de texto longo
-            historico_patterns = [
-                r'Históri[oc]o/Anamnese[:\s]*(.{50,}?)(?=\n\n|\Z)',
-                r'POS RETIR[^\n]+\n(.{50,}?)(?=\n\n|\Z)',
-            ]
-
-            for pattern in historico_patterns:
-                match = re.search(pattern, page_text, re.IGNORECASE | re.DOTALL)
-                if match:
-                    dados_atendimento["historico_anamnese"] = match.group(1).strip()[:500]  # Limitar a 500 chars
-                    ic(f"{prefix}✓ Histórico capturado ({len(dados_atendimento['historico_anamnese'])} chars)")
-                    break
-        except:
-            pass
-
-        # Verificar se capturou algo útil
-        campos_preenchidos = sum(1 for k, v in dados_atendimento.items()
-                                if k not in ["texto_completo", "data_captura"] and v)
+            texto_completo = ""
 
-        ic(f"{prefix}Campos capturados: {campos_preenchidos}/5")
-
-        return dados_atendimento
+        return extrair_dados_atendimento(texto_completo, prefix)
 
     except Exception as e:
+        if erro_de_sessao(e):
+            raise
         ic(f"{prefix}⚠️ Erro ao capturar atendimento: {e}")
         return None
 
 
-def capturar_dados_paciente(driver: webdriver.Chrome, prontuario: str) -> Optional[Dict]:
+def capturar_dados_paciente(
+    driver: webdriver.Chrome,
+    prontuario: str,
+    max_abas: Optional[int] = None,
+    incremental: Optional[bool] = None
+) -> Optional[Dict]:
     """
     Captura os dados do paciente da página do PEP.
     NOVA VERSÃO: Clica em todos os atendimentos do histórico e captura dados de cada um.
@@ -742,6 +724,11 @@ def capturar_dados_paciente(driver: webdriver.Chrome, prontuario: str) -> Option
     Args:
         driver: WebDriver do Selenium
         prontuario: Número do prontuário
+        max_abas: Abas simultâneas para o histórico (default: PEP_ABAS_ATENDIMENTO;
+            1 = sequencial, ver captura_abas.py)
+        incremental: Só captura atendimentos fora do índice do prontuário e
+            mescla no registro gravado (default: PEP_CAPTURA_INCREMENTAL,
+            ver indice_atendimentos.py)
 
     Returns:
         Dicionário com os dados capturados incluindo lista de todos os atendimentos
@@ -751,10 +738,8 @@ def capturar_dados_paciente(driver: webdriver.Chrome, prontuario: str) -> Option
         ic("ETAPA 5: CAPTURA DE DADOS DO PACIENTE + HISTÓRICO")
         ic("="*70)
 
-        wait = WebDriverWait(driver, 10)
-
         ic("Aguardando página carregar completamente...")
-        time.sleep(4)
+        aguardar_pagina_pronta(driver, "captura")
 
         # ==================================================================
         # NOVO: CAPTURAR MÚLTIPLOS ATENDIMENTOS
@@ -762,329 +747,239 @@ def capturar_dados_paciente(driver: webdriver.Chrome, prontuario: str) -> Option
 
         # Primeiro, encontrar todos os itens do histórico
         itens_historico = clicar_em_todos_atendimentos(driver)
+        indices = list(range(len(itens_historico)))
+
+        # Modo incremental: só os itens que ainda não estão no índice do prontuário
+        root = get_root_path()
+        registro = None
+        chaves = []
+        if incremental is None:
+            incremental = captura_incremental()
+        if incremental:
+            chaves = chaves_historico(textos_itens_historico(driver, itens_historico))
+            if len(chaves) == len(itens_historico):
+                registro = carregar_registro(prontuario, root)
+                indices = itens_novos(chaves, registro)
+                ic(f"Captura incremental: {len(indices)} atendimento(s) novo(s) de {len(itens_historico)}")
+            else:
+                ic("⚠️ Textos do histórico indisponíveis, capturando tudo sem índice")
+                incremental = False
+
+        capturados: Dict[int, Dict] = {}
 
         if not itens_historico:
             ic("⚠️ Nenhum item de histórico encontrado, continuando com dados demográficos apenas...")
-            lista_atendimentos = []
+        elif not indices:
+            ic("✓ Nenhum atendimento novo no histórico")
+        elif len(indices) > 1 and (max_abas or abas_por_paciente()) > 1:
+            # Vários atendimentos carregando ao mesmo tempo em abas
+            capturados = capturar_atendimentos_em_abas(driver, indices, max_abas)
+
+            ic(f"✓ Total de atendimentos capturados: {len(capturados)}/{len(indices)}")
         else:
             ic(f"✓ Encontrados {len(itens_historico)} atendimento(s) no histórico")
 
-            lista_atendimentos = []
-
             # Clicar em cada item e capturar os dados
-            for i, item in enumerate(itens_historico, 1):
+            for i in indices:
+                item = itens_historico[i]
+                n = i + 1
                 try:
                     ic(f"\n{'='*70}")
-                    ic(f"Processando atendimento {i}/{len(itens_historico)}")
+                    ic(f"Processando atendimento {n}/{len(itens_historico)}")
                     ic(f"{'='*70}")
 
                     # Scroll até o elemento para garantir que está visível
                     try:
                         driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", item)
-                        time.sleep(0.5)
-                    except:
+                    except Exception as e:
+                        if erro_de_sessao(e):
+                            raise
                         pass
 
                     # Clicar no item
                     try:
                         item.click()
-                        ic(f"✓ Clicado no atendimento {i}")
-                    except:
+                        ic(f"✓ Clicado no atendimento {n}")
+                    except Exception as e:
+                        if erro_de_sessao(e):
+                            raise
                         # Tentar via JavaScript se click normal falhar
                         try:
                             driver.execute_script("arguments[0].click();", item)
-                            ic(f"✓ Clicado no atendimento {i} (via JavaScript)")
+                            ic(f"✓ Clicado no atendimento {n} (via JavaScript)")
                         except Exception as e:
-                            ic(f"⚠️ Erro ao clicar no atendimento {i}: {e}")
+                            if erro_de_sessao(e):
+                                raise
+                            ic(f"⚠️ Erro ao clicar no atendimento {n}: {e}")
                             continue
 
-                    # Aguardar conteúdo carregar
-                    time.sleep(2)
-
-                    # Aguardar loading desaparecer (se houver)
-                    try:
-                        WebDriverWait(driver, 5).until(
-                            EC.invisibility_of_element_located((By.CLASS_NAME, "pep-loading-wrapper"))
-                        )
-                    except:
-                        pass
+                    # Aguardar conteúdo carregar (loading + XHR + DOM estável)
+                    aguardar_pagina_pronta(driver, "atendimento")
 
                     # Capturar dados deste atendimento
-                    dados_atendimento = capturar_dados_atendimento(driver, index=i)
+                    dados_atendimento = capturar_dados_atendimento(driver, index=n)
 
                     if dados_atendimento:
-                        lista_atendimentos.append(dados_atendimento)
-                        ic(f"✓ Atendimento {i} capturado com sucesso")
+                        capturados[i] = dados_atendimento
+                        ic(f"✓ Atendimento {n} capturado com sucesso")
                     else:
-                        ic(f"⚠️ Falha ao capturar dados do atendimento {i}")
+                        ic(f"⚠️ Falha ao capturar dados do atendimento {n}")
 
                 except Exception as e:
-                    ic(f"⚠️ Erro ao processar atendimento {i}: {e}")
+                    if erro_de_sessao(e):
+                        raise
+                    ic(f"⚠️ Erro ao processar atendimento {n}: {e}")
                     continue
 
             ic(f"\n{'='*70}")
-            ic(f"✓ Total de atendimentos capturados: {len(lista_atendimentos)}/{len(itens_historico)}")
+            ic(f"✓ Total de atendimentos capturados: {len(capturados)}/{len(indices)}")
             ic(f"{'='*70}\n")
 
+        if incremental:
+            for i, dados_atendimento in capturados.items():
+                dados_atendimento["chave_historico"] = chaves[i]
+        lista_atendimentos = [capturados[i] for i in sorted(capturados)]
+
         # ==================================================================
         # DADOS DEMOGRÁFICOS DO PACIENTE (MANTIDO DO CÓDIGO ORIGINAL)
         # ==================================================================
 
         # Estrutura de dados (dados demográficos + lista de atendimentos)
-        dados_paciente = {
-            "prontuario": prontuario,
-            "nome_registro": "",
-            "data_nascimento": "",
-            "raca": "",
-            "cpf": "",
-            "codigo_paciente": "",
-            "naturalidade": "",
-            "atendimentos": lista_atendimentos,  # NOVO: lista de todos os atendimentos capturados
-            "total_atendimentos": len(lista_atendimentos),  # NOVO: contador
-            "data_captura": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        }
+        dados_paciente = novo_dados_paciente(prontuario, lista_atendimentos)
 
         ic("Iniciando captura de dados do sistema PEP...")
 
-        # ESTRATÉGIA 1: Capturar nome
-        ic("[1] Capturando nome do paciente...")
-        try:
-            nome_element = driver.find_element(
-                By.XPATH,
-                "//h2[contains(@class, 'mat-card-title') or contains(text(), ' ')]"
-            )
-            nome_completo = nome_element.text.strip()
-            if nome_completo and len(nome_completo) > 5:
-                dados_paciente["nome_registro"] = nome_completo
-                ic(f"✓ Nome capturado: {nome_completo}")
-        except Exception as e:
-            ic(f"⚠️ Erro ao capturar nome: {e}")
+        # Snapshot único da página; estratégias 1–4 rodam em Python
+        snapshot = capturar_snapshot(driver)
+        extrair_dados_demograficos(snapshot, dados_paciente)
 
-        # Fallback para nome
-        if not dados_paciente["nome_registro"]:
-            try:
-                elementos_grandes = driver.find_elements(
-                    By.XPATH,
-                    "//*[contains(@class, 'title') or contains(@class, 'name') or contains(@class, 'paciente')]"
-                )
-                for elem in elementos_grandes:
-                    texto = elem.text.strip()
-                    if len(texto) > 10 and ' ' in texto and texto.isupper():
-                        dados_paciente["nome_registro"] = texto
-                        ic(f"✓ Nome capturado (alternativa): {texto}")
-                        break
-            except:
-                pass
-
-        # ESTRATÉGIA 2: Regex no texto da página
-        ic("[2] Analisando texto da página...")
-        page_text = driver.find_element(By.TAG_NAME, "body").text
-
-        patterns = {
-            "data_nascimento": [
-                r'Data de nascimento[:\s]*(\d{2}/\d{2}/\d{4})',
-                r'Nascimento[:\s]*(\d{2}/\d{2}/\d{4})',
-                r'(\d{2}/\d{2}/\d{4})',
-            ],
-            "cpf": [
-                r'CPF[:\s]*(\d{11})',
-                r'CPF[:\s]*(\d{3}\.?\d{3}\.?\d{3}-?\d{2})',
-                r'(\d{11})',
-            ],
-            "codigo_paciente": [
-                r'Código do paciente[:\s]*(\d+)',
-                r'Código[:\s]*(\d+)',
-                r'SAME[:\s]*(\d+)',
-            ],
-            "raca": [
-                r'Raça[:\s]*(\w+)',
-                r'Cor[:\s]*(\w+)',
-                r'Etnia[:\s]*(\w+)',
-            ],
-            "naturalidade": [
-                r'Naturalidade[:\s]*(\w+)',
-                r'Natural de[:\s]*(\w+)',
-            ]
-        }
-
-        for campo, padroes in patterns.items():
-            if not dados_paciente[campo]:
-                for padrao in padroes:
-                    match = re.search(padrao, page_text, re.IGNORECASE)
-                    if match:
-                        valor = match.group(1).strip()
-                        dados_paciente[campo] = valor
-                        ic(f"✓ {campo} capturado via regex: {valor}")
-                        break
+        ic(f"Total atendimentos: {len(lista_atendimentos)} capturado(s)")
 
-        # ESTRATÉGIA 3: Pares label-valor
-        ic("[3] Procurando estrutura de pares label-valor...")
+        if incremental:
+            # Novos atendimentos mesclados ao registro do prontuário
+            dados_paciente = mesclar_registro(registro, dados_paciente, chaves)
 
-        xpath_strategies = [
-            "//div[contains(text(), ':')]",
-            "//span[contains(text(), ':')]",
-            "//p[contains(text(), ':')]",
-            "//label",
-            "//dt",
-        ]
+        salvar_dados_paciente(driver, dados_paciente)
 
-        for xpath in xpath_strategies:
-            try:
-                elementos = driver.find_elements(By.XPATH, xpath)
-                for elemento in elementos:
-                    try:
-                        texto = elemento.text.strip()
-                        if ':' in texto:
-                            partes = texto.split(':', 1)
-                            if len(partes) == 2:
-                                label = partes[0].strip().lower()
-                                valor = partes[1].strip()
-
-                                # Mapeamento
-                                if ('nome' in label or 'registro' in label) and not dados_paciente["nome_registro"]:
-                                    if len(valor) > 5:
-                                        dados_paciente["nome_registro"] = valor
-                                        ic(f"✓ Nome capturado: {valor}")
-
-                                elif ('nascimento' in label or 'nasc' in label) and not dados_paciente["data_nascimento"]:
-                                    if re.match(r'\d{2}/\d{2}/\d{4}', valor):
-                                        dados_paciente["data_nascimento"] = valor
-                                        ic(f"✓ Data de nascimento capturada: {valor}")
-
-                                elif ('raça' in label or 'raca' in label or 'cor' in label) and not dados_paciente["raca"]:
-                                    dados_paciente["raca"] = valor
-                                    ic(f"✓ Raça capturada: {valor}")
-
-                                elif 'cpf' in label and not dados_paciente["cpf"]:
-                                    cpf_limpo = re.sub(r'[^\d]', '', valor)
-                                    if len(cpf_limpo) == 11:
-                                        dados_paciente["cpf"] = cpf_limpo
-                                        ic(f"✓ CPF capturado: {cpf_limpo}")
-
-                                elif ('código' in label or 'codigo' in label or 'same' in label) and not dados_paciente["codigo_paciente"]:
-                                    codigo = re.sub(r'[^\d]', '', valor)
-                                    if codigo:
-                                        dados_paciente["codigo_paciente"] = codigo
-                                        ic(f"✓ Código capturado: {codigo}")
-
-                                elif 'naturalidade' in label and not dados_paciente["naturalidade"]:
-                                    dados_paciente["naturalidade"] = valor
-                                    ic(f"✓ Naturalidade capturada: {valor}")
-                    except:
-                        continue
-            except:
-                continue
+        return dados_paciente
 
-        # ESTRATÉGIA 4: Campos input
-        ic("[4] Verificando campos de input...")
-        try:
-            inputs = driver.find_elements(By.TAG_NAME, "input")
-            for inp in inputs:
-                try:
-                    value = inp.get_attribute("value")
-                    name = (inp.get_attribute("name") or "").lower()
-                    id_attr = (inp.get_attribute("id") or "").lower()
+    except Exception as e:
+        if erro_de_sessao(e):
+            raise
+        ic(f"⚠️ Erro ao capturar dados: {e}")
+        root = get_root_path()
+        driver.save_screenshot(str(root / "errors" / "erro_captura_dados.png"))
+        return None
 
-                    if not value:
-                        continue
 
-                    attrs = name + " " + id_attr
-
-                    if 'nome' in attrs and not dados_paciente["nome_registro"] and len(value) > 5:
-                        dados_paciente["nome_registro"] = value
-                        ic(f"✓ Nome capturado do input: {value}")
-
-                    elif ('data' in attrs or 'nasc' in attrs) and not dados_paciente["data_nascimento"]:
-                        if re.match(r'\d{2}/\d{2}/\d{4}', value):
-                            dados_paciente["data_nascimento"] = value
-                            ic(f"✓ Data capturada do input: {value}")
-
-                    elif 'cpf' in attrs and not dados_paciente["cpf"]:
-                        cpf_limpo = re.sub(r'[^\d]', '', value)
-                        if len(cpf_limpo) == 11:
-                            dados_paciente["cpf"] = cpf_limpo
-                            ic(f"✓ CPF capturado do input: {cpf_limpo}")
-
-                    elif ('raca' in attrs or 'cor' in attrs) and not dados_paciente["raca"]:
-                        dados_paciente["raca"] = value
-                        ic(f"✓ Raça capturada do input: {value}")
-
-                    elif ('codigo' in attrs or 'same' in attrs) and not dados_paciente["codigo_paciente"]:
-                        codigo = re.sub(r'[^\d]', '', value)
-                        if codigo:
-                            dados_paciente["codigo_paciente"] = codigo
-                            ic(f"✓ Código capturado do input: {codigo}")
-
-                    elif 'naturalidade' in attrs and not dados_paciente["naturalidade"]:
-                        dados_paciente["naturalidade"] = value
-                        ic(f"✓ Naturalidade capturada do input: {value}")
-                except:
-                    continue
-        except Exception as e:
-            ic(f"⚠️ Erro ao verificar inputs: {e}")
+def completar_dados_paciente(driver: webdriver.Chrome, dados_paciente: Dict) -> Optional[Dict]:
+    """
+    Completa pela página do paciente uma captura parcial do backend AMF.
 
-        # Resumo
+    Os atendimentos vêm do AMF; só os dados demográficos são lidos da página
+    (um snapshot) antes de gravar o paciente.
+
+    Args:
+        driver: WebDriver do Selenium, na página do paciente
+        dados_paciente: Retorno de capturar_dados_paciente_amf com "captura_parcial"
+
+    Returns:
+        dados_paciente completo e gravado, ou None em caso de erro
+    """
+    try:
         ic("="*70)
-        ic("RESUMO DA CAPTURA:")
+        ic("ETAPA 5: DADOS DEMOGRÁFICOS (COMPLEMENTO DA CAPTURA AMF)")
         ic("="*70)
 
-        dados_capturados = 0
-        dados_faltantes = []
+        aguardar_pagina_pronta(driver, "captura")
 
-        # Campos demográficos para validação (excluindo campos especiais)
-        campos_demograficos = ["nome_registro", "data_nascimento", "raca", "cpf", "codigo_paciente", "naturalidade"]
+        dados_paciente.pop("captura_parcial", None)
+        extrair_dados_demograficos(capturar_snapshot(driver), dados_paciente)
+        ic(f"Total atendimentos: {len(dados_paciente['atendimentos'])} via AMF")
 
-        for campo in campos_demograficos:
-            valor = dados_paciente.get(campo, "")
-            if valor:
-                ic(f"✓ {campo.replace('_', ' ').title()}: {valor}")
-                dados_capturados += 1
-            else:
-                ic(f"✗ {campo.replace('_', ' ').title()}: (não capturado)")
-                dados_faltantes.append(campo)
-
-        ic(f"Total demográficos: {dados_capturados}/6 dados capturados")
-        ic(f"Total atendimentos: {len(lista_atendimentos)} capturado(s)")
+        salvar_dados_paciente(driver, dados_paciente)
+        return dados_paciente
 
-        # Salvar JSON
+    except Exception as e:
+        if erro_de_sessao(e):
+            raise
+        ic(f"⚠️ Erro ao completar dados: {e}")
         root = get_root_path()
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"paciente_{prontuario}_{timestamp}.json"
+        driver.save_screenshot(str(root / "errors" / "erro_captura_dados.png"))
+        return None
+
+
+def salvar_dados_paciente(driver: webdriver.Chrome, dados_paciente: Dict) -> Path:
+    """
+    Resumo da captura, JSON do paciente e debug (HTML + screenshot) se faltar
+    algum dado demográfico.
+
+    Um registro incremental (com "indice_atendimentos") é regravado no lugar;
+    senão é gravado um paciente_<prontuario>_<timestamp>.json novo.
+
+    Args:
+        driver: WebDriver do Selenium, na página do paciente
+        dados_paciente: Dados a gravar
+
+    Returns:
+        Caminho do JSON gravado
+    """
+    root = get_root_path()
+    prontuario = dados_paciente["prontuario"]
+
+    # Resumo
+    ic("="*70)
+    ic("RESUMO DA CAPTURA:")
+    ic("="*70)
+
+    dados_capturados = 0
+    dados_faltantes = []
+
+    # Campos demográficos para validação (excluindo campos especiais)
+    for campo in CAMPOS_DEMOGRAFICOS:
+        valor = dados_paciente.get(campo, "")
+        if valor:
+            ic(f"✓ {campo.replace('_', ' ').title()}: {valor}")
+            dados_capturados += 1
+        else:
+            ic(f"✗ {campo.replace('_', ' ').title()}: (não capturado)")
+            dados_faltantes.append(campo)
+
+    ic(f"Total demográficos: {dados_capturados}/6 dados capturados")
 
-        dados_dir = root / "dados_pacientes"
-        dados_dir.mkdir(parents=True, exist_ok=True)
+    # Salvar JSON
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    dados_dir = root / "dados_pacientes"
+    dados_dir.mkdir(parents=True, exist_ok=True)
 
-        filepath = dados_dir / filename
+    if "indice_atendimentos" in dados_paciente:
+        filepath = gravar_registro(dados_paciente, root)
+    else:
+        filepath = dados_dir / f"paciente_{prontuario}_{timestamp}.json"
 
         with open(filepath, "w", encoding="utf-8") as f:
             json.dump(dados_paciente, f, ensure_ascii=False, indent=4)
 
-        ic(f"✓ Dados salvos em: {filepath}")
+    ic(f"✓ Dados salvos em: {filepath}")
 
-        # Salvar debug se houver falhas
-        if dados_faltantes:
-            ic(f"⚠️ Dados não capturados: {', '.join(dados_faltantes)}")
+    # Salvar debug se houver falhas
+    if dados_faltantes:
+        ic(f"⚠️ Dados não capturados: {', '.join(dados_faltantes)}")
 
-            html_filename = f"page_source_{prontuario}_{timestamp}.html"
-            html_filepath = dados_dir / html_filename
+        html_filename = f"page_source_{prontuario}_{timestamp}.html"
+        html_filepath = dados_dir / html_filename
 
-            with open(html_filepath, "w", encoding="utf-8") as f:
-                f.write(driver.page_source)
-
-            ic(f"✓ HTML salvo para debug em: {html_filepath}")
+        with open(html_filepath, "w", encoding="utf-8") as f:
+            f.write(driver.page_source)
 
-            screenshot_filename = f"screenshot_{prontuario}_{timestamp}.png"
-            screenshot_filepath = dados_dir / screenshot_filename
-            driver.save_screenshot(str(screenshot_filepath))
-            ic(f"✓ Screenshot salvo em: {screenshot_filepath}")
+        ic(f"✓ HTML salvo para debug em: {html_filepath}")
 
-        return dados_paciente
+        screenshot_filename = f"screenshot_{prontuario}_{timestamp}.png"
+        screenshot_filepath = dados_dir / screenshot_filename
+        driver.save_screenshot(str(screenshot_filepath))
+        ic(f"✓ Screenshot salvo em: {screenshot_filepath}")
 
-    except Exception as e:
-        ic(f"⚠️ Erro ao capturar dados: {e}")
-        root = get_root_path()
-        driver.save_screenshot(str(root / "errors" / "erro_captura_dados.png"))
-        return None
+    return filepath
 
 
 # ============================================================================
@@ -0,0 +1,204 @@
+"""
+Perfis de configuração do Chrome/Chromium usado pelo scraper.
+
+Cada perfil define o binário do navegador, o chromedriver, se roda headless,
+o tamanho da janela, argumentos extras e os tipos de recurso bloqueados.
+
+- windows: o setup original (CentBrowser + 3rdparty/chromedriver.exe,
+  janela maximizada, com interface)
+- linux: Chromium do sistema com interface (ex. sob Xvfb), janela fixa
+- linux_headless: Chromium headless com janela pequena e fixa, sem
+  imagens, fontes, favicon e folhas de estilo
+
+O bloqueio usa a lista de URLs bloqueadas do DevTools (Network.setBlockedURLs):
+o Chrome nem chega a fazer essas requisições, o que corta CPU, memória e
+banda por página e permite mais sessões por servidor. O scraper lê dados
+pelo DOM e pelas respostas AMF, que continuam chegando normalmente.
+
+Sem PEP_PERFIL_DRIVER, o perfil é "windows" no Windows e "linux_headless"
+nos demais sistemas. Caminhos vazios (None) ficam por conta do Selenium
+Manager, que encontra o navegador e baixa o chromedriver compatível.
+"""
+
+import os
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.chrome.options import Options
+from selenium.common.exceptions import WebDriverException
+from icecream import ic
+
+
+# Padrões de URL bloqueados por tipo de recurso (sintaxe do Network.setBlockedURLs)
+PADROES_BLOQUEIO: Dict[str, List[str]] = {
+    "imagens": ["*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.bmp", "*.svg"],
+    "fontes": ["*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot"],
+    "favicon": ["*favicon*", "*.ico"],
+    "estilos": ["*.css", "*.css?*"],
+}
+
+# Argumentos usados por todos os perfis
+ARGUMENTOS_COMUNS = [
+    "--ignore-certificate-errors",
+    "--allow-insecure-localhost",
+    "--disable-blink-features=AutomationControlled",
+    "--no-sandbox",
+    "--disable-dev-shm-usage",
+]
+
+PERFIS_DRIVER: Dict[str, Dict] = {
+    "windows": {
+        "binario": r"C:\CentBrowser\chrome.exe",
+        "chromedriver": "3rdparty/chromedriver.exe",
+        "headless": False,
+        "janela": None,  # maximizada
+        "argumentos": ["--cb-disable-components-auto-update", "--disable-direct-write"],
+        "bloquear": [],
+    },
+    "linux": {
+        "binario": None,
+        "chromedriver": None,
+        "headless": False,
+        "janela": (1280, 800),
+        "argumentos": [],
+        "bloquear": [],
+    },
+    "linux_headless": {
+        "binario": None,
+        "chromedriver": None,
+        "headless": True,
+        "janela": (1024, 768),
+        "argumentos": [
+            "--disable-gpu",
+            "--disable-extensions",
+            "--mute-audio",
+            "--blink-settings=imagesEnabled=false",
+        ],
+        "bloquear": ["imagens", "fontes", "favicon", "estilos"],
+    },
+}
+
+
+def perfil_padrao() -> str:
+    """Nome do perfil usado quando PEP_PERFIL_DRIVER não está definido"""
+    return "windows" if os.name == "nt" else "linux_headless"
+
+
+def carregar_perfil(nome: Optional[str] = None) -> Dict:
+    """
+    Monta o perfil do driver, com os ajustes do .env.
+
+    Variáveis de ambiente:
+        PEP_PERFIL_DRIVER: windows, linux ou linux_headless
+        PEP_CHROME_BINARIO: executável do Chrome/Chromium
+        PEP_CHROMEDRIVER: executável do chromedriver (relativo à raiz ou absoluto)
+        PEP_HEADLESS: 1/0 para forçar ou desligar o headless
+        PEP_JANELA: tamanho da janela, ex. 1024x768
+        PEP_BLOQUEAR: tipos bloqueados separados por vírgula (vazio = nenhum),
+            entre imagens, fontes, favicon e estilos
+
+    Args:
+        nome: Nome do perfil (default: PEP_PERFIL_DRIVER ou perfil_padrao())
+
+    Returns:
+        Dicionário do perfil (cópia, com "nome")
+    """
+    nome = nome or os.getenv("PEP_PERFIL_DRIVER") or perfil_padrao()
+    if nome not in PERFIS_DRIVER:
+        raise ValueError(f"Perfil de driver desconhecido: {nome} (use {', '.join(PERFIS_DRIVER)})")
+
+    perfil = dict(PERFIS_DRIVER[nome], nome=nome)
+
+    if os.getenv("PEP_CHROME_BINARIO"):
+        perfil["binario"] = os.getenv("PEP_CHROME_BINARIO")
+    if os.getenv("PEP_CHROMEDRIVER"):
+        perfil["chromedriver"] = os.getenv("PEP_CHROMEDRIVER")
+    if os.getenv("PEP_HEADLESS"):
+        perfil["headless"] = os.getenv("PEP_HEADLESS").lower() in ("1", "true", "sim")
+    if os.getenv("PEP_JANELA"):
+        largura, altura = os.getenv("PEP_JANELA").lower().split("x")
+        perfil["janela"] = (int(largura), int(altura))
+    if os.getenv("PEP_BLOQUEAR") is not None:
+        perfil["bloquear"] = [t.strip() for t in os.getenv("PEP_BLOQUEAR").split(",") if t.strip()]
+
+    for tipo in perfil["bloquear"]:
+        if tipo not in PADROES_BLOQUEIO:
+            raise ValueError(f"Tipo de recurso desconhecido em PEP_BLOQUEAR: {tipo}")
+
+    return perfil
+
+
+def montar_opcoes(perfil: Dict) -> Options:
+    """
+    Cria as opções do Chrome para o perfil.
+
+    Args:
+        perfil: Saída de carregar_perfil
+
+    Returns:
+        Options do Selenium
+    """
+    options = Options()
+    if perfil["binario"]:
+        options.binary_location = perfil["binario"]
+
+    for argumento in ARGUMENTOS_COMUNS + perfil["argumentos"]:
+        options.add_argument(argumento)
+
+    if perfil["headless"]:
+        options.add_argument("--headless=new")
+
+    if perfil["janela"]:
+        largura, altura = perfil["janela"]
+        options.add_argument(f"--window-size={largura},{altura}")
+    else:
+        options.add_argument("--start-maximized")
+
+    # Opções anti-detecção
+    options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    options.add_experimental_option('useAutomationExtension', False)
+
+    return options
+
+
+def criar_service(perfil: Dict, root: Path) -> Service:
+    """
+    Cria o Service do chromedriver do perfil.
+
+    Args:
+        perfil: Saída de carregar_perfil
+        root: Raiz do projeto (base de caminhos relativos)
+
+    Returns:
+        Service com o chromedriver do perfil, ou resolvido pelo Selenium Manager
+    """
+    if not perfil["chromedriver"]:
+        return Service()
+
+    driver_path = Path(perfil["chromedriver"])
+    if not driver_path.is_absolute():
+        driver_path = root / driver_path
+
+    ic(f"Driver path: {driver_path}")
+    return Service(executable_path=str(driver_path))
+
+
+def aplicar_bloqueios(driver, perfil: Dict):
+    """
+    Bloqueia no navegador os tipos de recurso do perfil (via DevTools).
+
+    Args:
+        driver: WebDriver do Chrome recém-criado
+        perfil: Saída de carregar_perfil
+    """
+    padroes = [p for tipo in perfil["bloquear"] for p in PADROES_BLOQUEIO[tipo]]
+    if not padroes:
+        return
+
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": padroes})
+        ic(f"✓ Bloqueando {', '.join(perfil['bloquear'])} ({len(padroes)} padrões)")
+    except WebDriverException as e:
+        ic(f"⚠️ Não foi possível bloquear recursos: {e}")
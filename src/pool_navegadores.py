@@ -0,0 +1,240 @@
+"""
+Pool de navegadores pré-aquecidos, com reciclagem periódica.
+
+Abrir o Chrome e fazer login custa vários segundos, e um navegador que passa
+por milhares de pacientes vai acumulando memória no SPA Angular. O pool:
+
+- aquece navegadores em background (já logados e parados na página de
+  busca), a partir da confirmação do usuário; na ingestão em streaming os
+  logins acontecem enquanto os CSVs ainda estão sendo lidos;
+- mantém RESERVAS navegadores prontos além dos que estão em uso;
+- troca o navegador de uma sessão depois de PACIENTES_POR_NAVEGADOR
+  pacientes ou quando o heap JS passa de LIMITE_MEMORIA_MB. A troca só
+  acontece quando o substituto já está pronto (até lá a sessão segue com o
+  navegador atual), e o antigo é fechado em background, então a fila não
+  para esperando um Chrome subir.
+"""
+
+import os
+import queue
+import threading
+from itertools import count
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+from icecream import ic
+
+from sessao import GerenciadorSessao, criar_gerenciador_sessao
+
+
+PACIENTES_POR_NAVEGADOR = 300
+LIMITE_MEMORIA_MB = 1024
+RESERVAS = 1
+
+# Navegadores subindo ao mesmo tempo (escalona os logins no PEP)
+AQUECEDORES = 2
+
+
+def memoria_js_mb(driver) -> Optional[float]:
+    """Heap JS em uso na aba atual (MB), ou None se indisponível"""
+    try:
+        usado = driver.execute_script(
+            "return window.performance && performance.memory ? performance.memory.usedJSHeapSize : null;"
+        )
+        return usado / 1024 / 1024 if usado else None
+    except Exception:
+        return None
+
+
+class PoolNavegadores:
+    """
+    Sessões (GerenciadorSessao) logadas prontas para uso.
+
+    Args:
+        credenciais: Dicionário com credenciais
+        reservas: Navegadores prontos mantidos além dos em uso
+        pacientes_por_navegador: Pacientes antes de reciclar (0 desliga)
+        limite_memoria_mb: Heap JS que dispara a reciclagem (0 desliga)
+        aquecedores: Navegadores subindo ao mesmo tempo
+    """
+
+    def __init__(
+        self,
+        credenciais: Dict,
+        reservas: int = RESERVAS,
+        pacientes_por_navegador: int = PACIENTES_POR_NAVEGADOR,
+        limite_memoria_mb: float = LIMITE_MEMORIA_MB,
+        aquecedores: int = AQUECEDORES
+    ):
+        self.credenciais = credenciais
+        self.reservas = max(0, reservas)
+        self.pacientes_por_navegador = pacientes_por_navegador
+        self.limite_memoria_mb = limite_memoria_mb
+
+        self.reciclados = 0
+        self._prontos: queue.Queue = queue.Queue()
+        self._aquecendo = 0
+        self._falhas_seguidas = 0
+        self._ids = count(1)
+        self._lock = threading.Lock()
+        self._fechado = False
+        self._executor = ThreadPoolExecutor(max_workers=max(1, aquecedores), thread_name_prefix="aquecedor")
+
+    def _criar(self):
+        """Abre e loga um navegador (roda nas threads do executor)"""
+        sessao = criar_gerenciador_sessao(self.credenciais, f"[Navegador {next(self._ids)}] ")
+        try:
+            pronto = not self._fechado and sessao.iniciar()
+        except Exception as e:
+            ic(f"{sessao.prefixo}❌ Erro ao aquecer navegador: {e}")
+            pronto = False
+
+        with self._lock:
+            self._aquecendo -= 1
+            self._falhas_seguidas = 0 if pronto else self._falhas_seguidas + 1
+            fechado = self._fechado
+
+        if pronto and fechado:
+            sessao.fechar()
+        elif pronto:
+            self._prontos.put(sessao)
+            ic(f"{sessao.prefixo}✓ Navegador pronto no pool")
+
+    def aquecer(self, quantidade: int = 1):
+        """Pede mais `quantidade` navegadores, aquecidos em background"""
+        with self._lock:
+            if self._fechado:
+                return
+            self._aquecendo += quantidade
+        for _ in range(quantidade):
+            self._executor.submit(self._criar)
+
+    def obter(self, parar: Optional[threading.Event] = None) -> Optional[GerenciadorSessao]:
+        """
+        Entrega um navegador pronto, esperando o aquecimento se preciso.
+
+        Returns:
+            Sessão logada, ou None se nenhum navegador conseguiu subir (ou parar)
+        """
+        while not (parar and parar.is_set()):
+            try:
+                sessao = self._prontos.get(timeout=1)
+            except queue.Empty:
+                with self._lock:
+                    sem_aquecimento = self._aquecendo == 0
+                    desistir = self._falhas_seguidas >= AQUECEDORES + self.reservas + 1
+                if desistir:
+                    ic("❌ Navegadores do pool não sobem, desistindo")
+                    return None
+                if sem_aquecimento:
+                    self.aquecer(1)
+                continue
+
+            # Repor a reserva consumida
+            with self._lock:
+                faltam = self.reservas - self._prontos.qsize() - self._aquecendo
+            if faltam > 0:
+                self.aquecer(faltam)
+            return sessao
+
+        return None
+
+    def precisa_reciclar(self, sessao: GerenciadorSessao) -> bool:
+        """Navegador atingiu o limite de pacientes ou de memória"""
+        if self.pacientes_por_navegador and sessao.pacientes >= self.pacientes_por_navegador:
+            return True
+        if self.limite_memoria_mb:
+            memoria = memoria_js_mb(sessao.driver)
+            if memoria is not None and memoria >= self.limite_memoria_mb:
+                ic(f"{sessao.prefixo}⚠️ Heap JS em {memoria:.0f} MB")
+                return True
+        return False
+
+    def trocar_se_preciso(self, sessao: GerenciadorSessao) -> GerenciadorSessao:
+        """
+        Troca o navegador da sessão se ele precisa ser reciclado.
+
+        Sem substituto pronto, pede um e continua com o atual; a troca
+        acontece numa chamada seguinte, quando o novo já estiver logado.
+
+        Returns:
+            A sessão a usar no próximo paciente
+        """
+        if not self.precisa_reciclar(sessao):
+            return sessao
+
+        try:
+            nova = self._prontos.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                pedir = self._aquecendo == 0
+            if pedir:
+                ic(f"{sessao.prefixo}Reciclagem pendente: aquecendo substituto")
+                self.aquecer(1)
+            return sessao
+
+        self.reciclados += 1
+        ic(f"{sessao.prefixo}↻ Reciclado após {sessao.pacientes} paciente(s); seguindo com {nova.prefixo.strip()}")
+        self._fechar_em_background(sessao)
+
+        with self._lock:
+            faltam = self.reservas - self._prontos.qsize() - self._aquecendo
+        if faltam > 0:
+            self.aquecer(faltam)
+        return nova
+
+    def devolver(self, sessao: GerenciadorSessao):
+        """Devolve ao pool uma sessão que não será mais usada pelo worker"""
+        if sessao.driver is None:
+            return
+        with self._lock:
+            fechado = self._fechado
+        if fechado or self.precisa_reciclar(sessao):
+            self._fechar_em_background(sessao)
+        else:
+            self._prontos.put(sessao)
+
+    def _fechar_em_background(self, sessao: GerenciadorSessao):
+        """driver.quit() pode levar segundos: fecha fora da thread do worker"""
+        try:
+            self._executor.submit(sessao.fechar)
+        except RuntimeError:
+            # Executor já encerrado
+            sessao.fechar()
+
+    def fechar(self):
+        """Fecha os navegadores parados no pool e espera o background terminar"""
+        with self._lock:
+            self._fechado = True
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+        while True:
+            try:
+                self._prontos.get_nowait().fechar()
+            except queue.Empty:
+                break
+
+
+def criar_pool_navegadores(credenciais: Dict) -> PoolNavegadores:
+    """
+    Cria o pool de navegadores a partir do .env.
+
+    Variáveis de ambiente:
+        PEP_NAVEGADORES_RESERVA: navegadores prontos além dos em uso
+        PEP_RECICLAR_PACIENTES: pacientes por navegador antes de reciclar (0 desliga)
+        PEP_RECICLAR_MEMORIA_MB: heap JS que dispara a reciclagem (0 desliga)
+
+    Args:
+        credenciais: Dicionário com credenciais
+
+    Returns:
+        PoolNavegadores (ainda vazio; ver aquecer)
+    """
+    reservas = int(os.getenv("PEP_NAVEGADORES_RESERVA", RESERVAS))
+    pacientes = int(os.getenv("PEP_RECICLAR_PACIENTES", PACIENTES_POR_NAVEGADOR))
+    memoria = float(os.getenv("PEP_RECICLAR_MEMORIA_MB", LIMITE_MEMORIA_MB))
+
+    ic(f"Pool de navegadores: {reservas} de reserva, reciclagem a cada {pacientes} paciente(s) "
+       f"ou {memoria:.0f} MB de heap")
+
+    return PoolNavegadores(credenciais, reservas, pacientes, memoria)
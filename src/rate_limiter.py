@@ -0,0 +1,183 @@
+"""
+Rate limiter global (token bucket) para as requisições ao PEP.
+
+Substitui o sleep aleatório fixo entre pacientes. O bucket é reabastecido
+continuamente na taxa alvo, então o tempo que o paciente anterior levou para
+ser processado já conta como espera: só se dorme o que faltar para o próximo
+token. Uma única instância é compartilhada por todas as sessões.
+
+Se a taxa de erros recente sobe acima do limite, a taxa efetiva é reduzida
+(backoff multiplicativo) e volta gradualmente ao alvo quando os erros caem.
+"""
+
+import os
+import time
+import random
+import threading
+from collections import deque
+from typing import Optional
+
+from icecream import ic
+
+
+DISTRIBUICOES_JITTER = ("uniforme", "normal", "nenhum")
+
+
+class LimitadorTaxa:
+    """
+    Token bucket thread-safe com jitter e backoff por taxa de erros.
+
+    Args:
+        taxa_por_minuto: Taxa alvo de pacientes iniciados por minuto (global)
+        rajada: Quantidade de tokens acumuláveis (tamanho da rajada)
+        jitter: Amplitude do jitter aplicado às esperas (segundos)
+        distribuicao: "uniforme" (±jitter), "normal" (σ = jitter/2) ou "nenhum"
+        janela_erros: Quantidade de resultados recentes considerados no backoff
+        limite_erros: Fração de erros na janela que dispara o backoff
+        fator_backoff: Fator de redução da taxa a cada backoff
+        backoff_maximo: Redução máxima da taxa (taxa mínima = taxa / backoff_maximo)
+    """
+
+    def __init__(
+        self,
+        taxa_por_minuto: float = 6.0,
+        rajada: int = 1,
+        jitter: float = 0.0,
+        distribuicao: str = "uniforme",
+        janela_erros: int = 20,
+        limite_erros: float = 0.3,
+        fator_backoff: float = 2.0,
+        backoff_maximo: float = 8.0
+    ):
+        if taxa_por_minuto <= 0:
+            raise ValueError("taxa_por_minuto deve ser positiva")
+        if distribuicao not in DISTRIBUICOES_JITTER:
+            raise ValueError(f"distribuicao deve ser uma de {DISTRIBUICOES_JITTER}")
+
+        self.taxa_por_minuto = taxa_por_minuto
+        self.rajada = max(1, int(rajada))
+        self.jitter = max(0.0, jitter)
+        self.distribuicao = distribuicao
+        self.limite_erros = limite_erros
+        self.fator_backoff = fator_backoff
+        self.backoff_maximo = backoff_maximo
+
+        self.multiplicador = 1.0
+        self._resultados = deque(maxlen=janela_erros)
+        self._tokens = float(self.rajada)
+        self._ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def taxa_efetiva(self) -> float:
+        """Taxa atual em pacientes por minuto, já considerando o backoff"""
+        return self.taxa_por_minuto / self.multiplicador
+
+    def _reabastecer(self, agora: float):
+        """Adiciona os tokens gerados desde a última consulta"""
+        decorrido = agora - self._ultimo
+        self._ultimo = agora
+        self._tokens = min(self.rajada, self._tokens + decorrido * self.taxa_efetiva / 60)
+
+    def _sortear_jitter(self) -> float:
+        """Sorteia o deslocamento de jitter (pode ser negativo)"""
+        if self.distribuicao == "uniforme":
+            return random.uniform(-self.jitter, self.jitter)
+        if self.distribuicao == "normal":
+            return random.gauss(0, self.jitter / 2)
+        return 0.0
+
+    def aguardar(self, parar: Optional[threading.Event] = None) -> float:
+        """
+        Bloqueia até haver um token disponível e o consome.
+
+        O token é reservado antes de dormir, então várias sessões chamando
+        ao mesmo tempo formam uma fila ordenada sem exceder a taxa.
+
+        Args:
+            parar: Evento opcional que interrompe a espera quando setado
+
+        Returns:
+            Tempo de espera em segundos
+        """
+        with self._lock:
+            self._reabastecer(time.monotonic())
+            self._tokens -= 1
+            deficit = -self._tokens
+
+        if deficit <= 0:
+            return 0.0
+
+        espera = deficit * 60 / self.taxa_efetiva
+        espera = max(0.0, espera + self._sortear_jitter())
+
+        ic(f"⏳ Aguardando {espera:.1f}s (taxa: {self.taxa_efetiva:.1f}/min)")
+        if parar is not None:
+            parar.wait(espera)
+        else:
+            time.sleep(espera)
+
+        return espera
+
+    def registrar_resultado(self, sucesso: bool):
+        """
+        Registra o resultado de um paciente e ajusta o backoff.
+
+        Quando a janela enche, a taxa de erros é avaliada: acima de
+        limite_erros a taxa é reduzida; abaixo da metade do limite ela volta
+        um passo em direção ao alvo. A janela é zerada a cada ajuste.
+
+        Args:
+            sucesso: Se o processamento do paciente foi bem-sucedido
+        """
+        with self._lock:
+            self._resultados.append(sucesso)
+
+            if len(self._resultados) < self._resultados.maxlen:
+                return
+
+            taxa_erros = self._resultados.count(False) / len(self._resultados)
+            anterior = self.multiplicador
+
+            if taxa_erros > self.limite_erros:
+                self.multiplicador = min(self.multiplicador * self.fator_backoff, self.backoff_maximo)
+            elif taxa_erros < self.limite_erros / 2:
+                self.multiplicador = max(self.multiplicador / self.fator_backoff, 1.0)
+
+            if self.multiplicador != anterior:
+                self._resultados.clear()
+                ic(f"⚠️ Taxa de erros {taxa_erros:.0%}: taxa ajustada para {self.taxa_efetiva:.1f}/min")
+
+
+def criar_limitador(intervalo_min: int = 5, intervalo_max: int = 15) -> LimitadorTaxa:
+    """
+    Cria o limitador a partir do .env, com defaults derivados dos intervalos.
+
+    Sem configuração, a taxa alvo é um paciente a cada (min + max) / 2
+    segundos e o jitter tem amplitude (max - min) / 2.
+
+    Variáveis de ambiente:
+        PEP_TAXA_POR_MINUTO, PEP_RAJADA, PEP_JITTER, PEP_JITTER_DISTRIBUICAO
+
+    Args:
+        intervalo_min: Intervalo mínimo entre pacientes (segundos)
+        intervalo_max: Intervalo máximo entre pacientes (segundos)
+
+    Returns:
+        LimitadorTaxa configurado
+    """
+    intervalo_medio = max((intervalo_min + intervalo_max) / 2, 0.001)
+
+    taxa = float(os.getenv("PEP_TAXA_POR_MINUTO", 60 / intervalo_medio))
+    rajada = int(os.getenv("PEP_RAJADA", "1"))
+    jitter = float(os.getenv("PEP_JITTER", (intervalo_max - intervalo_min) / 2))
+    distribuicao = os.getenv("PEP_JITTER_DISTRIBUICAO", "uniforme")
+
+    ic(f"Rate limiter: {taxa:.1f} pacientes/min, rajada {rajada}, jitter ±{jitter:.1f}s ({distribuicao})")
+
+    return LimitadorTaxa(
+        taxa_por_minuto=taxa,
+        rajada=rajada,
+        jitter=jitter,
+        distribuicao=distribuicao
+    )
@@ -0,0 +1,149 @@
+"""
+Resolver de matrícula → número do atendimento, com cache persistente.
+
+A página do paciente no PEP é endereçada pelo número do atendimento
+(.../LISTA_TODOS_PACIENTES/h/{numero_atendimento}). Descobrir esse número
+exige buscar o paciente e raspar os h3 do resultado. Depois de descoberto
+uma vez, o número fica salvo em atendimentos_cache.json e, nas próximas
+execuções ou retentativas, o loop vai direto para a URL do paciente.
+"""
+
+import os
+import json
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+from datetime import datetime
+
+from icecream import ic
+
+
+# Rota do PEP que abre a página de um paciente a partir do atendimento
+ROTA_PACIENTE = "/#/d/3622/MVPEP_LISTA_TODOS_PACIENTES_HTML5/2512/LISTA_TODOS_PACIENTES/h/{numero_atendimento}"
+
+_lock_cache = threading.Lock()
+
+
+def get_cache_path(root: Optional[Path] = None) -> Path:
+    """Retorna o caminho do cache de atendimentos"""
+    if root is None:
+        root = Path(__file__).parent.parent
+    return Path(root) / "atendimentos_cache.json"
+
+
+def montar_url_paciente(url_referencia: str, numero_atendimento: str) -> str:
+    """
+    Monta a URL da página do paciente.
+
+    Args:
+        url_referencia: Qualquer URL do PEP (só a parte antes de '/#/' é usada)
+        numero_atendimento: Número do atendimento
+
+    Returns:
+        URL completa da página do paciente
+    """
+    base_url = url_referencia.split('/#/')[0]
+    return base_url + ROTA_PACIENTE.format(numero_atendimento=numero_atendimento)
+
+
+def carregar_cache_atendimentos(root: Optional[Path] = None) -> Dict:
+    """
+    Carrega o cache de atendimentos do disco.
+
+    Args:
+        root: Diretório do cache (default: raiz do projeto)
+
+    Returns:
+        Dicionário {matricula: {"numero_atendimento": ..., "timestamp": ...}}
+    """
+    cache_file = get_cache_path(root)
+
+    if not cache_file.exists():
+        return {}
+
+    try:
+        with open(cache_file, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+        ic(f"✓ Cache de atendimentos carregado: {len(cache)} matrícula(s)")
+        return cache
+    except Exception as e:
+        ic(f"⚠️ Erro ao carregar cache de atendimentos: {e}")
+        return {}
+
+
+def salvar_cache_atendimentos(cache: Dict, root: Optional[Path] = None):
+    """
+    Salva o cache de atendimentos de forma atômica.
+
+    Args:
+        cache: Dicionário do cache
+        root: Diretório do cache (default: raiz do projeto)
+    """
+    cache_file = get_cache_path(root)
+    tmp_file = cache_file.with_suffix(".json.tmp")
+
+    with _lock_cache:
+        try:
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump(cache, f, ensure_ascii=False)
+            os.replace(tmp_file, cache_file)
+        except Exception as e:
+            ic(f"⚠️ Erro ao salvar cache de atendimentos: {e}")
+
+
+def obter_numero_atendimento(cache: Dict, matricula: str) -> Optional[str]:
+    """
+    Consulta o número do atendimento de uma matrícula no cache.
+
+    Args:
+        cache: Dicionário do cache
+        matricula: Número da matrícula
+
+    Returns:
+        Número do atendimento ou None se não estiver no cache
+    """
+    entrada = cache.get(matricula)
+    return entrada["numero_atendimento"] if entrada else None
+
+
+def registrar_numero_atendimento(
+    cache: Dict,
+    matricula: str,
+    numero_atendimento: str,
+    root: Optional[Path] = None
+):
+    """
+    Registra (e persiste) o número do atendimento de uma matrícula.
+
+    Args:
+        cache: Dicionário do cache
+        matricula: Número da matrícula
+        numero_atendimento: Número do atendimento descoberto
+        root: Diretório do cache (default: raiz do projeto)
+    """
+    if obter_numero_atendimento(cache, matricula) == numero_atendimento:
+        return
+
+    with _lock_cache:
+        cache[matricula] = {
+            "numero_atendimento": numero_atendimento,
+            "timestamp": datetime.now().isoformat()
+        }
+
+    salvar_cache_atendimentos(cache, root)
+
+
+def remover_numero_atendimento(cache: Dict, matricula: str, root: Optional[Path] = None):
+    """
+    Remove uma matrícula do cache (ex.: URL direta não abriu o paciente).
+
+    Args:
+        cache: Dicionário do cache
+        matricula: Número da matrícula
+        root: Diretório do cache (default: raiz do projeto)
+    """
+    with _lock_cache:
+        removido = cache.pop(matricula, None)
+
+    if removido:
+        salvar_cache_atendimentos(cache, root)
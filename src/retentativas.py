@@ -0,0 +1,259 @@
+"""
+Retentativas automáticas de pacientes com falha, com backoff exponencial.
+
+Cada falha é classificada pela etapa em que aconteceu (ETAPAS_FALHA) e a
+matrícula volta para a fila depois de uma espera que dobra a cada tentativa
+(com jitter e teto), até RETENTATIVAS_MAXIMAS tentativas. As retentativas
+vencidas são intercaladas com os pacientes novos (ver intercalar), então
+uma falha transitória é recuperada na mesma execução, sem uma segunda
+passada manual pela lista.
+"""
+
+import os
+import time
+import heapq
+import random
+import threading
+from itertools import count
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from icecream import ic
+
+from sessao import sessao_expirada
+from esperas import erro_de_sessao
+
+
+# Etapas em que um paciente pode falhar
+ETAPA_BUSCA = "busca"
+ETAPA_SELECAO = "selecao"
+ETAPA_CAPTURA = "captura"
+ETAPA_SESSAO = "sessao"
+ETAPA_ERRO = "erro"
+
+ETAPAS_FALHA = (ETAPA_BUSCA, ETAPA_SELECAO, ETAPA_CAPTURA, ETAPA_SESSAO, ETAPA_ERRO)
+
+# Motivo gravado no checkpoint para cada etapa
+MOTIVOS_FALHA = {
+    ETAPA_BUSCA: "Falha na busca",
+    ETAPA_SELECAO: "Falha na seleção",
+    ETAPA_CAPTURA: "Falha na captura",
+    ETAPA_SESSAO: "Sessão expirada",
+    ETAPA_ERRO: "Erro no processamento",
+}
+
+# Fator sobre a espera base por etapa: sessão expirada volta logo (o
+# problema é do navegador, não do paciente); captura espera mais
+FATOR_ESPERA_ETAPA = {
+    ETAPA_BUSCA: 1.0,
+    ETAPA_SELECAO: 1.0,
+    ETAPA_CAPTURA: 2.0,
+    ETAPA_SESSAO: 0.25,
+    ETAPA_ERRO: 1.0,
+}
+
+RETENTATIVAS_MAXIMAS = 3
+ESPERA_BASE = 60.0
+ESPERA_MAXIMA = 900.0
+
+
+def classificar_falha(driver, etapa: str, erro: Optional[BaseException] = None) -> str:
+    """
+    Ajusta a etapa da falha olhando o estado do navegador.
+
+    Se o navegador caiu na página de login, ou o WebDriver perdeu a sessão,
+    a falha é de sessão, qualquer que seja a etapa em que apareceu (ver
+    sessao.sessao_expirada e esperas.erro_de_sessao).
+
+    Args:
+        driver: WebDriver da sessão
+        etapa: Etapa em que a falha foi detectada
+        erro: Exceção que causou a falha (se houver)
+
+    Returns:
+        Etapa em ETAPAS_FALHA
+    """
+    if erro is not None and erro_de_sessao(erro):
+        return ETAPA_SESSAO
+
+    if sessao_expirada(driver):
+        return ETAPA_SESSAO
+
+    return etapa if etapa in ETAPAS_FALHA else ETAPA_ERRO
+
+
+class AgendaRetentativas:
+    """
+    Fila de retentativas ordenada pelo horário em que cada uma vence.
+
+    Thread-safe: as sessões registram resultados e o produtor da fila
+    consome as retentativas vencidas ao mesmo tempo.
+
+    Args:
+        tentativas_maximas: Tentativas por matrícula, contando a primeira
+        espera_base: Espera antes da 2ª tentativa (segundos)
+        espera_maxima: Teto da espera entre tentativas (segundos)
+        jitter: Fração aleatória aplicada à espera (0.2 = ±20%)
+    """
+
+    def __init__(
+        self,
+        tentativas_maximas: int = RETENTATIVAS_MAXIMAS,
+        espera_base: float = ESPERA_BASE,
+        espera_maxima: float = ESPERA_MAXIMA,
+        jitter: float = 0.2
+    ):
+        self.tentativas_maximas = max(1, tentativas_maximas)
+        self.espera_base = max(0.0, espera_base)
+        self.espera_maxima = max(self.espera_base, espera_maxima)
+        self.jitter = max(0.0, jitter)
+
+        self.tentativas: Dict[str, int] = {}
+        self.desistencias: List[Tuple[str, str]] = []
+        self.em_andamento = 0
+        self._heap: List[Tuple[float, int, str, str]] = []
+        self._seq = count()
+        self._cond = threading.Condition()
+
+    def espera(self, tentativa: int, etapa: str) -> float:
+        """Espera antes da próxima tentativa, após `tentativa` falhas"""
+        espera = self.espera_base * FATOR_ESPERA_ETAPA.get(etapa, 1.0) * 2 ** (tentativa - 1)
+        espera = min(espera, self.espera_maxima)
+        if self.jitter:
+            espera *= random.uniform(1 - self.jitter, 1 + self.jitter)
+        return espera
+
+    def entregue(self):
+        """Marca um paciente como entregue para processamento"""
+        with self._cond:
+            self.em_andamento += 1
+
+    def registrar(self, matricula: str, nome: str, sucesso: bool, etapa: str = ETAPA_ERRO) -> bool:
+        """
+        Registra o resultado de uma tentativa.
+
+        Args:
+            matricula: Número da matrícula
+            nome: Nome do paciente
+            sucesso: Se a tentativa deu certo
+            etapa: Etapa da falha (ETAPAS_FALHA)
+
+        Returns:
+            True se a matrícula foi reagendada
+        """
+        with self._cond:
+            self.em_andamento = max(0, self.em_andamento - 1)
+
+            if sucesso:
+                self.tentativas.pop(matricula, None)
+                self._cond.notify_all()
+                return False
+
+            tentativa = self.tentativas.get(matricula, 0) + 1
+            self.tentativas[matricula] = tentativa
+
+            if tentativa >= self.tentativas_maximas:
+                self.desistencias.append((matricula, etapa))
+                self._cond.notify_all()
+                ic(f"❌ {matricula}: {tentativa} tentativa(s), desistindo ({MOTIVOS_FALHA.get(etapa, etapa)})")
+                return False
+
+            espera = self.espera(tentativa, etapa)
+            heapq.heappush(self._heap, (time.monotonic() + espera, next(self._seq), matricula, nome))
+            self._cond.notify_all()
+
+        ic(f"↻ {matricula}: {MOTIVOS_FALHA.get(etapa, etapa).lower()}, nova tentativa em {espera:.0f}s "
+           f"({tentativa + 1}/{self.tentativas_maximas})")
+        return True
+
+    def vencidas(self) -> List[Tuple[str, str]]:
+        """Retira da agenda as retentativas cujo horário já chegou"""
+        agora = time.monotonic()
+        saida = []
+        with self._cond:
+            while self._heap and self._heap[0][0] <= agora:
+                _, _, matricula, nome = heapq.heappop(self._heap)
+                saida.append((matricula, nome))
+        return saida
+
+    def pendente(self) -> bool:
+        """Há retentativas agendadas ou pacientes ainda sem resultado"""
+        with self._cond:
+            return bool(self._heap) or self.em_andamento > 0
+
+    def aguardar_proxima(self, parar: Optional[threading.Event] = None) -> Optional[Tuple[str, str]]:
+        """
+        Bloqueia até a próxima retentativa vencer.
+
+        Returns:
+            (matricula, nome), ou None se não há mais nada por vir (ou parar)
+        """
+        with self._cond:
+            while not (parar and parar.is_set()):
+                if self._heap:
+                    restante = self._heap[0][0] - time.monotonic()
+                    if restante <= 0:
+                        _, _, matricula, nome = heapq.heappop(self._heap)
+                        return matricula, nome
+                    self._cond.wait(min(restante, 1.0))
+                elif self.em_andamento > 0:
+                    # Um resultado ainda pode gerar retentativa
+                    self._cond.wait(1.0)
+                else:
+                    return None
+        return None
+
+
+def intercalar(
+    pacientes: Iterable[Tuple[str, str]],
+    agenda: AgendaRetentativas,
+    parar: Optional[threading.Event] = None
+) -> Iterator[Tuple[str, str]]:
+    """
+    Entrega os pacientes novos com as retentativas vencidas intercaladas.
+
+    Antes de cada paciente novo saem as retentativas que já venceram. Depois
+    que os novos acabam, espera as retentativas restantes (e os resultados em
+    andamento, que ainda podem gerar outras) antes de terminar.
+
+    Args:
+        pacientes: Tuplas (matricula, nome) novas
+        agenda: Agenda onde as falhas são registradas
+        parar: Evento para interromper a espera final
+
+    Yields:
+        Tuplas (matricula, nome)
+    """
+    for paciente in pacientes:
+        for retentativa in agenda.vencidas():
+            agenda.entregue()
+            yield retentativa
+        agenda.entregue()
+        yield paciente
+
+    while agenda.pendente():
+        retentativa = agenda.aguardar_proxima(parar)
+        if retentativa is None:
+            break
+        agenda.entregue()
+        yield retentativa
+
+
+def criar_agenda_retentativas() -> AgendaRetentativas:
+    """
+    Cria a agenda de retentativas a partir do .env.
+
+    Variáveis de ambiente:
+        PEP_RETENTATIVAS: tentativas por matrícula, contando a primeira (1 desliga)
+        PEP_RETENTATIVA_ESPERA: espera antes da 2ª tentativa (segundos)
+        PEP_RETENTATIVA_ESPERA_MAXIMA: teto da espera (segundos)
+
+    Returns:
+        AgendaRetentativas configurada
+    """
+    tentativas = int(os.getenv("PEP_RETENTATIVAS", RETENTATIVAS_MAXIMAS))
+    espera_base = float(os.getenv("PEP_RETENTATIVA_ESPERA", ESPERA_BASE))
+    espera_maxima = float(os.getenv("PEP_RETENTATIVA_ESPERA_MAXIMA", ESPERA_MAXIMA))
+
+    ic(f"Retentativas: até {tentativas} tentativa(s), espera de {espera_base:.0f}s a {espera_maxima:.0f}s")
+
+    return AgendaRetentativas(tentativas, espera_base, espera_maxima)
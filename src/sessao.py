@@ -0,0 +1,212 @@
+"""
+Gerenciador da sessão autenticada no PEP: login, verificação e re-login.
+
+A sessão do MV expira depois de um tempo; a partir daí toda navegação cai
+de volta no formulário de login (campo "username") e, sem tratamento, todos
+os pacientes seguintes falham na busca. O GerenciadorSessao:
+
+- verifica a sessão antes de um paciente quando ela está ociosa há mais de
+  VERIFICAR_A_CADA segundos (esperas do rate limiter e das retentativas);
+- refaz o login no mesmo navegador quando a expiração é detectada, ou abre
+  outro navegador se o WebDriver morreu, e recria o cliente AMF com os
+  cookies novos;
+- desiste depois de MAX_RELOGINS tentativas seguidas sem sucesso.
+"""
+
+import os
+import time
+from typing import Dict
+
+from selenium.webdriver.common.by import By
+from selenium.common.exceptions import WebDriverException
+from icecream import ic
+
+from pep_scraper import configurar_driver, fazer_login, navegar_para_pagina
+from cliente_amf import criar_cliente_amf
+
+
+# Ociosidade (segundos) a partir da qual a sessão é conferida antes de usar
+VERIFICAR_A_CADA = 300
+
+# Re-logins seguidos sem sucesso antes de desistir da sessão
+MAX_RELOGINS = 3
+
+
+def sessao_expirada(driver) -> bool:
+    """
+    Verifica se o navegador foi mandado de volta para o login.
+
+    Args:
+        driver: WebDriver do Selenium
+
+    Returns:
+        True se a URL é a de login, se o formulário de login está na página
+        ou se o WebDriver não responde mais
+    """
+    try:
+        if "login" in driver.current_url.lower():
+            return True
+        return bool(driver.find_elements(By.ID, "username"))
+    except WebDriverException:
+        return True
+
+
+def _driver_vivo(driver) -> bool:
+    """O processo do navegador ainda responde"""
+    try:
+        driver.current_url
+        return True
+    except WebDriverException:
+        return False
+
+
+class GerenciadorSessao:
+    """
+    Navegador logado de uma sessão, com re-login transparente.
+
+    Args:
+        credenciais: Dicionário com usuario, senha, empresa e url_destino
+        prefixo: Prefixo para os logs (identifica a sessão)
+        verificar_a_cada: Ociosidade (s) que dispara a verificação antes do uso
+        max_relogins: Re-logins seguidos sem sucesso antes de desistir
+    """
+
+    def __init__(
+        self,
+        credenciais: Dict,
+        prefixo: str = "",
+        verificar_a_cada: float = VERIFICAR_A_CADA,
+        max_relogins: int = MAX_RELOGINS
+    ):
+        self.credenciais = credenciais
+        self.prefixo = prefixo
+        self.verificar_a_cada = verificar_a_cada
+        self.max_relogins = max_relogins
+
+        self.driver = None
+        self.cliente_amf = None
+        self.relogins = 0
+        self.pacientes = 0
+        self._falhas_seguidas = 0
+        self._ultima_atividade = 0.0
+
+    def _autenticar(self) -> bool:
+        """Login e navegação até a página de busca no navegador atual"""
+        prefixo = self.prefixo
+
+        ic(f"{prefixo}Fazendo login...")
+        if not fazer_login(self.driver, self.credenciais["usuario"], self.credenciais["senha"],
+                           self.credenciais["empresa"]):
+            ic(f"{prefixo}❌ Falha no login")
+            return False
+
+        ic(f"{prefixo}Navegando para página de busca...")
+        if not navegar_para_pagina(self.driver, self.credenciais["url_destino"]):
+            ic(f"{prefixo}❌ Falha na navegação")
+            return False
+
+        if self.cliente_amf:
+            self.cliente_amf.fechar()
+        self.cliente_amf = criar_cliente_amf(self.driver)
+        self.registrar_atividade()
+        return True
+
+    def iniciar(self) -> bool:
+        """
+        Abre o navegador e faz o login.
+
+        Returns:
+            True se a sessão está pronta para buscar pacientes
+        """
+        ic(f"{self.prefixo}Configurando WebDriver...")
+        self.driver = configurar_driver()
+
+        if not self._autenticar():
+            ic(f"{self.prefixo}❌ Sessão não iniciada. Encerrando...")
+            self.fechar()
+            return False
+        return True
+
+    def relogar(self) -> bool:
+        """
+        Refaz o login (em outro navegador, se o atual morreu).
+
+        Returns:
+            True se a sessão foi renovada
+        """
+        if self._falhas_seguidas >= self.max_relogins:
+            ic(f"{self.prefixo}❌ {self._falhas_seguidas} re-login(s) seguidos sem sucesso, desistindo")
+            return False
+
+        ic(f"{self.prefixo}↻ Sessão expirada, refazendo login...")
+
+        if self.driver is None or not _driver_vivo(self.driver):
+            ic(f"{self.prefixo}⚠️ Navegador não responde, abrindo outro")
+            if self.driver is not None:
+                try:
+                    self.driver.quit()
+                except WebDriverException:
+                    pass
+            self.driver = configurar_driver()
+
+        if self._autenticar():
+            self.relogins += 1
+            self._falhas_seguidas = 0
+            ic(f"{self.prefixo}✓ Sessão renovada ({self.relogins} re-login(s) nesta execução)")
+            return True
+
+        self._falhas_seguidas += 1
+        return False
+
+    def registrar_atividade(self):
+        """Marca uso bem-sucedido da sessão (adia a próxima verificação)"""
+        self._ultima_atividade = time.monotonic()
+
+    def garantir(self) -> bool:
+        """
+        Confere a sessão se ela está ociosa há muito tempo, relogando se preciso.
+
+        Returns:
+            False se a sessão expirou e não foi possível renová-la
+        """
+        if time.monotonic() - self._ultima_atividade < self.verificar_a_cada:
+            return True
+
+        if not sessao_expirada(self.driver):
+            self.registrar_atividade()
+            return True
+
+        return self.relogar()
+
+    def fechar(self):
+        """Fecha o cliente AMF e o navegador"""
+        if self.cliente_amf:
+            self.cliente_amf.fechar()
+            self.cliente_amf = None
+        if self.driver:
+            ic(f"{self.prefixo}Fechando navegador...")
+            self.driver.quit()
+            self.driver = None
+
+
+def criar_gerenciador_sessao(credenciais: Dict, prefixo: str = "") -> GerenciadorSessao:
+    """
+    Cria o gerenciador de sessão a partir do .env.
+
+    Variáveis de ambiente:
+        PEP_SESSAO_VERIFICAR: ociosidade (s) que dispara a verificação da sessão
+        PEP_SESSAO_MAX_RELOGINS: re-logins seguidos sem sucesso antes de desistir
+
+    Args:
+        credenciais: Dicionário com credenciais
+        prefixo: Prefixo para os logs
+
+    Returns:
+        GerenciadorSessao (ainda sem navegador; ver iniciar)
+    """
+    return GerenciadorSessao(
+        credenciais,
+        prefixo,
+        verificar_a_cada=float(os.getenv("PEP_SESSAO_VERIFICAR", VERIFICAR_A_CADA)),
+        max_relogins=int(os.getenv("PEP_SESSAO_MAX_RELOGINS", MAX_RELOGINS))
+    )
@@ -0,0 +1,113 @@
+"""
+Testes do decodificador/codificador AMF com as respostas reais gravadas em
+dados_pacientes/amf_debug (paciente 13481038).
+
+Uso:
+    python -m pytest tests
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from amf import ErroAMF, codificar_pacote, decodificar_arquivo, decodificar_pacote
+
+
+AMF_DEBUG = Path(__file__).parent.parent / "dados_pacientes" / "amf_debug"
+ARQUIVOS = sorted(AMF_DEBUG.glob("*.bin"))
+
+DS_ID = "887FBE9C-871A-2EA6-28C6-FC4B8045AA9E"
+
+
+def corpo(numero: int):
+    """Corpo da única mensagem de 13481038_amf_response_<numero>.bin"""
+    pacote = decodificar_arquivo(AMF_DEBUG / f"13481038_amf_response_{numero}.bin")
+    assert len(pacote["mensagens"]) == 1
+    return pacote["mensagens"][0]["corpo"]
+
+
+def test_fixtures_presentes():
+    assert len(ARQUIVOS) == 10
+
+
+@pytest.mark.parametrize("arquivo", ARQUIVOS, ids=lambda p: p.name)
+def test_pacote_amf3_com_uma_resposta(arquivo):
+    pacote = decodificar_arquivo(arquivo)
+
+    assert pacote["versao"] == 3
+    assert pacote["cabecalhos"] == []
+    assert len(pacote["mensagens"]) == 1
+    assert pacote["mensagens"][0]["alvo"] in ("/1/onResult", "/2/onResult", "/2/onStatus")
+
+
+@pytest.mark.parametrize("numero", [4, 5, 6, 7])
+def test_handshake_devolve_ds_id(numero):
+    mensagem = corpo(numero)
+
+    assert mensagem["_classe"] == "flex.messaging.messages.AcknowledgeMessage"
+    assert mensagem["headers"] == {"DSMessagingVersion": 1.0, "DSId": DS_ID}
+    assert mensagem.get("body") is None
+
+
+def test_mensagem_de_erro():
+    mensagem = corpo(1)
+
+    assert mensagem["_classe"] == "flex.messaging.messages.ErrorMessage"
+    assert mensagem["destination"] == "appDocumentoEletronicoController"
+    assert mensagem["faultCode"] == "Server.ResourceUnavailable"
+    assert mensagem["faultString"] == "Cannot invoke method 'auditCarregarDocumentoClinico'."
+    assert mensagem["headers"] == {}
+    assert mensagem["timestamp"] == 1761915840399.0
+
+
+def test_corpo_texto_i18n():
+    mensagem = corpo(0)
+
+    assert mensagem["_classe"] == "flex.messaging.messages.AcknowledgeMessage"
+    assert mensagem["body"] == "<i18nMessage footer='Rodapé' header='Cabeçalho'></i18nMessage>"
+
+
+def test_registro_clinico():
+    mensagem = corpo(9)
+    registro = mensagem["body"]
+
+    assert mensagem["correlationId"] == "F40B368E-064F-4A31-5970-3A5E249622A5"
+    assert registro["_classe"] == "mv.editor.core.data.Registry"
+    assert registro["id"] == 26086082.0
+    assert registro["documentId"] == 2327.0
+    assert registro["closed"] is True
+
+    layout = registro["layout"]
+    assert layout["_classe"] == "mv.editor.core.data.Layout"
+    assert layout["documentName"] == "SEGUIMENTO - OFTALMOLOGIA"
+    assert layout["name"] == "Tela"
+    assert layout["width"] == 768.0
+    assert layout["content"].startswith("<Application><Page width='768'")
+
+    # Objetos repetidos vêm da tabela de referências (mesma classe/traits)
+    parametros = {p["data"]: p for p in registro["parameters"]}
+    assert "PAR_CD_USUARIO" in parametros
+    assert parametros["PAR_CD_ITPRE_MED"]["label"] == "null"
+    assert all(p["_classe"] == "mv.editor.core.data.DataLabel" for p in parametros.values())
+
+
+@pytest.mark.parametrize("arquivo", ARQUIVOS, ids=lambda p: p.name)
+def test_ida_e_volta_pelo_codificador(arquivo):
+    original = decodificar_arquivo(arquivo)["mensagens"]
+
+    recodificado = decodificar_pacote(codificar_pacote(original))["mensagens"]
+
+    # codificar_pacote usa o formato de requisição: corpo num array de um elemento
+    assert [m["alvo"] for m in recodificado] == [m["alvo"] for m in original]
+    assert [m["corpo"] for m in recodificado] == [[m["corpo"]] for m in original]
+
+
+@pytest.mark.parametrize("tamanho", [3, 10, 50, 5000])
+def test_pacote_truncado(tamanho):
+    dados = (AMF_DEBUG / "13481038_amf_response_9.bin").read_bytes()
+
+    with pytest.raises(ErroAMF):
+        decodificar_pacote(dados[:tamanho])
@@ -0,0 +1,61 @@
+"""
+Testes do cache Parquet dos CSVs do SIGH (cache_sigh.py).
+
+Uso:
+    python -m pytest tests
+"""
+
+import sys
+import json
+import hashlib
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import load_sigh_data
+from cache_sigh import carregar_manifesto, hash_arquivo
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    for nome in ("AGE_1", "AGE_2"):
+        (tmp_path / f"{nome}.csv").write_text('"MATRÍCULA","PACIENTE"\n"123","FULANO"\n', encoding="iso-8859-1")
+    return tmp_path
+
+
+def carregar(data_dir):
+    return load_sigh_data.carregar_csvs(sorted(data_dir.glob("*.csv")), processos=1, usar_cache=True)
+
+
+def test_hash_em_blocos(data_dir):
+    csv_file = data_dir / "AGE_1.csv"
+
+    assert hash_arquivo(csv_file) == hashlib.sha256(csv_file.read_bytes()).hexdigest()
+
+
+def test_csv_apagado_sai_do_manifesto(data_dir):
+    carregar(data_dir)
+    (data_dir / "AGE_2.csv").unlink()
+    carregar(data_dir)
+
+    manifesto = carregar_manifesto(data_dir / "cache", load_sigh_data.VERSAO_PARSER)
+    assert [Path(chave).name for chave in manifesto] == ["AGE_1.csv"]
+    parquets = [p.name for p in (data_dir / "cache").glob("*.parquet")]
+    assert parquets == [entrada["parquet"] for entrada in manifesto.values()]
+
+
+def test_outra_versao_do_parser_descarta_o_cache(data_dir, monkeypatch):
+    carregar(data_dir)
+    cache_dir = data_dir / "cache"
+    assert len(carregar_manifesto(cache_dir, load_sigh_data.VERSAO_PARSER)) == 2
+
+    monkeypatch.setattr(load_sigh_data, "VERSAO_PARSER", load_sigh_data.VERSAO_PARSER + 1)
+    assert carregar_manifesto(cache_dir, load_sigh_data.VERSAO_PARSER) == {}
+
+    dataframes = carregar(data_dir)
+    assert [len(df) for df in dataframes] == [1, 1]
+    conteudo = json.loads((cache_dir / "manifesto.json").read_text(encoding="utf-8"))
+    assert conteudo["versao_parser"] == load_sigh_data.VERSAO_PARSER
+    assert len(list(cache_dir.glob("*.parquet"))) == 2
@@ -0,0 +1,111 @@
+"""
+Testes do backend AMF (cliente_amf.py) contra o servidor de fixtures
+(scripts/servidor_amf_fixture.py), com um roteiro de chamadas gravado.
+
+Uso:
+    python -m pytest tests
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+RAIZ = Path(__file__).parent.parent
+sys.path.insert(0, str(RAIZ / "src"))
+sys.path.insert(0, str(RAIZ / "scripts"))
+
+import cliente_amf
+from cliente_amf import ClienteAMF, capturar_dados_paciente_amf
+from servidor_amf_fixture import iniciar_servidor
+
+
+DS_ID = "887FBE9C-871A-2EA6-28C6-FC4B8045AA9E"
+
+PRONTUARIO = "13481038"
+ATENDIMENTO = "9082530"
+
+# Roteiro e respostas gravados: carregarDocumentoClinico devolve o Registry
+# (..._9.bin); auditCarregarDocumentoClinico devolveu ErrorMessage (..._1.bin)
+ROTEIRO = [{"operacao": "carregarDocumentoClinico", "argumentos": ["{numero_atendimento}", "{prontuario}"]}]
+ROTAS = {
+    "carregarDocumentoClinico": "13481038_amf_response_9.bin",
+    "auditCarregarDocumentoClinico": "13481038_amf_response_1.bin",
+}
+
+
+@pytest.fixture
+def servidor():
+    servidor = iniciar_servidor(rotas=ROTAS)
+    yield servidor
+    servidor.shutdown()
+
+
+@pytest.fixture
+def cliente(servidor, monkeypatch):
+    monkeypatch.setenv("PEP_CAPTURA_INCREMENTAL", "0")
+    cliente = ClienteAMF(f"http://127.0.0.1:{servidor.server_address[1]}/mvpep/messagebroker/amf")
+    yield cliente
+    cliente.fechar()
+
+
+def test_roteiro_gera_dados_paciente(servidor, cliente):
+    dados_paciente = capturar_dados_paciente_amf(cliente, PRONTUARIO, ATENDIMENTO, ROTEIRO)
+
+    assert dados_paciente["prontuario"] == PRONTUARIO
+    assert dados_paciente["codigo_paciente"] == "38366"
+    assert dados_paciente["total_atendimentos"] == 1
+
+    atendimento = dados_paciente["atendimentos"][0]
+    assert atendimento["numero_atendimento"] == ATENDIMENTO
+    assert atendimento["especialidade"] == "OFTALMOLOGIA"
+    assert atendimento["subespecialidade"] == "Retina"
+    assert atendimento["diagnostico"] == "Descolamento de retina regmatogênico"
+    assert atendimento["medico"] == "HENRIQUE CARMONA FERREIRA"
+    assert atendimento["texto_completo"].startswith("SEGUIMENTO - OFTALMOLOGIA\n")
+
+    # Handshake e depois as chamadas do roteiro, com o DSId do handshake
+    ping, chamada = servidor.requisicoes
+    assert ping["_classe"] == "flex.messaging.messages.CommandMessage"
+    assert chamada["operation"] == "carregarDocumentoClinico"
+    assert chamada["destination"] == "appDocumentoEletronicoController"
+    assert chamada["body"] == [ATENDIMENTO, PRONTUARIO]
+    assert chamada["headers"]["DSId"] == DS_ID
+
+
+def test_sem_demograficos_a_captura_e_parcial(cliente):
+    dados_paciente = capturar_dados_paciente_amf(cliente, PRONTUARIO, ATENDIMENTO, ROTEIRO)
+
+    # O navegador completa (pep_scraper.completar_dados_paciente) e grava
+    assert dados_paciente["captura_parcial"] is True
+    assert dados_paciente["nome_registro"] == ""
+
+
+def test_registro_incremental_completo_nao_e_parcial(cliente, monkeypatch):
+    gravados = []
+    registro = {
+        "prontuario": PRONTUARIO,
+        "nome_registro": "PACIENTE DE TESTE",
+        "data_nascimento": "01/01/1970",
+        "atendimentos": [],
+        "indice_atendimentos": {},
+    }
+    monkeypatch.setenv("PEP_CAPTURA_INCREMENTAL", "1")
+    monkeypatch.setattr(cliente_amf, "carregar_registro", lambda prontuario, root: registro)
+    monkeypatch.setattr(cliente_amf, "gravar_registro", lambda dados, root: gravados.append(dados) or root)
+
+    dados_paciente = capturar_dados_paciente_amf(cliente, PRONTUARIO, ATENDIMENTO, ROTEIRO)
+
+    assert "captura_parcial" not in dados_paciente
+    assert gravados == [dados_paciente]
+    assert dados_paciente["nome_registro"] == "PACIENTE DE TESTE"
+    assert list(dados_paciente["indice_atendimentos"]) == [f"ATENDIMENTO {ATENDIMENTO}"]
+
+
+def test_error_message_volta_para_o_navegador(servidor, cliente):
+    roteiro = ROTEIRO + [{"operacao": "auditCarregarDocumentoClinico", "argumentos": ["{numero_atendimento}"]}]
+
+    assert capturar_dados_paciente_amf(cliente, PRONTUARIO, ATENDIMENTO, roteiro) is None
+    assert [m.get("operation") for m in servidor.requisicoes[1:]] == [
+        "carregarDocumentoClinico", "auditCarregarDocumentoClinico"
+    ]
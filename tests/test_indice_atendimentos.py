@@ -0,0 +1,77 @@
+"""
+Testes das chaves do índice incremental: o item do histórico (navegador) e o
+registro AMF do mesmo atendimento têm de gerar a mesma chave.
+
+Uso:
+    python -m pytest tests
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from amf import decodificar_arquivo
+from cliente_amf import mapear_registro
+from indice_atendimentos import chaves_atendimentos, chaves_historico, itens_novos
+
+
+AMF_DEBUG = Path(__file__).parent.parent / "dados_pacientes" / "amf_debug"
+
+# innerText dos itens do histórico em dados_pacientes/page_source_13481038_*.html
+# (mais novo primeiro); o registro de amf_debug/..._9.bin é do atendimento 9082530
+ITENS_HISTORICO = [
+    "ambulatorial\n(H521 - MIOPIA)\nAtendimento 9160223, responsável foi VITOR MELO REBELO\n"
+    "Entrada 13/10/2025 às 07:31, saída 13/10/2025 às 09:06\ndetalhes",
+    "ambulatorial\n(H521 - MIOPIA)\nAtendimento 9082530, responsável foi HENRIQUE CARMONA FERREIRA\n"
+    "Entrada 01/10/2025 às 07:37, saída 01/10/2025 às 23:59\ndetalhes",
+    "internação\n(H330 - DESCOLAMENTO DA RETINA COM DEFEITO RETINIANO)\n"
+    "Atendimento 8837339, responsável foi LUIZ EDUARDO FRANCO MALTA CARVALHO\n"
+    "Entrada 25/08/2025 às 17:36, saída 27/08/2025 às 15:25\ndetalhes",
+]
+
+
+def registro_amf():
+    pacote = decodificar_arquivo(AMF_DEBUG / "13481038_amf_response_9.bin")
+    return pacote["mensagens"][0]["corpo"]["body"]
+
+
+def test_registro_amf_tem_especialidade_e_atendimento():
+    atendimento = mapear_registro(registro_amf())
+
+    assert atendimento["especialidade"] == "OFTALMOLOGIA"
+    assert atendimento["numero_atendimento"] == "9082530"
+
+
+def test_mesma_chave_no_navegador_e_no_amf():
+    chaves_navegador = chaves_historico(ITENS_HISTORICO)
+    chaves_amf = chaves_atendimentos([mapear_registro(registro_amf())])
+
+    assert chaves_navegador == ["ATENDIMENTO 9160223", "ATENDIMENTO 9082530", "ATENDIMENTO 8837339"]
+    assert chaves_amf == [chaves_navegador[1]]
+
+    # Capturado pelo AMF, o item não é recapturado pelo navegador (e vice-versa)
+    registro = {"indice_atendimentos": {chave: "" for chave in chaves_amf}}
+    assert itens_novos(chaves_navegador, registro) == [0, 2]
+    assert itens_novos(chaves_amf, {"indice_atendimentos": {chave: "" for chave in chaves_navegador}}) == []
+
+
+def test_registro_sem_parametro_usa_atendimento_da_requisicao():
+    registro = registro_amf()
+    registro["parameters"] = [p for p in registro["parameters"] if p["data"] != "PAR_CD_ATENDIMENTO"]
+
+    atendimento = mapear_registro(registro, "9082530")
+
+    assert chaves_atendimentos([atendimento]) == ["ATENDIMENTO 9082530"]
+
+
+def test_documentos_do_mesmo_atendimento_nao_colidem():
+    atendimentos = [mapear_registro(registro_amf()), mapear_registro(registro_amf())]
+
+    assert chaves_atendimentos(atendimentos) == ["ATENDIMENTO 9082530#2", "ATENDIMENTO 9082530"]
+
+
+def test_item_sem_numero_usa_data_e_especialidade():
+    assert chaves_historico(["26/08/2025 10:30\nRetina", "26/08/2025 10:30\nRetina"]) == [
+        "26/08/2025 10:30|RETINA#2", "26/08/2025 10:30|RETINA"
+    ]